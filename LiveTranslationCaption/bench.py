@@ -0,0 +1,820 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for pipeline performance characteristics.
+Uses fake backends only; no audio device or network access is needed.
+"""
+
+import sys
+import os
+import time
+import threading
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+
+def _percentile(values, pct):
+    """Percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+class CpuBoundRecognizer:
+    """Fake local recognition engine that burns CPU in pure Python."""
+    
+    def __init__(self, iterations=300000):
+        self.iterations = iterations
+    
+    def process_audio(self, audio_data, sample_rate=16000, sample_width=2):
+        total = 0
+        for i in range(self.iterations):
+            total += i * i
+        return "認識結果"
+
+
+def _tick_lateness(interval, stop_event, lateness):
+    """Wake up every interval seconds and record how late each wakeup was."""
+    next_tick = time.perf_counter() + interval
+    while not stop_event.is_set():
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        lateness.append(max(0.0, time.perf_counter() - next_tick))
+        next_tick += interval
+
+
+def _run_jitter(process_audio, duration, load_threads=2):
+    """Measure capture and GUI tick lateness while recognition runs at full load."""
+    stop_event = threading.Event()
+    capture_lateness = []
+    gui_lateness = []
+    jobs = [0]
+    
+    def load():
+        while not stop_event.is_set():
+            process_audio(b"\x00" * 96000)
+            jobs[0] += 1
+    
+    threads = [
+        threading.Thread(target=_tick_lateness, args=(0.064, stop_event, capture_lateness)),
+        threading.Thread(target=_tick_lateness, args=(0.016, stop_event, gui_lateness)),
+    ]
+    if process_audio is not None:
+        threads += [threading.Thread(target=load) for _ in range(load_threads)]
+    
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop_event.set()
+    for t in threads:
+        t.join()
+    return capture_lateness, gui_lateness, jobs[0]
+
+
+def bench_recognition_isolation(duration=3.0):
+    """Compare capture/GUI jitter with recognition in-thread vs in worker processes."""
+    print("\nRecognition isolation (capture tick 64 ms, GUI tick 16 ms):")
+    from audio.worker_pool import RecognitionPool
+    
+    recognizer = CpuBoundRecognizer()
+    pool = RecognitionPool(num_workers=2, factory=CpuBoundRecognizer)
+    pool.start()
+    
+    modes = [
+        ("idle", None),
+        ("thread", recognizer.process_audio),
+        ("process", pool.process_audio),
+    ]
+    try:
+        for name, func in modes:
+            capture, gui, jobs = _run_jitter(func, duration)
+            print(f"  {name:8s} capture p50={_percentile(capture, 50) * 1000:6.2f} ms "
+                  f"p99={_percentile(capture, 99) * 1000:6.2f} ms | "
+                  f"gui p50={_percentile(gui, 50) * 1000:6.2f} ms "
+                  f"p99={_percentile(gui, 99) * 1000:6.2f} ms | "
+                  f"{jobs / duration:5.1f} jobs/s")
+    finally:
+        pool.stop()
+
+
+def _queue_consumer(audio_queue, result_queue):
+    """Worker that receives audio bytes through a multiprocessing queue."""
+    import numpy as np
+    total = 0
+    while True:
+        data = audio_queue.get()
+        if data is None:
+            break
+        total += int(np.frombuffer(data, dtype=np.int16).sum())
+    result_queue.put(total)
+
+
+def _ring_consumer(ring_name, offset_queue, result_queue):
+    """Worker that receives sample offsets and reads the shared ring in place."""
+    from audio.shared_ring import SharedAudioRing
+    ring = SharedAudioRing.attach(ring_name)
+    total = 0
+    while True:
+        item = offset_queue.get()
+        if item is None:
+            break
+        for view in ring.views(*item):
+            total += int(view.sum())
+    ring.close()
+    result_queue.put(total)
+
+
+def bench_audio_handoff(audio_seconds=120, sample_rate=16000, chunk_size=1024):
+    """Compare bytes copied per second of audio: pickled queue vs shared ring."""
+    print("\nAudio handoff to worker process (16-bit mono, 1024-sample blocks):")
+    import pickle
+    import multiprocessing
+    import numpy as np
+    from audio.shared_ring import SharedAudioRing
+    
+    ctx = multiprocessing.get_context("spawn")
+    rng = np.random.default_rng(0)
+    blocks = [rng.integers(-1000, 1000, chunk_size, dtype=np.int16).tobytes()
+              for _ in range(int(audio_seconds * sample_rate / chunk_size))]
+    expected = sum(int(np.frombuffer(b, dtype=np.int16).sum()) for b in blocks)
+    
+    # Queue-based transfer: every block is pickled, written to a pipe, read
+    # back and unpickled (serialize, kernel write, kernel read, deserialize).
+    audio_queue, result_queue = ctx.Queue(), ctx.Queue()
+    worker = ctx.Process(target=_queue_consumer, args=(audio_queue, result_queue))
+    worker.start()
+    start = time.perf_counter()
+    pickled = 0
+    for block in blocks:
+        pickled += len(pickle.dumps(block))
+        audio_queue.put(block)
+    audio_queue.put(None)
+    total = result_queue.get()
+    queue_time = time.perf_counter() - start
+    worker.join()
+    queue_copied = pickled * 4
+    
+    # Shared ring: each block is copied once into shared memory and only the
+    # (start, end) offsets cross the pipe.
+    ring = SharedAudioRing(capacity_samples=sample_rate * audio_seconds)
+    offset_queue, result_queue = ctx.Queue(), ctx.Queue()
+    worker = ctx.Process(target=_ring_consumer, args=(ring.name, offset_queue, result_queue))
+    worker.start()
+    start = time.perf_counter()
+    offsets_pickled = 0
+    written = 0
+    for block in blocks:
+        item = ring.write(block)
+        written += len(block)
+        offsets_pickled += len(pickle.dumps(item))
+        offset_queue.put(item)
+    offset_queue.put(None)
+    ring_total = result_queue.get()
+    ring_time = time.perf_counter() - start
+    worker.join()
+    ring.close()
+    ring_copied = written + offsets_pickled * 4
+    
+    if total != expected or ring_total != expected:
+        print("  ✗ Worker checksums do not match")
+    print(f"  queue  {queue_copied / audio_seconds / 1024:8.1f} KiB copied per audio second, "
+          f"{queue_time * 1000:7.1f} ms for {audio_seconds} s of audio")
+    print(f"  ring   {ring_copied / audio_seconds / 1024:8.1f} KiB copied per audio second, "
+          f"{ring_time * 1000:7.1f} ms for {audio_seconds} s of audio")
+
+
+async def _caption_client(port, kind, count, latencies):
+    """Async SSE/WebSocket subscriber recording delivery latency per caption."""
+    import asyncio
+    import json
+    import struct
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    if kind == "ws":
+        writer.write(b"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                     b"Sec-WebSocket-Version: 13\r\n\r\n")
+    else:
+        writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    received = 0
+    try:
+        while received < count:
+            if kind == "ws":
+                head = await reader.readexactly(2)
+                length = head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                payload = await reader.readexactly(length)
+            else:
+                line = await reader.readuntil(b"\n\n")
+                payload = line[len(b"data: "):-2]
+            message = json.loads(payload)
+            latencies.append(time.time() - message["timestamp"])
+            received += 1
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    writer.close()
+    return received
+
+
+def bench_caption_broadcast(num_clients=400, num_captions=200, rate=50):
+    """Load test the caption broadcast server with hundreds of local clients."""
+    print(f"\nCaption broadcast ({num_clients} clients, {num_captions} captions at {rate}/s):")
+    import asyncio
+    from server.broadcast import CaptionBroadcaster
+    
+    broadcaster = CaptionBroadcaster(port=0)
+    broadcaster.start()
+    latencies = []
+    publish_costs = []
+    
+    def publisher():
+        while len(broadcaster.subscribers) < num_clients:
+            time.sleep(0.01)
+        for i in range(num_captions):
+            start = time.perf_counter()
+            broadcaster.publish("今日はとても良い天気ですね", "The weather is very nice today")
+            publish_costs.append(time.perf_counter() - start)
+            time.sleep(1.0 / rate)
+    
+    async def run_clients():
+        clients = [_caption_client(broadcaster.port, "ws" if i % 2 else "sse",
+                                   num_captions, latencies)
+                   for i in range(num_clients)]
+        return await asyncio.gather(*clients)
+    
+    publish_thread = threading.Thread(target=publisher)
+    publish_thread.start()
+    start = time.perf_counter()
+    received = asyncio.run(run_clients())
+    elapsed = time.perf_counter() - start
+    publish_thread.join()
+    broadcaster.stop()
+    
+    print(f"  delivered {sum(received)}/{num_clients * num_captions} messages in {elapsed:.2f} s, "
+          f"{broadcaster.dropped_clients} clients dropped")
+    print(f"  delivery latency p50={_percentile(latencies, 50) * 1000:.2f} ms "
+          f"p99={_percentile(latencies, 99) * 1000:.2f} ms "
+          f"max={max(latencies) * 1000:.2f} ms")
+    print(f"  publish() cost p50={_percentile(publish_costs, 50) * 1e6:.1f} us "
+          f"p99={_percentile(publish_costs, 99) * 1e6:.1f} us")
+
+
+def bench_journal(audio_seconds=600, sample_rate=16000, chunk_size=1024):
+    """Cost of journaling on the capture thread, and offline replay throughput."""
+    print(f"\nCapture journal ({audio_seconds} s of audio, {chunk_size}-sample chunks):")
+    import shutil
+    import tempfile
+    import numpy as np
+    from audio.journal import CaptureJournal, JournalReplaySource
+    
+    directory = tempfile.mkdtemp()
+    try:
+        journal = CaptureJournal(directory, sample_rate=sample_rate)
+        rng = np.random.default_rng(0)
+        chunk = rng.integers(-3000, 3000, chunk_size, dtype=np.int16).tobytes()
+        costs = []
+        num_chunks = audio_seconds * sample_rate // chunk_size
+        wall_time = time.time() - audio_seconds
+        for i in range(num_chunks):
+            start = time.perf_counter()
+            journal.write(chunk, wall_time=wall_time + i * chunk_size / sample_rate)
+            costs.append(time.perf_counter() - start)
+        journal.close()
+        print(f"  write() cost p50={_percentile(costs, 50) * 1e6:.1f} us "
+              f"p99={_percentile(costs, 99) * 1e6:.1f} us max={max(costs) * 1e6:.1f} us "
+              f"(chunk period {chunk_size / sample_rate * 1e6:.0f} us)")
+        
+        # Replay everything at maximum speed into a consumer that only sums samples
+        replay = JournalReplaySource(directory, speed=0)
+        replayed = 0
+        start = time.perf_counter()
+        replay.start()
+        while True:
+            audio = replay.get_audio_chunk(duration_seconds=3)
+            if audio is None:
+                break
+            replayed += len(audio) // 2
+            int(np.frombuffer(audio, dtype=np.int16).sum())
+        elapsed = time.perf_counter() - start
+        replay.stop()
+        print(f"  replayed {replayed / sample_rate:.0f} s of audio in {elapsed:.2f} s "
+              f"({replayed / sample_rate / elapsed:.0f}x real time)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class FakeTranslator:
+    """Translator stand-in with a fixed round-trip latency and the real cache interface."""
+    
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.translation_cache = {}
+    
+    SOURCE_TEXT_BACKEND = "source_text"
+    
+    def get_cached(self, text):
+        return self.translation_cache.get(text)
+    
+    def cache_translation(self, text, translated_text):
+        self.translation_cache[text] = translated_text
+    
+    def draft(self, text):
+        if text in self.translation_cache:
+            return self.translation_cache[text], "cache", False
+        self.calls += 1
+        time.sleep(self.latency)
+        return text.upper(), "fake", True
+    
+    def confirm(self, text, translated_text, backend, remember=False):
+        if backend != "cache":
+            self.cache_translation(text, translated_text)
+    
+    def translate(self, text):
+        translated_text, backend, _ = self.draft(text)
+        self.confirm(text, translated_text, backend)
+        return translated_text
+
+
+def _paused_utterances(count, seed=0):
+    """
+    (hypotheses at speech pauses, final text) pairs of the segmenter path.
+    
+    Each utterance is recognized once when speech pauses; some pauses are
+    mid-sentence (the speaker goes on), and sometimes the final recognition
+    of the whole window differs from the one at the pause.
+    """
+    import random
+    rng = random.Random(seed)
+    words = ["kyou", "wa", "totemo", "ii", "tenki", "desu", "ne", "ashita", "mo", "hare"]
+    utterances = []
+    for i in range(count):
+        tokens = [rng.choice(words) for _ in range(rng.randint(4, 8))] + [str(i)]
+        final = " ".join(tokens)
+        pauses = [final]
+        if rng.random() < 0.3:
+            pauses.insert(0, " ".join(tokens[:len(tokens) // 2]))
+        if rng.random() < 0.2:
+            final = " ".join(tokens[:-2] + [rng.choice(words), tokens[-1]])
+        utterances.append((pauses, final))
+    return utterances
+
+
+def bench_speculative_translation(num_utterances=20, translation_latency=0.3, pause_seconds=0.2,
+                                  hangover_seconds=0.6, resume_seconds=0.3):
+    """
+    Caption latency after the final recognition, with and without speculation.
+    
+    Models the pipeline with speculative_translation: the segmenter hands the
+    window on when speech pauses, that hypothesis is speculated on as stable,
+    and the final recognition finishes hangover_seconds - pause_seconds later
+    (both recognitions take the same time).
+    """
+    print(f"\nSpeculative translation ({num_utterances} utterances, "
+          f"{translation_latency * 1000:.0f} ms translation, pause after {pause_seconds * 1000:.0f} ms, "
+          f"hangover {hangover_seconds * 1000:.0f} ms):")
+    from translation.speculative import SpeculativeTranslator
+    from utils.metrics import Metrics
+    
+    for speculative in (False, True):
+        translator = FakeTranslator(translation_latency)
+        speculator = SpeculativeTranslator(translator, max_in_flight=2, metrics=Metrics())
+        latencies = []
+        for pauses, final in _paused_utterances(num_utterances):
+            for i, hypothesis in enumerate(pauses):
+                if speculative:
+                    speculator.speculate(hypothesis, stable=True)
+                # The speaker goes on after a mid-sentence pause
+                time.sleep(resume_seconds if i < len(pauses) - 1 else hangover_seconds - pause_seconds)
+            start = time.perf_counter()
+            if speculative:
+                speculator.finalize(final)
+            else:
+                translator.translate(final)
+            latencies.append(time.perf_counter() - start)
+        speculator.shutdown()
+        
+        label = "speculative" if speculative else "final only"
+        print(f"  {label:12s} latency after final p50={_percentile(latencies, 50) * 1000:6.1f} ms "
+              f"p95={_percentile(latencies, 95) * 1000:6.1f} ms, {translator.calls} translation calls")
+        if speculative:
+            stats = speculator.stats
+            print(f"  {'':12s} hits={stats['hits']} misses={stats['misses']} "
+                  f"cache_hits={stats['cache_hits']} wasted={stats['wasted']} "
+                  f"cancelled={stats['cancelled']} saved={stats['saved_seconds']:.2f} s")
+
+
+def bench_translation_memory(num_entries=100000, num_lookups=2000, num_terms=10000):
+    """Lookup latency of a large translation memory and glossary."""
+    print(f"\nTranslation memory ({num_entries} entries) and glossary ({num_terms} terms):")
+    import random
+    from translation.memory import TranslationMemory
+    from translation.glossary import Glossary
+    
+    rng = random.Random(0)
+    # Synthetic Japanese-like phrases from a kana/kanji alphabet
+    alphabet = [chr(c) for c in range(0x3041, 0x3097)] + [chr(c) for c in range(0x4E00, 0x4E00 + 400)]
+    
+    def phrase():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(8, 30)))
+    
+    memory = TranslationMemory(fuzzy_threshold=0.85, max_entries=num_entries)
+    sources = [phrase() for _ in range(num_entries)]
+    start = time.perf_counter()
+    for i, source in enumerate(sources):
+        memory.add(source, f"translation {i}")
+    print(f"  built in {time.perf_counter() - start:.2f} s")
+    
+    def varied(text):
+        # Differs only in form: trailing punctuation, a sentence-final
+        # particle or a long vowel mark, which fuzzy matches may ignore
+        kind = rng.randrange(3)
+        if kind == 0:
+            return text + rng.choice(["。", "！", "…"])
+        if kind == 1:
+            return text + rng.choice(["ね", "よ", "よね。"])
+        i = rng.randint(1, len(text) - 1)
+        return text[:i] + "ー" + text[i:]
+    
+    cases = {
+        "exact": [rng.choice(sources) for _ in range(num_lookups)],
+        "fuzzy": [varied(rng.choice([s for s in sources[:5000] if len(s) >= 25]))
+                  for _ in range(num_lookups)],
+        "miss": [phrase() for _ in range(num_lookups)],
+    }
+    for name, queries in cases.items():
+        costs = []
+        hits = 0
+        for query in queries:
+            start = time.perf_counter()
+            match = memory.lookup(query)
+            costs.append(time.perf_counter() - start)
+            hits += match is not None
+        print(f"  {name:6s} lookup p50={_percentile(costs, 50) * 1e6:7.1f} us "
+              f"p99={_percentile(costs, 99) * 1e6:7.1f} us  hits {hits}/{len(queries)} "
+              f"({100.0 * hits / len(queries):.1f}%)")
+    
+    glossary = Glossary({phrase()[:rng.randint(2, 6)]: f"term {i}" for i in range(num_terms)})
+    texts = [phrase() + phrase() for _ in range(num_lookups)]
+    costs = []
+    for text in texts:
+        start = time.perf_counter()
+        glossary.protect(text)
+        costs.append(time.perf_counter() - start)
+    print(f"  glossary protect() p50={_percentile(costs, 50) * 1e6:7.1f} us "
+          f"p99={_percentile(costs, 99) * 1e6:7.1f} us")
+
+
+def _run_profile_pipeline(settings, audio_seconds, sample_rate=16000):
+    """
+    Replay synthetic audio in real time through the processing loop with the
+    given performance settings and a fake recognizer.
+    """
+    import shutil
+    import tempfile
+    import numpy as np
+    from audio.journal import CaptureJournal, JournalReplaySource
+    
+    directory = tempfile.mkdtemp()
+    try:
+        chunk_size = settings["chunk_size"]
+        journal = CaptureJournal(directory, sample_rate=sample_rate)
+        chunk = np.zeros(chunk_size, dtype=np.int16).tobytes()
+        for i in range(int(audio_seconds * sample_rate / chunk_size)):
+            journal.write(chunk, wall_time=i * chunk_size / sample_rate)
+        journal.close()
+        
+        source = JournalReplaySource(directory, speed=1.0)
+        latencies = []
+        calls = 0
+        throttled = 0
+        consumed = 0
+        last_call = 0.0
+        cpu_start = time.process_time()
+        source.start()
+        started = time.perf_counter()
+        while True:
+            audio = source.get_audio_chunk(duration_seconds=settings["window_seconds"])
+            if audio is None:
+                break
+            window_start = consumed / sample_rate
+            consumed += len(audio) // 2
+            now = time.perf_counter()
+            if now - last_call < settings["min_process_interval"]:
+                # AudioProcessor's throttle drops this window
+                throttled += 1
+            else:
+                last_call = now
+                calls += 1
+                # Fake recognition: fixed round trip plus time per second of audio
+                time.sleep(0.15 + 0.03 * len(audio) / 2 / sample_rate)
+                # Delay from the middle of the window being spoken to the caption
+                spoken = started + (window_start + consumed / sample_rate) / 2
+                latencies.append(time.perf_counter() - spoken)
+        source.stop()
+        cpu = time.process_time() - cpu_start
+        return latencies, calls, throttled, cpu
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_performance_profiles(audio_seconds=12):
+    """Caption latency, recognition calls and CPU of each performance profile."""
+    print(f"\nPerformance profiles ({audio_seconds} s of audio replayed in real time):")
+    from utils.config import Config
+    
+    for name, settings in Config.PERFORMANCE_PROFILES.items():
+        latencies, calls, throttled, cpu = _run_profile_pipeline(settings, audio_seconds)
+        print(f"  {name:12s} caption delay p50={_percentile(latencies, 50):5.2f} s "
+              f"max={max(latencies, default=0):5.2f} s  ASR calls/min={calls * 60 / audio_seconds:5.1f}  "
+              f"throttled windows={throttled}  CPU={cpu / audio_seconds * 100:4.1f}%")
+
+
+def _speech_journal(directory, layout, sample_rate=16000, chunk_size=1024):
+    """Journal of synthetic audio: (seconds, is_speech) parts of silence and a 220 Hz tone."""
+    import numpy as np
+    from audio.journal import CaptureJournal
+    
+    journal = CaptureJournal(directory, sample_rate=sample_rate)
+    t = np.arange(chunk_size) / sample_rate
+    silence = np.zeros(chunk_size, dtype=np.int16).tobytes()
+    position = 0
+    for seconds, is_speech in layout:
+        for _ in range(int(seconds * sample_rate / chunk_size)):
+            if is_speech:
+                phase = 2 * np.pi * 220 * position / sample_rate
+                chunk = (3000 * np.sin(2 * np.pi * 220 * t + phase)).astype(np.int16).tobytes()
+            else:
+                chunk = silence
+            journal.write(chunk, wall_time=position / sample_rate)
+            position += chunk_size
+    journal.close()
+
+
+def bench_idle_wakeups(idle_seconds=5.0, speech_seconds=1.5, sample_rate=16000):
+    """Processing thread wakeups, CPU and ASR calls in silence, polling vs speech segmenter."""
+    import queue
+    import shutil
+    import tempfile
+    from audio.journal import JournalReplaySource
+    from audio.segmenter import SpeechSegmenter
+    
+    class CountingQueue(queue.Queue):
+        """Queue recording when get() returns, i.e. when the consumer wakes up."""
+        
+        def __init__(self, maxsize=0):
+            super().__init__(maxsize)
+            self.wakeups = []
+        
+        def get(self, block=True, timeout=None):
+            try:
+                return super().get(block, timeout)
+            finally:
+                self.wakeups.append(time.perf_counter())
+    
+    print(f"\nIdle mode: {idle_seconds:.0f} s silence, {speech_seconds} s speech, "
+          f"{idle_seconds:.0f} s silence replayed in real time")
+    directory = tempfile.mkdtemp()
+    try:
+        _speech_journal(directory, [(idle_seconds, False), (speech_seconds, True),
+                                    (idle_seconds, False)], sample_rate)
+        settings = {"window_seconds": 3, "processing_interval": 0.5}
+        for name, use_segmenter in [("polling", False), ("event-driven", True)]:
+            segmenter = SpeechSegmenter(sample_rate) if use_segmenter else None
+            source = JournalReplaySource(directory, speed=1.0, segmenter=segmenter)
+            source.audio_queue = CountingQueue(maxsize=64)
+            calls = []
+            sleeps = []
+            
+            def consume():
+                while True:
+                    audio = source.get_audio_chunk(duration_seconds=settings["window_seconds"])
+                    if audio is None:
+                        if source.finished and source.audio_queue.empty():
+                            return
+                        continue
+                    # Fake recognition call
+                    calls.append(time.perf_counter())
+                    time.sleep(0.05)
+                    if not use_segmenter:
+                        # The loop used to sleep between windows
+                        time.sleep(settings["processing_interval"])
+                        sleeps.append(time.perf_counter())
+            
+            consumer = threading.Thread(target=consume)
+            source.start()
+            started = time.perf_counter()
+            cpu_start = time.process_time()
+            consumer.start()
+            # Measure the first silent stretch, leaving a margin before speech
+            idle = idle_seconds - 0.5
+            time.sleep(idle)
+            idle_cpu = time.process_time() - cpu_start
+            consumer.join()
+            source.stop()
+            idle_end = started + idle
+            wakeups = sum(1 for t in source.audio_queue.wakeups + sleeps if t < idle_end)
+            idle_calls = sum(1 for t in calls if t < idle_end)
+            print(f"  {name:12s} idle: wakeups/s={wakeups / idle:5.1f} CPU={idle_cpu / idle * 100:4.1f}% "
+                  f"ASR calls={idle_calls}   whole run: ASR calls={len(calls)}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class StubTranslationService:
+    """
+    Local HTTP translation service: POST {"text": ...} returns {"text": ...}
+    with every line upper-cased after a fixed latency. Like a rate-limited
+    API it serves only max_concurrent requests at a time.
+    """
+    
+    def __init__(self, latency=0.08, max_concurrent=2, mangle_every=0):
+        import json
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        service = self
+        self.requests = 0
+        self.slots = threading.Semaphore(max_concurrent)
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with service.slots:
+                    service.requests += 1
+                    time.sleep(latency)
+                text = body["text"].upper()
+                if mangle_every and service.requests % mangle_every == 0:
+                    # Services occasionally merge lines of a joined request
+                    text = text.replace("\n[[1]]", "")
+                reply = json.dumps({"text": text}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/translate"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def translate(self, text):
+        """Client call: translate one text with one request."""
+        import json
+        import urllib.request
+        request = urllib.request.Request(self.url, data=json.dumps({"text": text}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())["text"]
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_translation_batching(sessions=8, segments_per_session=12, burst_gap=0.15):
+    """Throughput and latency of per-segment vs micro-batched translation against a stub service."""
+    import random
+    from translation.batcher import TranslationBatcher
+    from translation.translator import Translator
+    from utils.event_log import events
+    from utils.resilience import Backend
+    
+    print(f"\nTranslation batching: {sessions} sessions x {segments_per_session} segments, "
+          f"stub service 80 ms/request, 2 concurrent requests")
+    
+    def run(translate):
+        latencies = []
+        lock = threading.Lock()
+        
+        def session(index):
+            rng = random.Random(index)
+            for i in range(segments_per_session):
+                time.sleep(rng.uniform(0, burst_gap))
+                start = time.perf_counter()
+                translate(f"session {index} segment {i}")
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+        
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, time.perf_counter() - start
+    
+    # One line per translated segment would swamp the results
+    events.configure(level="warning")
+    for name, mangle_every, batched in [("per segment", 0, False), ("micro-batched", 0, True),
+                                        ("batched, 1 in 4 split fails", 4, True)]:
+        service = StubTranslationService(mangle_every=mangle_every)
+        translator = Translator(backends=[Backend("stub", service.translate, timeout=10)])
+        batcher = None
+        if batched:
+            batcher = TranslationBatcher(translator.translate_batch, window_seconds=0.02, max_batch=8)
+            translate = batcher.translate
+        else:
+            translate = translator.translate
+        latencies, elapsed = run(translate)
+        segments = sessions * segments_per_session
+        print(f"  {name:28s} {segments / elapsed:6.1f} segments/s  latency p50={_percentile(latencies, 50) * 1000:5.0f} ms "
+              f"p95={_percentile(latencies, 95) * 1000:5.0f} ms  requests={service.requests}")
+        if batcher:
+            batcher.close()
+        translator.shutdown()
+        service.close()
+    events.configure(level="info")
+
+
+class SlowStream:
+    """stdout stand-in that takes a fixed time per write, like a blocked console."""
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+    
+    def write(self, text):
+        self.lines += text.count("\n")
+        time.sleep(self.delay)
+        return len(text)
+    
+    def flush(self):
+        pass
+
+
+def bench_event_logging(duration=2.0, tick=0.01, sink_delay=0.02):
+    """Capture tick lateness while logging an event per tick to a slow console."""
+    from utils.event_log import EventLogger
+    
+    print(f"\nEvent logging: one event per {tick * 1000:.0f} ms capture tick, "
+          f"console write {sink_delay * 1000:.0f} ms")
+    
+    def run(log_one):
+        lateness = []
+        next_tick = time.perf_counter() + tick
+        end = time.perf_counter() + duration
+        i = 0
+        while time.perf_counter() < end:
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            lateness.append(max(0.0, time.perf_counter() - next_tick))
+            log_one(i)
+            i += 1
+            next_tick += tick
+        return lateness
+    
+    stdout = sys.stdout
+    sink = SlowStream(sink_delay)
+    results = {}
+    try:
+        sys.stdout = sink
+        results["print"] = run(lambda i: print(f"Error reading audio: overflow {i}"))
+        log = EventLogger(console=True, rate_limit_seconds=0)
+        results["event log"] = run(lambda i: log.error("capture.read_error", f"Error reading audio: overflow {i}"))
+        backlog = log.queue.qsize()
+        log.flush(timeout=30)
+        lines = sink.lines
+        limited = EventLogger(console=True)
+        results["event log, rate limited"] = run(lambda i: limited.error("capture.read_error", "Error reading audio"))
+        limited.flush(timeout=30)
+    finally:
+        sys.stdout = stdout
+    for name, lateness in results.items():
+        print(f"  {name:24s} ticks={len(lateness):4d} lateness p50={_percentile(lateness, 50) * 1000:6.2f} ms "
+              f"p99={_percentile(lateness, 99) * 1000:6.2f} ms max={max(lateness) * 1000:6.2f} ms")
+    print(f"  event log backlog after the run {backlog} events, dropped {log.dropped}; "
+          f"rate limited log wrote {sink.lines - lines} line(s) "
+          f"for {len(results['event log, rate limited'])} errors")
+
+
+def main():
+    """Run all benchmarks."""
+    print("="*60)
+    print("LiveTranslationCaption - Benchmarks")
+    print("="*60)
+    
+    bench_recognition_isolation()
+    bench_audio_handoff()
+    bench_caption_broadcast()
+    bench_journal()
+    bench_speculative_translation()
+    bench_translation_memory()
+    bench_performance_profiles()
+    bench_event_logging()
+    bench_idle_wakeups()
+    bench_translation_batching()
+    
+    print("="*60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
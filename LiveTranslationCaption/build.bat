@@ -8,6 +8,13 @@ echo ============================================
 REM Ensure pyinstaller is installed
 pip install pyinstaller
 
+REM Fail the build if a long session leaks memory, threads or handles
+python soak.py --hours 2
+if errorlevel 1 (
+    echo Soak test failed
+    exit /b 1
+)
+
 REM Build the executable
 pyinstaller --name LiveTranslationCaption ^
             --windowed ^
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Load generator for the headless caption server.
+Simulates N concurrent PCM streams from WAV files and reports per-session latency.
+"""
+
+import sys
+import json
+import time
+import wave
+import struct
+import asyncio
+import argparse
+import random
+
+
+def load_wav(path, sample_rate):
+    """Load a WAV file as 16-bit mono PCM bytes."""
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV files are supported")
+        if wav.getframerate() != sample_rate:
+            raise ValueError(f"{path}: expected {sample_rate} Hz, got {wav.getframerate()} Hz")
+        frames = wav.readframes(wav.getnframes())
+        channels = wav.getnchannels()
+    if channels == 1:
+        return frames
+    # Keep the first channel
+    samples = struct.unpack(f"<{len(frames) // 2}h", frames)
+    return struct.pack(f"<{len(samples) // channels}h", *samples[::channels])
+
+
+def synthetic_audio(seconds, sample_rate, seed):
+    """Low-level noise used when no WAV files are given."""
+    rng = random.Random(seed)
+    count = int(seconds * sample_rate)
+    return struct.pack(f"<{count}h", *(rng.randint(-500, 500) for _ in range(count)))
+
+
+async def run_stream(args, session_id, pcm, results):
+    """Stream one session's audio and collect its captions."""
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    header = {"session": session_id, "sample_rate": args.sample_rate}
+    if args.key:
+        header["key"] = args.key
+    writer.write((json.dumps(header) + "\n").encode("utf-8"))
+    
+    total_bytes = int(args.duration * args.sample_rate) * 2
+    frame_bytes = int(args.sample_rate * args.frame_ms / 1000) * 2
+    latencies = []
+    server_latencies = []
+    start = time.monotonic()
+    
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            caption = json.loads(line)
+            # Audio end relative to the real-time send schedule
+            if not args.fast:
+                latencies.append(time.monotonic() - (start + caption["audio_end"]))
+            server_latencies.append(caption["latency"])
+    
+    receiver = asyncio.ensure_future(receive())
+    sent = 0
+    while sent < total_bytes:
+        offset = sent % len(pcm)
+        frame = pcm[offset:offset + min(frame_bytes, total_bytes - sent)]
+        writer.write(struct.pack("!I", len(frame)) + frame)
+        await writer.drain()
+        sent += len(frame)
+        if not args.fast:
+            # Pace the stream in real time
+            delay = start + sent / 2 / args.sample_rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    writer.write(struct.pack("!I", 0))
+    await writer.drain()
+    await receiver
+    writer.close()
+    results[session_id] = (latencies, server_latencies)
+
+
+def percentile(values, pct):
+    """Percentile of a list of numbers."""
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+async def run(args):
+    """Run all streams concurrently and print a latency report."""
+    if args.wav:
+        sources = [load_wav(path, args.sample_rate) for path in args.wav]
+    else:
+        sources = [synthetic_audio(10, args.sample_rate, seed) for seed in range(4)]
+    
+    results = {}
+    streams = [run_stream(args, f"session-{i:03d}", sources[i % len(sources)], results)
+               for i in range(args.streams)]
+    started = time.monotonic()
+    await asyncio.gather(*streams)
+    elapsed = time.monotonic() - started
+    
+    print("="*72)
+    print(f"{'session':14s} {'captions':>8s} {'p50 (s)':>9s} {'p95 (s)':>9s} {'max (s)':>9s} "
+          f"{'server p95':>11s}")
+    print("="*72)
+    all_latencies = []
+    for session_id in sorted(results):
+        latencies, server_latencies = results[session_id]
+        measured = latencies if latencies else server_latencies
+        all_latencies.extend(measured)
+        print(f"{session_id:14s} {len(server_latencies):8d} {percentile(measured, 50):9.3f} "
+              f"{percentile(measured, 95):9.3f} {max(measured, default=float('nan')):9.3f} "
+              f"{percentile(server_latencies, 95):11.3f}")
+    print("="*72)
+    print(f"{args.streams} streams, {elapsed:.1f} s wall time, "
+          f"overall p50={percentile(all_latencies, 50):.3f} s "
+          f"p95={percentile(all_latencies, 95):.3f} s "
+          f"max={max(all_latencies, default=float('nan')):.3f} s")
+
+
+def main():
+    """Parse arguments and run the load test."""
+    parser = argparse.ArgumentParser(description="Load generator for the headless caption server")
+    parser.add_argument("wav", nargs="*", help="16-bit WAV files to stream (cycled across sessions)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9750)
+    parser.add_argument("--key", help="client key from the server's server_clients")
+    parser.add_argument("--streams", type=int, default=10, help="number of concurrent sessions")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of audio per session")
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--frame-ms", type=int, default=100, help="audio per frame sent")
+    parser.add_argument("--fast", action="store_true",
+                        help="send as fast as possible instead of in real time "
+                             "(reports server-side latency only)")
+    args = parser.parse_args()
+    
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Soak test for long captioning sessions.
+Runs the capture-to-caption pipeline with synthetic audio and fake backends
+for many simulated hours at accelerated speed, samples RSS, Python heap,
+threads and open handles, and exits non-zero if any of them (or latency)
+drifts beyond its threshold.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from audio.block_queue import BlockQueue
+from pipeline import CaptionPipeline
+from utils.config import Config
+from utils.event_log import events
+from utils.resilience import Backend, FallbackChain
+
+
+WORDS = ["今日", "は", "とても", "良い", "天気", "です", "ね", "明日", "も", "晴れ", "会議", "資料",
+         "確認", "お願い", "します", "山田さん", "次", "の", "議題", "に", "移り", "ましょう"]
+
+
+def rss_bytes():
+    """Resident set size of this process, or None if it can't be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def open_handles():
+    """Open file descriptors (handles on Windows), or None if they can't be counted."""
+    try:
+        import psutil
+        process = psutil.Process()
+        return process.num_handles() if os.name == "nt" else process.num_fds()
+    except ImportError:
+        pass
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def percentile(values, pct):
+    """Percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+class SyntheticAudioSource:
+    """
+    Capture stand-in producing utterances of tone separated by silence,
+    paced at speed times real time, into the same bounded queue and
+    speech segmenter as AudioCapture.
+    """
+    
+    def __init__(self, segmenter, sample_rate=16000, chunk_size=1024, speed=100.0, rng=None,
+                 samples=0, max_queue_seconds=30):
+        """
+        Args:
+            segmenter: SpeechSegmenter cutting the audio into windows
+            rng: random.Random shared across rebuilds
+            samples: Samples produced by the sources this one replaces
+        """
+        self.segmenter = segmenter
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.channels = 1
+        self.speed = speed
+        self.rng = rng or random.Random(0)
+        self.audio_queue = BlockQueue(max(1, int(sample_rate / chunk_size * max_queue_seconds)))
+        self.samples = samples
+        self.is_running = False
+        self.thread = None
+        t = np.arange(chunk_size) / sample_rate
+        self.tones = [(3000 * np.sin(2 * np.pi * freq * t)).astype(np.int16).tobytes()
+                      for freq in (180, 220, 260, 300)]
+        self.silence = np.zeros(chunk_size, dtype=np.int16).tobytes()
+    
+    def start(self):
+        if not self.is_running:
+            self.is_running = True
+            self.thread = threading.Thread(target=self._produce, daemon=True, name="synthetic-capture")
+            self.thread.start()
+    
+    def stop(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.audio_queue.put(None)
+    
+    def close(self):
+        if self.is_running:
+            self.stop()
+    
+    def _produce(self):
+        started = time.perf_counter()
+        first_sample = self.samples
+        while self.is_running:
+            speech = self.rng.random() < 0.6
+            seconds = self.rng.uniform(1.0, 6.0) if speech else self.rng.uniform(0.5, 5.0)
+            tone = self.rng.choice(self.tones)
+            for _ in range(int(seconds * self.sample_rate / self.chunk_size)):
+                if not self.is_running:
+                    return
+                # A fresh bytes object per block, as PyAudio's stream.read returns
+                data = bytes(tone if speech else self.silence)
+                self.samples += self.chunk_size
+                for item in self.segmenter.process(data):
+                    self.audio_queue.put(item)
+                due = started + (self.samples - first_sample) / self.sample_rate / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    
+    def get_audio_chunk(self, duration_seconds=3):
+        num_chunks = int(self.sample_rate / self.chunk_size * duration_seconds)
+        chunks = self.segmenter.next_window(self.audio_queue, num_chunks)
+        return b''.join(chunks) if chunks else None
+
+
+class FakeRecognizer:
+    """AudioProcessor stand-in: a fallback chain around a fake recognition backend."""
+    
+    def __init__(self, speed, rng, latency=0.4, min_process_interval=0):
+        self.speed = speed
+        self.rng = rng
+        self.latency = latency
+        self.min_process_interval = min_process_interval
+        self.on_partial = None
+        self.chain = FallbackChain([Backend("fake_recognition", self._recognize, timeout=5)])
+    
+    def _recognize(self, audio):
+        time.sleep(self.latency / self.speed)
+        if self.rng.random() < 0.5:
+            # Recurring phrases: translation cache and memory hits
+            return "".join(self.rng.choice(WORDS[:8]) for _ in range(4))
+        # New phrases churn the cache and the translation memory
+        return "".join(self.rng.choice(WORDS) for _ in range(6)) + str(self.rng.getrandbits(32))
+    
+    def process_audio(self, audio_data):
+        _, text = self.chain.call(audio_data)
+        return text
+    
+    def shutdown(self):
+        self.chain.shutdown()
+
+
+class CaptionCounter:
+    """Caption window stand-in counting the captions it is given."""
+    
+    def __init__(self):
+        self.captions = 0
+        self.fade_duration = None
+    
+    def update_caption(self, text):
+        self.captions += 1
+    
+    def set_fade_duration(self, duration_ms):
+        self.fade_duration = duration_ms
+
+
+class SoakPipeline(CaptionPipeline):
+    """
+    CaptionPipeline on the shipped default config, with synthetic audio and
+    fake backends whose latencies are scaled by the soak speed.
+    """
+    
+    def __init__(self, directory, speed, seed=0, translation_latency=0.15):
+        config = Config(os.path.join(directory, "config.json"))
+        # Keep the soak's files out of the working directory
+        config.set("translation_memory_dir", os.path.join(directory, "translation_memory"))
+        config.set("glossary_path", os.path.join(directory, "glossary.json"))
+        # Simulated time runs speed times faster than the deduplicator's clock
+        config.set("dedup_max_age_seconds", config.get("dedup_max_age_seconds", 5) / speed)
+        config.save_config()
+        with open(config.get("glossary_path"), "w", encoding="utf-8") as f:
+            json.dump({"山田さん": "Mr. Yamada"}, f, ensure_ascii=False)
+        super().__init__(config)
+        self.speed = speed
+        self.rng = random.Random(seed)
+        self.translation_latency = translation_latency
+        self.caption_windows_created = 0
+        self.samples = 0
+        self.latencies = []
+        self.windows = 0
+        self._init_components()
+    
+    def _create_audio_source(self, sample_rate, chunk_size, segmenter):
+        return SyntheticAudioSource(segmenter, sample_rate=sample_rate, chunk_size=chunk_size,
+                                    speed=self.speed, rng=self.rng, samples=self.samples)
+    
+    def _create_processor(self, processor_kwargs):
+        return FakeRecognizer(self.speed, self.rng,
+                              min_process_interval=processor_kwargs["min_process_interval"])
+    
+    def _translation_backends(self):
+        return [Backend("fake_translate", self._translate, timeout=5)]
+    
+    def _create_caption_window(self):
+        self.caption_windows_created += 1
+        return CaptionCounter()
+    
+    def _translate(self, text):
+        time.sleep(self.translation_latency / self.speed)
+        return f"EN({text})"
+    
+    def _handle_recognition(self, japanese_text, audio_times=(None, None)):
+        super()._handle_recognition(japanese_text, audio_times)
+        self.latencies.append(time.time() - audio_times[1])
+        self.windows += 1
+    
+    def rebuild(self):
+        """Reload the config and re-initialize the components, as saving the settings does."""
+        self.config.reload()
+        self.stop_capture()
+        # The new source carries on the simulated timeline
+        self.samples = self.audio_capture.samples
+        self._init_components()
+        self.start_capture()
+    
+    @property
+    def position(self):
+        """Samples of synthetic audio produced so far."""
+        return self.audio_capture.samples
+
+
+def run_soak(hours=8.0, speed=200.0, sample_minutes=15, rebuild_minutes=60, seed=0, verbose=True):
+    """
+    Run the pipeline for hours of simulated audio.
+    
+    Returns:
+        List of samples: dicts with hours, rss_mb, heap_mb, threads, handles,
+        latency_p95_ms, windows, dropped_blocks, cache_size, memory_entries
+        and caption_windows
+    """
+    directory = tempfile.mkdtemp(prefix="soak-")
+    events.configure(path=os.path.join(directory, "events.jsonl"), max_bytes=256 * 1024,
+                     backup_count=2, console=False)
+    tracemalloc.start()
+    pipeline = SoakPipeline(directory, speed, seed=seed)
+    samples = []
+    sample_rate = pipeline.audio_capture.sample_rate
+    next_sample = sample_minutes * 60 * sample_rate
+    next_rebuild = rebuild_minutes * 60 * sample_rate
+    end = hours * 3600 * sample_rate
+    # Simulated seconds between checks of the position
+    poll = 5 / speed
+    
+    pipeline.start_capture()
+    try:
+        while pipeline.position < end:
+            time.sleep(poll)
+            if pipeline.position >= next_rebuild:
+                pipeline.rebuild()
+                next_rebuild += rebuild_minutes * 60 * sample_rate
+            if pipeline.position >= next_sample:
+                next_sample += sample_minutes * 60 * sample_rate
+                rss = rss_bytes()
+                handles = open_handles()
+                latencies, pipeline.latencies = pipeline.latencies, []
+                sample = {
+                    "hours": pipeline.position / sample_rate / 3600,
+                    "rss_mb": rss / 1e6 if rss is not None else None,
+                    "heap_mb": tracemalloc.get_traced_memory()[0] / 1e6,
+                    "threads": threading.active_count(),
+                    "handles": handles,
+                    "latency_p95_ms": percentile(latencies, 95) * 1000,
+                    "windows": pipeline.windows,
+                    "dropped_blocks": pipeline.audio_capture.audio_queue.dropped,
+                    "cache_size": len(pipeline.translator.translation_cache),
+                    "memory_entries": len(pipeline.translator.memory),
+                    "caption_windows": pipeline.caption_windows_created,
+                }
+                samples.append(sample)
+                if verbose:
+                    print(f"  {sample['hours']:5.2f} h  RSS={sample['rss_mb'] or 0:7.1f} MB  "
+                          f"heap={sample['heap_mb']:6.2f} MB  threads={sample['threads']:3d}  "
+                          f"handles={sample['handles'] or 0:4d}  p95={sample['latency_p95_ms']:6.1f} ms  "
+                          f"windows={sample['windows']}  dropped={sample['dropped_blocks']}  "
+                          f"cache={sample['cache_size']}  memory={sample['memory_entries']}")
+    finally:
+        pipeline.close_components()
+        events.flush()
+        events.configure(path=None)
+        tracemalloc.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+    return samples
+
+
+def check_drift(samples, max_rss_growth_mb=25.0, max_heap_growth_mb=5.0, max_latency_growth=1.5,
+                warmup_fraction=0.25):
+    """
+    Compare the end of the run with the samples just after warm-up.
+    
+    Memory and latency compare medians; threads and handles compare maxima,
+    since executors start their threads lazily. Re-initialization must
+    reuse the one caption window.
+    
+    Returns:
+        List of failure messages (empty if nothing drifted)
+    """
+    if len(samples) < 6:
+        return ["too few samples to judge drift; run longer or sample more often"]
+    start = int(len(samples) * warmup_fraction)
+    window = max(3, len(samples) // 4)
+    baseline = samples[start:start + window]
+    tail = samples[-window:]
+    failures = []
+    
+    def median(group, key):
+        values = sorted(s[key] for s in group if s[key] is not None)
+        return values[len(values) // 2] if values else None
+    
+    def maximum(group, key):
+        values = [s[key] for s in group if s[key] is not None]
+        return max(values) if values else None
+    
+    windows_created = maximum(samples, "caption_windows")
+    if windows_created != 1:
+        failures.append(f"{windows_created} caption windows created; re-initialization must reuse it")
+    
+    before, after = median(baseline, "rss_mb"), median(tail, "rss_mb")
+    if before is not None and after - before > max_rss_growth_mb:
+        failures.append(f"RSS grew {after - before:.1f} MB (limit {max_rss_growth_mb} MB)")
+    before, after = median(baseline, "heap_mb"), median(tail, "heap_mb")
+    if after - before > max_heap_growth_mb:
+        failures.append(f"Python heap grew {after - before:.2f} MB (limit {max_heap_growth_mb} MB)")
+    for key, label in [("threads", "threads"), ("handles", "open handles")]:
+        before, after = maximum(baseline, key), maximum(tail, key)
+        if before is not None and after > before:
+            failures.append(f"{label} grew from {before} to {after}")
+    before, after = median(baseline, "latency_p95_ms"), median(tail, "latency_p95_ms")
+    # A few milliseconds of scheduling noise are not drift
+    if after > before * max_latency_growth + 5:
+        failures.append(f"latency p95 grew from {before:.1f} ms to {after:.1f} ms")
+    return failures
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Soak test for long captioning sessions")
+    parser.add_argument("--hours", type=float, default=8, help="simulated hours of audio")
+    parser.add_argument("--speed", type=float, default=200, help="simulated seconds per real second")
+    parser.add_argument("--sample-minutes", type=float, default=15,
+                        help="simulated minutes between resource samples")
+    parser.add_argument("--rebuild-minutes", type=float, default=60,
+                        help="simulated minutes between component rebuilds (settings saves)")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=25)
+    parser.add_argument("--max-heap-growth-mb", type=float, default=5)
+    parser.add_argument("--max-latency-growth", type=float, default=1.5,
+                        help="allowed ratio of final to baseline p95 latency")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    print(f"Soak test: {args.hours} simulated hours at {args.speed}x "
+          f"(about {args.hours * 3600 / args.speed / 60:.1f} minutes)")
+    samples = run_soak(args.hours, args.speed, args.sample_minutes, args.rebuild_minutes, args.seed)
+    failures = check_drift(samples, args.max_rss_growth_mb, args.max_heap_growth_mb,
+                           args.max_latency_growth)
+    if failures:
+        print("✗ Soak test failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("✓ Memory, threads, handles and latency stayed bounded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
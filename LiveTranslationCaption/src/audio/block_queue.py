@@ -0,0 +1,52 @@
+import queue
+
+from audio.segmenter import END_OF_SPEECH, SPEECH_PAUSE
+
+
+# Control markers are never discarded: the segmenter's speech markers and
+# the None shutdown sentinel
+CONTROL_MARKERS = (None, END_OF_SPEECH, SPEECH_PAUSE)
+
+
+def _is_marker(item):
+    """Whether a queued item is a control marker rather than an audio block."""
+    return any(item is marker for marker in CONTROL_MARKERS)
+
+
+class BlockQueue(queue.Queue):
+    """
+    Bounded queue of captured audio blocks that never blocks the producer.
+    
+    When the consumer falls behind and the queue is full, the oldest audio
+    block is discarded to make room. Control markers (end of speech, speech
+    pauses and the shutdown sentinel) are always kept, even if that takes
+    the queue past maxsize. Memory stays bounded however long the
+    backlog lasts, and captions resume from recent audio instead of working
+    through minutes of stale audio.
+    """
+    
+    def __init__(self, maxsize):
+        """
+        Args:
+            maxsize: Blocks kept before the oldest are discarded
+        """
+        super().__init__(maxsize)
+        self.dropped = 0
+    
+    def put(self, item, block=True, timeout=None):
+        """Queue an item, discarding the oldest audio block if full (never blocks)."""
+        with self.mutex:
+            if 0 < self.maxsize <= self._qsize():
+                for i, queued in enumerate(self.queue):
+                    if not _is_marker(queued):
+                        del self.queue[i]
+                        self.unfinished_tasks -= 1
+                        self.dropped += 1
+                        break
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+    
+    def put_nowait(self, item):
+        """Same as put(); it never blocks."""
+        self.put(item)
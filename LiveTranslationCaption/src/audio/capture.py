@@ -5,15 +5,29 @@ import queue
 import time
 import numpy as np
 
+from audio.block_queue import BlockQueue
+from audio.journal import FLAG_OVERFLOW, FLAG_READ_ERROR
+from utils.event_log import events
+
 
 class AudioCapture:
     """Captures system audio using PyAudio with loopback mode."""
     
-    def __init__(self, sample_rate=16000, chunk_size=1024, channels=1):
+    def __init__(self, sample_rate=16000, chunk_size=1024, channels=1, ring=None, journal=None,
+                 segmenter=None, max_queue_seconds=30):
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
         self.channels = channels
-        self.audio_queue = queue.Queue()
+        # Bounded: if processing stalls, the oldest audio is discarded
+        self.audio_queue = BlockQueue(max(1, int(sample_rate / chunk_size * max_queue_seconds)))
+        # Optional SharedAudioRing; when set, the queue carries (start, end)
+        # sample positions instead of audio bytes
+        self.ring = ring
+        # Optional CaptureJournal recording everything captured
+        self.journal = journal
+        # Optional SpeechSegmenter; when set, only speech is queued and
+        # get_audio_chunk() blocks until there is some
+        self.segmenter = segmenter
         self.is_running = False
         self.thread = None
         self.pyaudio_instance = pyaudio.PyAudio()
@@ -68,22 +82,51 @@ class AudioCapture:
                 stream_callback=None
             )
             
-            print("Audio stream opened successfully")
+            events.info("capture.stream_opened", "Audio stream opened successfully")
+            
+            # Samples the stream should have delivered by now, to notice
+            # audio silently dropped on input overflow
+            clock_start = time.monotonic()
+            captured = 0
+            flags = 0
+            dropped = 0
             
             while self.is_running:
                 try:
                     data = stream.read(self.chunk_size, exception_on_overflow=False)
-                    self.audio_queue.put(data)
+                    if self.journal is not None:
+                        captured += self.chunk_size
+                        behind = (time.monotonic() - clock_start) * self.sample_rate - captured
+                        if behind > 2 * self.chunk_size:
+                            flags |= FLAG_OVERFLOW
+                            clock_start = time.monotonic() - captured / self.sample_rate
+                        self.journal.write(data, flags)
+                        flags = 0
+                    item = self.ring.write(data) if self.ring is not None else data
+                    if self.segmenter is not None:
+                        for queued in self.segmenter.process(data, item):
+                            self.audio_queue.put(queued)
+                    else:
+                        self.audio_queue.put(item)
+                    if self.audio_queue.dropped != dropped:
+                        dropped = self.audio_queue.dropped
+                        events.warning("capture.queue_full",
+                                       "Processing is falling behind; dropping the oldest audio",
+                                       dropped_blocks=dropped)
                 except Exception as e:
-                    print(f"Error reading audio: {e}")
+                    events.error("capture.read_error", f"Error reading audio: {e}")
+                    flags |= FLAG_READ_ERROR
                     time.sleep(0.1)
             
             stream.stop_stream()
             stream.close()
             
         except Exception as e:
-            print(f"Error opening audio stream: {e}")
+            events.error("capture.open_error", f"Error opening audio stream: {e}")
             self.is_running = False
+        finally:
+            # Wake a consumer waiting for speech
+            self.audio_queue.put(None)
     
     def get_audio(self, timeout=0.5):
         """Get audio data from the queue."""
@@ -93,21 +136,41 @@ class AudioCapture:
             return None
     
     def get_audio_chunk(self, duration_seconds=3):
-        """Get a chunk of audio data for the specified duration."""
+        """
+        Get a chunk of audio data for the specified duration.
+        
+        Returns:
+            Audio bytes, or a (start, end) sample range of the shared ring
+            when capturing into one. None if no audio was captured.
+        """
         chunks = []
         num_chunks = int(self.sample_rate / self.chunk_size * duration_seconds)
-        
-        for _ in range(num_chunks):
-            data = self.get_audio(timeout=0.1)
-            if data:
-                chunks.append(data)
+        if self.segmenter is not None:
+            # Parked on the queue until speech starts; no polling while idle
+            chunks = self.segmenter.next_window(self.audio_queue, num_chunks)
+        else:
+            # Allow for large capture blocks, which arrive less often than every 0.1 s
+            timeout = max(0.1, 2 * self.chunk_size / self.sample_rate)
+            for _ in range(num_chunks):
+                data = self.get_audio(timeout=timeout)
+                if data:
+                    chunks.append(data)
         
         if chunks:
+            if self.ring is not None:
+                return (chunks[0][0], chunks[-1][1])
             return b''.join(chunks)
         return None
     
+    def close(self):
+        """Stop capturing and release PyAudio."""
+        if self.is_running:
+            self.stop()
+        if self.pyaudio_instance is not None:
+            self.pyaudio_instance.terminate()
+            self.pyaudio_instance = None
+    
     def __del__(self):
         """Clean up resources."""
-        self.stop()
         if hasattr(self, 'pyaudio_instance'):
-            self.pyaudio_instance.terminate()
\ No newline at end of file
+            self.close()
\ No newline at end of file
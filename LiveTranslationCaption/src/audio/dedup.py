@@ -0,0 +1,198 @@
+import time
+import zlib
+import random
+from collections import deque
+
+
+class _Hypothesis:
+    """A recent recognition kept in the dedup window."""
+    
+    def __init__(self, text, key, signature, time):
+        self.text = text
+        self.key = key
+        self.signature = signature
+        self.time = time
+
+
+class RecognitionDeduplicator:
+    """
+    Suppresses repeated recognitions and trims overlap between consecutive ones.
+    
+    Overlapping audio windows (or looping audio) make the recognizer return
+    the same sentence, or a sentence whose beginning repeats the end of the
+    previous one. A short rolling window of recent hypotheses is compared
+    against each new one using character n-gram MinHash as a cheap prefilter
+    and banded edit distance as the final check.
+    
+    Hypotheses expire after max_age_seconds (about the overlap between
+    windows), so a phrase that is actually said again later is kept. A
+    hypothesis contained in a recent one is only suppressed when it ends
+    where the recent one ends (the overlapping audio) or is at least
+    min_substring characters long; short words like "はい" said on their own
+    are not mistaken for repeats.
+    """
+    
+    _PRIME = (1 << 61) - 1
+    
+    def __init__(self, window_size=8, ngram_size=3, num_hashes=32,
+                 similarity_threshold=0.8, min_overlap=6, max_age_seconds=5.0,
+                 min_substring=12, seed=1, clock=time.monotonic):
+        self.window_size = window_size
+        self.ngram_size = ngram_size
+        self.num_hashes = num_hashes
+        self.similarity_threshold = similarity_threshold
+        self.min_overlap = min_overlap
+        self.max_age_seconds = max_age_seconds
+        self.min_substring = min_substring
+        self.clock = clock
+        self.recent = deque(maxlen=window_size)
+        
+        rng = random.Random(seed)
+        self._hash_params = [
+            (rng.randrange(1, self._PRIME), rng.randrange(0, self._PRIME))
+            for _ in range(num_hashes)
+        ]
+        
+        # Statistics
+        self.suppressed_count = 0
+        self.trimmed_count = 0
+    
+    def filter(self, text):
+        """
+        Filter a new recognition against the recent window.
+        
+        Args:
+            text: Recognized text
+        
+        Returns:
+            Text with any overlapping prefix removed, or None if the text is
+            a repeat of something recently recognized
+        """
+        if not text:
+            return None
+        text = " ".join(text.split())
+        if not text:
+            return None
+        
+        now = self.clock()
+        while self.recent and now - self.recent[0].time > self.max_age_seconds:
+            self.recent.popleft()
+        
+        key = self._normalize(text)
+        signature = self._minhash(key)
+        
+        if self._is_repeat(key, signature):
+            self.suppressed_count += 1
+            return None
+        
+        if self.recent:
+            overlap = self._overlap_length(self.recent[-1].key, key)
+            if overlap:
+                remainder = text[overlap:].strip()
+                if len(remainder) < self.min_overlap:
+                    self.suppressed_count += 1
+                    return None
+                self.trimmed_count += 1
+                self.recent.append(_Hypothesis(text, key, signature, now))
+                return remainder
+        
+        self.recent.append(_Hypothesis(text, key, signature, now))
+        return text
+    
+    def reset(self):
+        """Forget all recent hypotheses."""
+        self.recent.clear()
+    
+    def _normalize(self, text):
+        """Lower-case the text when that keeps character offsets aligned."""
+        lowered = text.lower()
+        return lowered if len(lowered) == len(text) else text
+    
+    def _ngrams(self, key):
+        """Character n-grams of a normalized hypothesis."""
+        n = self.ngram_size
+        if len(key) <= n:
+            return {key}
+        return {key[i:i + n] for i in range(len(key) - n + 1)}
+    
+    def _minhash(self, key):
+        """MinHash signature of the character n-gram set."""
+        hashes = [zlib.crc32(gram.encode("utf-8")) for gram in self._ngrams(key)]
+        prime = self._PRIME
+        return tuple(
+            min((a * h + b) % prime for h in hashes)
+            for a, b in self._hash_params
+        )
+    
+    def _estimated_similarity(self, sig_a, sig_b):
+        """Estimated Jaccard similarity from two MinHash signatures."""
+        matches = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+        return matches / self.num_hashes
+    
+    def _is_repeat(self, key, signature):
+        """Check whether the hypothesis repeats or is covered by a recent one."""
+        for previous in self.recent:
+            position = previous.key.rfind(key)
+            if position >= 0 and (len(key) >= self.min_substring
+                                  or position + len(key) >= len(previous.key) - 1):
+                return True
+            # MinHash has sampling error; keep the prefilter a bit looser
+            # than the threshold and let edit distance make the decision.
+            estimate = self._estimated_similarity(signature, previous.signature)
+            if estimate < self.similarity_threshold - 0.2:
+                continue
+            longest = max(len(key), len(previous.key))
+            max_distance = int(longest * (1 - self.similarity_threshold))
+            if banded_edit_distance(key, previous.key, max_distance) <= max_distance:
+                return True
+        return False
+    
+    def _overlap_length(self, previous, key):
+        """
+        Length of the longest prefix of key that matches a suffix of previous.
+        
+        Small recognition differences are tolerated in proportion to the
+        overlap length.
+        """
+        longest = min(len(previous), len(key))
+        for length in range(longest, self.min_overlap - 1, -1):
+            max_distance = length // 10
+            suffix = previous[-length:]
+            prefix = key[:length]
+            if banded_edit_distance(suffix, prefix, max_distance) <= max_distance:
+                return length
+        return 0
+
+
+def banded_edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance restricted to a diagonal band.
+    
+    Returns max_distance + 1 as soon as the distance is known to exceed
+    max_distance, which keeps the cost at O(len * max_distance).
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+    
+    limit = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [limit] * (len(b) + 1)
+        if low == 1:
+            current[0] = i
+        row_min = current[0] if low == 1 else limit
+        char_a = a[i - 1]
+        for j in range(low, high + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return limit
+        previous = current
+    return min(previous[len(b)], limit)
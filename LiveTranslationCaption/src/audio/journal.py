@@ -0,0 +1,518 @@
+import os
+import json
+import mmap
+import time
+import queue
+import struct
+import bisect
+import threading
+from datetime import datetime
+
+
+# Index record flags
+FLAG_OVERFLOW = 0x1      # samples were lost before this chunk (input overflow)
+FLAG_READ_ERROR = 0x2    # the capture stream reported an error before this chunk
+
+# start sample, sample count, wall-clock time of the first sample, flags
+INDEX_RECORD = struct.Struct("<QIdI")
+
+METADATA_FILE = "journal.json"
+
+
+def _segment_name(start_sample):
+    """File name (without extension) of the segment starting at a sample."""
+    return f"segment-{start_sample:016d}"
+
+
+def parse_time(value):
+    """Parse a wall-clock time given as epoch seconds or an ISO 8601 string."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class CaptureJournal:
+    """
+    Always-on recording of captured PCM for exact replay.
+    
+    Audio is appended to fixed-size segment files that are memory-mapped, so
+    a write from the capture thread is a memory copy rather than a system
+    call. Next to every segment is a compact index with one record per
+    captured chunk: (sample position, sample count, wall-clock time, flags).
+    Sample positions count every sample ever journaled, so a position names
+    the same audio in every segment and across restarts.
+    
+    Index records are buffered in memory and appended to the index file by
+    a writer thread every flush_interval seconds. The writer thread also
+    prepares the next segment file ahead of time, finishes full segments
+    and deletes the oldest segments when the total size exceeds the disk
+    budget, so rotating to a new segment on the capture thread only swaps
+    in the prepared mapping.
+    """
+    
+    def __init__(self, directory="journal", sample_rate=16000, channels=1,
+                 segment_seconds=60, max_disk_mb=500, flush_interval=0.5):
+        """
+        Args:
+            directory: Directory holding the segment and index files
+            sample_rate: Sample rate of the journaled audio
+            channels: Number of interleaved channels
+            segment_seconds: Audio per segment file
+            max_disk_mb: Disk budget for all segments and indexes
+            flush_interval: Seconds between appends of buffered index records
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_bytes = 2 * channels
+        self.segment_frames = int(segment_seconds * sample_rate)
+        self.segment_bytes = self.segment_frames * self.frame_bytes
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.flush_interval = flush_interval
+        
+        self.position = 0
+        self.segment_start = None
+        self.segment_offset = 0
+        self._file = None
+        self._map = None
+        # Index records of the current segment not yet appended to its index
+        self._index_buffer = bytearray()
+        # (start sample, file, map) of the segment file prepared for the next rotation
+        self._spare = None
+        self._lock = threading.Lock()
+        # Full segments for the writer thread to finish; None stops it
+        self._jobs = queue.Queue()
+        
+        os.makedirs(directory, exist_ok=True)
+        self._open_journal()
+        self._spare = self._create_segment(self.position)
+        self._writer = threading.Thread(target=self._run, daemon=True, name="journal-writer")
+        self._writer.start()
+    
+    def _open_journal(self):
+        """Check the metadata of an existing journal and continue after it."""
+        metadata = {"sample_rate": self.sample_rate, "channels": self.channels, "sample_width": 2}
+        path = os.path.join(self.directory, METADATA_FILE)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+            if existing != metadata:
+                # Audio in a different format can't share sample positions
+                print(f"Journal format changed ({existing} -> {metadata}); discarding old segments")
+                for start, _ in _list_segments(self.directory):
+                    self._remove_segment(start)
+            else:
+                reader = JournalReader(self.directory)
+                self.position = reader.end_sample
+        # Segment files without an index hold no indexed audio (unused spares)
+        indexed = {os.path.basename(base) for _, base in _list_segments(self.directory)}
+        for name in os.listdir(self.directory):
+            if (name.startswith("segment-") and name.endswith(".pcm")
+                    and name[:-len(".pcm")] not in indexed):
+                os.remove(os.path.join(self.directory, name))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+    
+    def write(self, data, flags=0, wall_time=None):
+        """
+        Append one captured chunk.
+        
+        Args:
+            data: PCM bytes (16-bit, interleaved channels)
+            flags: FLAG_* bits describing the capture before this chunk
+            wall_time: Wall-clock time of the first sample (default: now,
+                       minus the chunk duration)
+        
+        Returns:
+            Sample position of the first sample of the chunk
+        """
+        frames = len(data) // self.frame_bytes
+        if wall_time is None:
+            wall_time = time.time() - frames / self.sample_rate
+        with self._lock:
+            start = self.position
+            view = memoryview(data)[:frames * self.frame_bytes]
+            first_chunk = True
+            while view:
+                if self._map is None or self.segment_offset >= self.segment_bytes:
+                    self._rotate()
+                count = min(len(view), self.segment_bytes - self.segment_offset)
+                self._map[self.segment_offset:self.segment_offset + count] = view[:count]
+                # A chunk that spans two segments gets one record in each
+                record_frames = count // self.frame_bytes
+                record_time = wall_time + (self.position - start) / self.sample_rate
+                self._index_buffer += INDEX_RECORD.pack(self.position, record_frames, record_time,
+                                                        flags if first_chunk else 0)
+                self.segment_offset += count
+                self.position += record_frames
+                view = view[count:]
+                first_chunk = False
+            return start
+    
+    def _rotate(self):
+        """Hand the current segment to the writer thread and start a new one."""
+        if self._map is not None:
+            self._jobs.put(self._take_segment())
+        spare, self._spare = self._spare, None
+        if spare is None or spare[0] != self.position:
+            # The writer thread has not caught up; prepare the segment here
+            if spare is not None:
+                self._jobs.put(("discard",) + spare)
+            spare = self._create_segment(self.position)
+        self.segment_start, self._file, self._map = spare
+        self.segment_offset = 0
+    
+    def _take_segment(self):
+        """Detach the current segment and its unwritten index records."""
+        segment = ("finish", self.segment_start, self._file, self._map, self.segment_offset,
+                   bytes(self._index_buffer))
+        self._index_buffer.clear()
+        self._map = self._file = None
+        return segment
+    
+    def _create_segment(self, start):
+        """Create and map an empty segment file starting at a sample position."""
+        base = os.path.join(self.directory, _segment_name(start))
+        file = open(base + ".pcm", "w+b")
+        file.truncate(self.segment_bytes)
+        return start, file, mmap.mmap(file.fileno(), self.segment_bytes)
+    
+    def _run(self):
+        """Writer thread: append index records, finish segments, keep a spare ready."""
+        while True:
+            try:
+                job = self._jobs.get(timeout=self.flush_interval)
+            except queue.Empty:
+                job = None
+            else:
+                if job is None:
+                    return
+            try:
+                if job is not None:
+                    self._do_job(job)
+                self._flush_index()
+                with self._lock:
+                    need_spare = self._spare is None and self.segment_start is not None
+                    next_start = (self.segment_start or 0) + self.segment_frames
+                if need_spare:
+                    spare = self._create_segment(next_start)
+                    with self._lock:
+                        if (self._spare is None
+                                and next_start == self.segment_start + self.segment_frames):
+                            self._spare, spare = spare, None
+                    if spare is not None:
+                        self._do_job(("discard",) + spare)
+            except OSError as e:
+                print(f"Journal writer error: {e}")
+    
+    def _do_job(self, job):
+        """Finish a full segment, or delete an unused spare."""
+        if job[0] == "finish":
+            _, start, file, segment_map, offset, records = job
+            self._append_index(start, records)
+            segment_map.flush()
+            segment_map.close()
+            file.truncate(offset)
+            file.close()
+            self._enforce_budget(protect=self.segment_start)
+        else:
+            _, start, file, segment_map = job
+            segment_map.close()
+            file.close()
+            os.remove(os.path.join(self.directory, _segment_name(start)) + ".pcm")
+    
+    def _flush_index(self):
+        """Append the buffered index records of the current segment."""
+        with self._lock:
+            if not self._index_buffer:
+                return
+            start = self.segment_start
+            records = bytes(self._index_buffer)
+            self._index_buffer.clear()
+        self._append_index(start, records)
+    
+    def _append_index(self, start, records):
+        """Append index records to the index file of a segment."""
+        if records:
+            with open(os.path.join(self.directory, _segment_name(start)) + ".idx", "ab") as f:
+                f.write(records)
+    
+    def _enforce_budget(self, protect=None):
+        """Delete the oldest segments until the journal fits the disk budget."""
+        segments = _list_segments(self.directory)
+        total = 0
+        for start, base in segments:
+            for ext in (".pcm", ".idx"):
+                try:
+                    total += os.path.getsize(base + ext)
+                except OSError:
+                    pass
+        for start, base in segments:
+            if total <= self.max_disk_bytes or start == protect:
+                break
+            for ext in (".pcm", ".idx"):
+                try:
+                    total -= os.path.getsize(base + ext)
+                except OSError:
+                    pass
+            self._remove_segment(start)
+    
+    def _remove_segment(self, start):
+        """Delete one segment and its index."""
+        base = os.path.join(self.directory, _segment_name(start))
+        for ext in (".pcm", ".idx"):
+            try:
+                os.remove(base + ext)
+            except FileNotFoundError:
+                pass
+    
+    def close(self):
+        """Stop the writer thread, then flush and close the current segment."""
+        if self._writer.is_alive():
+            self._jobs.put(None)
+            self._writer.join()
+        # Segments handed over after the writer stopped
+        while not self._jobs.empty():
+            job = self._jobs.get_nowait()
+            if job is not None:
+                self._do_job(job)
+        with self._lock:
+            if self._map is not None:
+                self._do_job(self._take_segment())
+            if self._spare is not None:
+                self._do_job(("discard",) + self._spare)
+                self._spare = None
+
+
+def _list_segments(directory):
+    """(start sample, base path) of every segment, oldest first."""
+    segments = []
+    for name in os.listdir(directory):
+        if name.startswith("segment-") and name.endswith(".idx"):
+            base = name[:-len(".idx")]
+            segments.append((int(base[len("segment-"):]), os.path.join(directory, base)))
+    segments.sort()
+    return segments
+
+
+class JournalReader:
+    """Random access to the audio and index of a capture journal."""
+    
+    def __init__(self, directory="journal"):
+        self.directory = directory
+        with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.sample_rate = metadata["sample_rate"]
+        self.channels = metadata["channels"]
+        self.frame_bytes = 2 * self.channels
+        
+        # Index records of all segments, in sample order
+        self.records = []
+        self._segments = []
+        for start, base in _list_segments(directory):
+            with open(base + ".idx", "rb") as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % INDEX_RECORD.size
+            records = [INDEX_RECORD.unpack_from(raw, offset)
+                       for offset in range(0, usable, INDEX_RECORD.size)]
+            if records:
+                self.records.extend(records)
+                end = records[-1][0] + records[-1][1]
+                self._segments.append((start, end, base + ".pcm"))
+        self._record_starts = [record[0] for record in self.records]
+        self._record_times = [record[2] for record in self.records]
+    
+    @property
+    def start_sample(self):
+        """Oldest sample still in the journal."""
+        return self._segments[0][0] if self._segments else 0
+    
+    @property
+    def end_sample(self):
+        """One past the newest journaled sample."""
+        return self._segments[-1][1] if self._segments else 0
+    
+    def time_range(self):
+        """Wall-clock time of the oldest and the end of the newest audio."""
+        if not self.records:
+            return None, None
+        last = self.records[-1]
+        return self.records[0][2], last[2] + last[1] / self.sample_rate
+    
+    def sample_at(self, wall_time):
+        """Sample position captured at (or nearest after) a wall-clock time."""
+        if not self.records:
+            return 0
+        i = bisect.bisect_right(self._record_times, wall_time) - 1
+        if i < 0:
+            return self.records[0][0]
+        start, count, record_time, _ = self.records[i]
+        offset = int(round((wall_time - record_time) * self.sample_rate))
+        return start + max(0, min(count, offset))
+    
+    def records_between(self, start_sample, end_sample):
+        """Index records overlapping a sample range."""
+        first = max(0, bisect.bisect_right(self._record_starts, start_sample) - 1)
+        last = bisect.bisect_left(self._record_starts, end_sample)
+        return [r for r in self.records[first:last] if r[0] + r[1] > start_sample]
+    
+    def read(self, start_sample, end_sample):
+        """
+        PCM bytes of a sample range.
+        
+        Samples missing from the journal (deleted for the disk budget, or
+        never captured) are left out.
+        """
+        chunks = []
+        for seg_start, seg_end, path in self._segments:
+            lo = max(start_sample, seg_start)
+            hi = min(end_sample, seg_end)
+            if lo >= hi:
+                continue
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+                    chunks.append(segment[(lo - seg_start) * self.frame_bytes:
+                                          (hi - seg_start) * self.frame_bytes])
+        return b"".join(chunks)
+
+
+class JournalReplaySource:
+    """
+    Feeds journaled audio back through the pipeline.
+    
+    Has the interface of AudioCapture (start, stop, get_audio,
+    get_audio_chunk, audio_queue), so it can stand in for live capture.
+    Chunks are replayed with the sizes and flags they were captured with,
+    either paced in real time (optionally scaled by speed) or as fast as
+    the consumer takes them.
+    """
+    
+    def __init__(self, directory="journal", start_time=None, end_time=None, speed=1.0,
+                 ring=None, queue_size=64, segmenter=None):
+        """
+        Args:
+            directory: Journal directory
+            start_time: Wall-clock start of the range (epoch seconds or ISO string)
+            end_time: Wall-clock end of the range
+            speed: Real-time multiplier; 0 or None replays at maximum speed
+            ring: Optional SharedAudioRing, as for AudioCapture
+            queue_size: Chunks buffered ahead of the consumer
+            segmenter: Optional SpeechSegmenter, as for AudioCapture
+        """
+        self.reader = JournalReader(directory)
+        self.sample_rate = self.reader.sample_rate
+        self.channels = self.reader.channels
+        self.start_sample = (self.reader.sample_at(parse_time(start_time))
+                             if start_time is not None else self.reader.start_sample)
+        self.end_sample = (self.reader.sample_at(parse_time(end_time))
+                           if end_time is not None else self.reader.end_sample)
+        records = self.reader.records_between(self.start_sample, self.end_sample)
+        self.chunk_size = records[0][1] if records else 1024
+        self.speed = speed
+        self.ring = ring
+        self.segmenter = segmenter
+        # Bounded so that maximum-speed replay is paced by the consumer
+        self.audio_queue = queue.Queue(maxsize=queue_size)
+        self.is_running = False
+        self.finished = False
+        self.thread = None
+    
+    def start(self):
+        """Start replaying in a separate thread."""
+        if not self.is_running:
+            self.is_running = True
+            self.finished = False
+            self.thread = threading.Thread(target=self._replay, daemon=True, name="journal-replay")
+            self.thread.start()
+            print(f"Replaying journal samples {self.start_sample}-{self.end_sample}")
+    
+    def stop(self):
+        """Stop replaying."""
+        self.is_running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        try:
+            # Wake a consumer waiting for speech
+            self.audio_queue.put_nowait(None)
+        except queue.Full:
+            pass
+        print("Journal replay stopped")
+    
+    def close(self):
+        """Stop replaying (AudioCapture interface)."""
+        if self.is_running:
+            self.stop()
+    
+    def _replay(self):
+        """Queue the journaled chunks of the range in order."""
+        started = time.perf_counter()
+        for start, count, _, flags in self.reader.records_between(self.start_sample,
+                                                                  self.end_sample):
+            if not self.is_running:
+                break
+            lo = max(start, self.start_sample)
+            hi = min(start + count, self.end_sample)
+            data = self.reader.read(lo, hi)
+            if self.speed:
+                # Deliver each chunk when it would have finished capturing
+                due = started + (hi - self.start_sample) / self.sample_rate / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            item = self.ring.write(data) if self.ring is not None else data
+            if self.segmenter is not None:
+                for queued in self.segmenter.process(data, item):
+                    self._put(queued)
+            else:
+                self._put(item)
+        self.finished = True
+        # Wake a consumer waiting for speech
+        self._put(None)
+    
+    def _put(self, item):
+        """Queue an item, waiting for room while replay is running."""
+        while self.is_running:
+            try:
+                self.audio_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def get_audio(self, timeout=0.5):
+        """Get audio data from the queue."""
+        try:
+            return self.audio_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def get_audio_chunk(self, duration_seconds=3):
+        """
+        Get a chunk of audio data for the specified duration.
+        
+        Returns:
+            Audio bytes, or a (start, end) sample range of the shared ring.
+            None if no audio is left.
+        """
+        chunks = []
+        num_chunks = int(self.sample_rate / self.chunk_size * duration_seconds)
+        if self.segmenter is not None:
+            if not (self.finished and self.audio_queue.empty()):
+                chunks = self.segmenter.next_window(self.audio_queue, num_chunks)
+        else:
+            # Allow for large capture blocks, which arrive less often than every 0.1 s
+            timeout = max(0.1, 2 * self.chunk_size / self.sample_rate)
+            for _ in range(num_chunks):
+                data = self.get_audio(timeout=timeout)
+                if data:
+                    chunks.append(data)
+                elif self.finished and self.audio_queue.empty():
+                    break
+        
+        if chunks:
+            if self.ring is not None:
+                return (chunks[0][0], chunks[-1][1])
+            return b''.join(chunks)
+        return None
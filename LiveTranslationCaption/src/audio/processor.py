@@ -3,19 +3,126 @@ import io
 import wave
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.resilience import Backend, FallbackChain, AllBackendsFailedError
+from utils.event_log import events
 
 
 class AudioProcessor:
     """Processes audio data and converts it to text using speech recognition."""
     
-    def __init__(self, language="ja-JP", energy_threshold=300):
+    def __init__(self, language="ja-JP", energy_threshold=300, timeout=None, hedge=False,
+                 local_engine=None, backends=None, min_process_interval=1.0):
+        """
+        Args:
+            language: Recognition language code (e.g. "ja-JP")
+            energy_threshold: Energy level for considering audio as speech
+            timeout: Seconds to wait for Google Speech Recognition before falling back
+            hedge: Send a duplicate request when the first one is slower than p95
+            local_engine: Optional local fallback engine ("whisper" or "sphinx")
+            backends: Optional list of Backend objects replacing the defaults
+            min_process_interval: Minimum seconds between recognitions
+        """
         self.recognizer = sr.Recognizer()
         self.language = language
         self.recognizer.energy_threshold = energy_threshold
         self.recognizer.dynamic_energy_threshold = True
         self.last_process_time = 0
-        self.min_process_interval = 1.0  # Minimum 1 second between processes
+        self.min_process_interval = min_process_interval
+        # Optional callable(text, stable) receiving partial hypotheses
+        self.on_partial = None
+        # Partial recognition of a growing segment runs on its own thread;
+        # results arriving after the window's final recognition are stale
+        self._partial_executor = None
+        self._partial_running = False
+        self._generation = 0
+        
+        if backends is None:
+            backends = [Backend("google_speech", self._recognize_google,
+                                timeout=timeout, hedge=hedge,
+                                passthrough_exceptions=(sr.UnknownValueError,))]
+            if local_engine == "whisper":
+                backends.append(Backend("whisper", self._recognize_whisper,
+                                        passthrough_exceptions=(sr.UnknownValueError,)))
+            elif local_engine == "sphinx":
+                backends.append(Backend("sphinx", self._recognize_sphinx,
+                                        passthrough_exceptions=(sr.UnknownValueError,)))
+        self.backends = FallbackChain(backends)
+        
+    def _recognize_google(self, audio):
+        """Recognize speech with Google Speech Recognition (free tier)."""
+        return self.recognizer.recognize_google(audio, language=self.language)
+    
+    def _recognize_whisper(self, audio):
+        """Recognize speech with a local Whisper model."""
+        return self.recognizer.recognize_whisper(audio, language=self.language.split("-")[0])
+    
+    def _recognize_sphinx(self, audio):
+        """Recognize speech with local CMU Sphinx."""
+        return self.recognizer.recognize_sphinx(audio, language=self.language)
+    
+    def report_partial(self, text, stable=False):
+        """
+        Pass a partial (not yet final) hypothesis on to on_partial.
+        
+        Called by recognize_partial() and by backends that recognize
+        incrementally; must not block.
+        
+        Args:
+            text: Hypothesis text
+            stable: The hypothesis is not expected to change (speech has paused)
+        """
+        if text and self.on_partial:
+            try:
+                self.on_partial(text, stable)
+            except Exception as e:
+                events.error("recognition.partial_error", f"Error handling partial hypothesis: {e}")
+    
+    def recognize_partial(self, audio_data, sample_rate=16000, sample_width=2, stable=False):
+        """
+        Recognize the audio of a segment so far and report it as a partial hypothesis.
+        
+        Runs in the background and never blocks; skipped while the previous
+        partial recognition is still running. The result is dropped if the
+        final recognition of the window has finished by then.
         
+        Args:
+            audio_data: Raw audio bytes of the segment so far
+            stable: Report the hypothesis as stable (see report_partial)
+        
+        Returns:
+            True if a partial recognition was started
+        """
+        if not audio_data or not self.on_partial or self._partial_running:
+            return False
+        if self._partial_executor is None:
+            self._partial_executor = ThreadPoolExecutor(max_workers=1,
+                                                        thread_name_prefix="partial-recognition")
+        self._partial_running = True
+        audio = sr.AudioData(audio_data, sample_rate, sample_width)
+        self._partial_executor.submit(self._run_partial, audio, self._generation, stable)
+        return True
+    
+    def _run_partial(self, audio, generation, stable):
+        """Worker: recognize one partial segment."""
+        try:
+            _, text = self.backends.call(audio)
+            if generation == self._generation:
+                self.report_partial(text, stable)
+        except (sr.UnknownValueError, AllBackendsFailedError):
+            pass
+        except Exception as e:
+            events.error("recognition.partial_error", f"Error recognizing partial segment: {e}")
+        finally:
+            self._partial_running = False
+    
+    def shutdown(self):
+        """Stop the backend worker threads."""
+        if self._partial_executor:
+            self._partial_executor.shutdown(wait=False)
+        self.backends.shutdown()
+    
     def process_audio(self, audio_data, sample_rate=16000, sample_width=2):
         """
         Process raw audio data and convert to text.
@@ -40,22 +147,27 @@ class AudioProcessor:
             # Convert raw audio data to AudioData object
             audio = sr.AudioData(audio_data, sample_rate, sample_width)
             
-            # Try Google Speech Recognition (free tier)
+            # Try each recognition backend in order
             try:
-                text = self.recognizer.recognize_google(audio, language=self.language)
+                backend, text = self.backends.call(audio)
                 self.last_process_time = current_time
-                print(f"Recognized (Japanese): {text}")
+                events.info("recognition.result", f"Recognized (Japanese): {text}",
+                            backend=backend, text=text)
                 return text
             except sr.UnknownValueError:
                 # Speech was unintelligible
                 return None
-            except sr.RequestError as e:
-                print(f"Could not request results from Google Speech Recognition; {e}")
+            except AllBackendsFailedError as e:
+                events.error("recognition.failed",
+                             f"Could not request results from speech recognition; {e}")
                 return None
                 
         except Exception as e:
-            print(f"Error processing audio: {e}")
+            events.error("recognition.error", f"Error processing audio: {e}")
             return None
+        finally:
+            # Partial hypotheses still in flight are of this window or older
+            self._generation += 1
     
     def process_audio_file(self, audio_file_path):
         """Process audio from a file."""
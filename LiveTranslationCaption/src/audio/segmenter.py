@@ -0,0 +1,145 @@
+from collections import deque
+
+import numpy as np
+
+
+# Queued after the last block of a speech segment
+END_OF_SPEECH = object()
+# Queued once speech has paused for pause_seconds, before the segment ends
+SPEECH_PAUSE = object()
+
+
+class SpeechSegmenter:
+    """
+    Energy-based speech gate between audio capture and recognition.
+    
+    The capture thread passes every block through process(), which returns
+    what to queue for the processing thread: nothing while it is silent,
+    the pre-roll and the block when speech starts, every block during
+    speech, and END_OF_SPEECH once it has been quiet for hangover_seconds.
+    The processing thread waits in next_window() on a blocking get without
+    a timeout, so while nothing is playing it stays parked and no
+    recognition or translation calls are made.
+    
+    With pause_seconds set, SPEECH_PAUSE is queued once speech has been
+    quiet that long, and next_window() hands the blocks collected so far to
+    on_pause. What was said is usually complete at that point, so it can be
+    recognized (and its translation started) while the hangover runs out.
+    """
+    
+    def __init__(self, sample_rate=16000, energy_threshold=300, hangover_seconds=0.6,
+                 pre_roll_seconds=0.3, channels=1, pause_seconds=None):
+        """
+        Args:
+            sample_rate: Audio sample rate in Hz
+            energy_threshold: RMS level of 16-bit samples above which a block is speech
+            hangover_seconds: Silence after which a speech segment ends
+            pre_roll_seconds: Audio before the speech onset kept with the segment
+            channels: Number of interleaved channels
+            pause_seconds: Silence after which SPEECH_PAUSE is queued (None: never)
+        """
+        self.energy_threshold = energy_threshold
+        self.bytes_per_sample = 2 * channels
+        self.hangover_samples = int(hangover_seconds * sample_rate)
+        self.pre_roll_max = int(pre_roll_seconds * sample_rate)
+        self.pause_samples = int(pause_seconds * sample_rate) if pause_seconds else None
+        # Optional callable receiving the blocks of a window at a speech pause
+        self.on_pause = None
+        self.speaking = False
+        self.silent_samples = 0
+        self.pre_roll = deque()
+        self.pre_roll_samples = 0
+        # Reused for every block so classifying one allocates nothing large
+        self._scratch = np.empty(0, dtype=np.float32)
+        self.stats = {"speech_blocks": 0, "silent_blocks": 0, "segments": 0}
+    
+    def rms(self, data):
+        """RMS level of 16-bit PCM audio."""
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = len(samples)
+        if not count:
+            return 0.0
+        if len(self._scratch) < count:
+            self._scratch = np.empty(count, dtype=np.float32)
+        scratch = self._scratch[:count]
+        np.copyto(scratch, samples)
+        return float(np.sqrt(np.dot(scratch, scratch) / count))
+    
+    def process(self, data, item=None):
+        """
+        Classify one captured block.
+        
+        Args:
+            data: Audio bytes of the block
+            item: What to queue for the block (defaults to data; a ring range in shared memory mode)
+        
+        Returns:
+            List of items to queue, possibly ending with END_OF_SPEECH
+        """
+        if item is None:
+            item = data
+        samples = len(data) // self.bytes_per_sample
+        loud = self.rms(data) >= self.energy_threshold
+        
+        if self.speaking:
+            self.stats["speech_blocks"] += 1
+            if loud:
+                self.silent_samples = 0
+                return [item]
+            before_pause = self.pause_samples is not None and self.silent_samples < self.pause_samples
+            self.silent_samples += samples
+            if self.silent_samples < self.hangover_samples:
+                if before_pause and self.silent_samples >= self.pause_samples:
+                    return [item, SPEECH_PAUSE]
+                return [item]
+            self.speaking = False
+            return [item, END_OF_SPEECH]
+        
+        if loud:
+            self.speaking = True
+            self.silent_samples = 0
+            self.stats["segments"] += 1
+            self.stats["speech_blocks"] += len(self.pre_roll) + 1
+            items = [queued for queued, _ in self.pre_roll]
+            items.append(item)
+            self.pre_roll.clear()
+            self.pre_roll_samples = 0
+            return items
+        
+        self.stats["silent_blocks"] += 1
+        self.pre_roll.append((item, samples))
+        self.pre_roll_samples += samples
+        while self.pre_roll and self.pre_roll_samples > self.pre_roll_max:
+            _, dropped = self.pre_roll.popleft()
+            self.pre_roll_samples -= dropped
+        return []
+    
+    def next_window(self, audio_queue, max_blocks):
+        """
+        Wait for speech and collect one recognition window of it.
+        
+        Blocks without a timeout until speech starts. The window ends after
+        max_blocks blocks or at the end of the speech segment, whichever
+        comes first. A None item in the queue (queued when capture stops)
+        ends the wait. At SPEECH_PAUSE the blocks so far are passed to
+        on_pause, if set.
+        
+        Returns:
+            List of queued items (empty if capture stopped)
+        """
+        items = []
+        while len(items) < max_blocks:
+            item = audio_queue.get()
+            if item is None:
+                break
+            if item is END_OF_SPEECH:
+                if items:
+                    break
+                continue
+            if item is SPEECH_PAUSE:
+                if items and self.on_pause:
+                    # Called on the processing thread: must not block or keep the list
+                    self.on_pause(items)
+                continue
+            items.append(item)
+        return items
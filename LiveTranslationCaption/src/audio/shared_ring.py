@@ -0,0 +1,151 @@
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class RingOverrunError(Exception):
+    """Raised when requested samples have already been overwritten."""
+
+
+def _release(shm, unlink):
+    """Close (and for the owner, unlink) a shared memory block."""
+    try:
+        shm.close()
+    except Exception:
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedAudioRing:
+    """
+    Ring buffer of 16-bit PCM samples in shared memory.
+    
+    The capture side writes samples and advances a shared write cursor that
+    counts every sample ever written. Consumers in other processes attach by
+    name, receive (start, end) sample positions and read NumPy views straight
+    out of the shared block, so audio is never pickled or copied in transit.
+    
+    The creating process owns the block and unlinks it on close or at
+    interpreter exit. If the owner is killed, the multiprocessing resource
+    tracker unlinks the leaked block when it shuts down.
+    """
+    
+    HEADER_SIZE = 64  # write cursor + capacity, padded to a cache line
+    
+    def __init__(self, capacity_samples=16000 * 60, name=None, create=True):
+        """
+        Args:
+            capacity_samples: Number of samples kept before old audio is overwritten
+            name: Shared memory block name (required when attaching)
+            create: Create a new block (owner) or attach to an existing one
+        """
+        if create:
+            size = self.HEADER_SIZE + capacity_samples * 2
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+        
+        self._header = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            self._header[0] = 0
+            self._header[1] = capacity_samples
+        self.capacity = int(self._header[1])
+        self._samples = np.ndarray((self.capacity,), dtype=np.int16,
+                                   buffer=self.shm.buf, offset=self.HEADER_SIZE)
+        
+        # Runs on close(), garbage collection or interpreter exit
+        self._finalizer = weakref.finalize(self, _release, self.shm, create)
+    
+    @classmethod
+    def attach(cls, name):
+        """Attach to a ring created by another process."""
+        return cls(name=name, create=False)
+    
+    @property
+    def name(self):
+        """Name used by other processes to attach."""
+        return self.shm.name
+    
+    @property
+    def write_position(self):
+        """Total number of samples written so far."""
+        return int(self._header[0])
+    
+    @property
+    def oldest_position(self):
+        """Position of the oldest sample still in the ring."""
+        return max(0, self.write_position - self.capacity)
+    
+    def write(self, data):
+        """
+        Append PCM samples to the ring.
+        
+        Args:
+            data: Raw 16-bit PCM bytes or an int16 array
+        
+        Returns:
+            Tuple of (start, end) sample positions of the written block
+        """
+        samples = np.frombuffer(data, dtype=np.int16) if not isinstance(data, np.ndarray) else data
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+        
+        start = self.write_position
+        offset = start % self.capacity
+        first = min(len(samples), self.capacity - offset)
+        self._samples[offset:offset + first] = samples[:first]
+        if first < len(samples):
+            self._samples[:len(samples) - first] = samples[first:]
+        
+        end = start + len(samples)
+        # Publish the cursor only after the samples are in place
+        self._header[0] = end
+        return start, end
+    
+    def views(self, start, end):
+        """
+        Zero-copy views of samples [start, end).
+        
+        Returns:
+            List of one array, or two when the range wraps around the ring
+        """
+        if end < start:
+            raise ValueError("end must not be before start")
+        if end > self.write_position:
+            raise ValueError("range has not been written yet")
+        if start < self.oldest_position:
+            raise RingOverrunError(f"samples from {start} have been overwritten")
+        
+        begin = start % self.capacity
+        length = end - start
+        if begin + length <= self.capacity:
+            return [self._samples[begin:begin + length]]
+        first = self.capacity - begin
+        return [self._samples[begin:], self._samples[:length - first]]
+    
+    def read(self, start, end):
+        """
+        Samples [start, end) as one array.
+        
+        This is a view unless the range wraps, in which case the two parts are
+        joined into a new array.
+        """
+        parts = self.views(start, end)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+    
+    def is_valid(self, start):
+        """Check that samples from start have not been overwritten since reading."""
+        return start >= self.oldest_position
+    
+    def close(self):
+        """Detach from the block; the owner also unlinks it."""
+        self._header = None
+        self._samples = None
+        self._finalizer()
@@ -0,0 +1,213 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.event_log import events
+
+
+# Recognizer owned by the current worker process (loaded once per worker)
+_worker_processor = None
+
+# Shared audio ring attached by the current worker process, if any
+_worker_ring = None
+
+
+def create_audio_processor(**kwargs):
+    """Default factory: build an AudioProcessor inside the worker process."""
+    from audio.processor import AudioProcessor
+    return AudioProcessor(**kwargs)
+
+
+def _init_worker(factory, factory_kwargs, ring_name=None):
+    """Load the recognizer (and attach the audio ring) once when a worker starts."""
+    global _worker_processor, _worker_ring
+    _worker_processor = factory(**factory_kwargs)
+    if ring_name:
+        from audio.shared_ring import SharedAudioRing
+        _worker_ring = SharedAudioRing.attach(ring_name)
+
+
+def _warm_up():
+    """No-op job used to make sure every worker has started and loaded."""
+    return os.getpid()
+
+
+def _process_in_worker(audio_data, sample_rate, sample_width):
+    """Run recognition in the worker process."""
+    return _worker_processor.process_audio(audio_data, sample_rate, sample_width)
+
+
+def _process_range_in_worker(start, end, sample_rate):
+    """Run recognition on samples [start, end) read in place from the shared ring."""
+    from audio.shared_ring import RingOverrunError
+    try:
+        samples = _worker_ring.read(start, end)
+    except RingOverrunError:
+        return None
+    text = _worker_processor.process_audio(memoryview(samples).cast("B"), sample_rate, 2)
+    if not _worker_ring.is_valid(start):
+        # The capture side lapped the ring while the samples were being read
+        return None
+    return text
+
+
+class RecognitionPool:
+    """
+    Runs AudioProcessor work in a pool of worker processes.
+    
+    Recognition with a local engine is CPU-bound; running it in the GUI
+    process makes the capture thread and the Qt event loop compete for the
+    GIL. Each worker loads its recognizer once and stays warm. If a worker
+    crashes the whole pool is restarted, and at most max_in_flight jobs are
+    queued or running at any time.
+    """
+    
+    def __init__(self, num_workers=2, max_in_flight=None, factory=create_audio_processor,
+                 factory_kwargs=None, start_method="spawn", ring=None):
+        self.num_workers = num_workers
+        self.max_in_flight = max_in_flight or num_workers * 2
+        self.factory = factory
+        self.factory_kwargs = factory_kwargs or {}
+        self.ring = ring
+        self.context = multiprocessing.get_context(start_method)
+        self.executor = None
+        self.restart_count = 0
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        # Futures submitted and not yet done, cancelled by stop()
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+        # Incremented by stop(), so a background start that lost the race stays stopped
+        self._generation = 0
+    
+    def start(self, wait=True):
+        """
+        Start the worker processes and wait until they are warm.
+        
+        Args:
+            wait: If False, start and warm the workers on a background
+                  thread and return at once (e.g. from the GUI thread)
+        """
+        if not wait:
+            threading.Thread(target=self._start_in_background, args=(self._generation,),
+                             daemon=True, name="recognition-pool-start").start()
+            return
+        with self._lock:
+            if self.executor is None:
+                self._start_executor()
+    
+    def _start_in_background(self, generation):
+        """Background thread: start the pool unless it was stopped meanwhile."""
+        try:
+            with self._lock:
+                if self.executor is None and generation == self._generation:
+                    self._start_executor()
+        except Exception as e:
+            events.error("recognition.pool_start_failed", f"Could not start recognition workers: {e}")
+    
+    def _start_executor(self):
+        """Create the executor and warm every worker (caller holds the lock)."""
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=self.context,
+            initializer=_init_worker,
+            initargs=(self.factory, self.factory_kwargs, self.ring.name if self.ring else None)
+        )
+        warm = [self.executor.submit(_warm_up) for _ in range(self.num_workers)]
+        for future in warm:
+            future.result()
+    
+    def _restart(self, broken_executor):
+        """Replace a broken executor, unless another thread already did."""
+        with self._lock:
+            if self.executor is not broken_executor:
+                return
+            events.error("recognition.worker_crashed", "Recognition worker crashed; restarting pool")
+            broken_executor.shutdown(wait=False)
+            self.restart_count += 1
+            self._start_executor()
+    
+    def submit(self, audio_data, sample_rate=16000, sample_width=2, timeout=None):
+        """
+        Queue audio for recognition.
+        
+        Blocks while max_in_flight jobs are outstanding.
+        
+        Returns:
+            Future resolving to the recognized text or None, or None if no
+            slot became free within timeout
+        """
+        return self._submit(timeout, _process_in_worker, audio_data, sample_rate, sample_width)
+    
+    def submit_range(self, start, end, sample_rate=16000, timeout=None):
+        """
+        Queue samples [start, end) of the shared audio ring for recognition.
+        
+        Only the two positions cross the process boundary; the worker reads
+        the samples in place.
+        """
+        if self.ring is None:
+            raise ValueError("RecognitionPool was created without a shared audio ring")
+        return self._submit(timeout, _process_range_in_worker, start, end, sample_rate)
+    
+    def _submit(self, timeout, func, *args):
+        """Submit a job once an in-flight slot is free."""
+        if not self._slots.acquire(timeout=timeout):
+            return None
+        
+        try:
+            self.start()
+            executor = self.executor
+            try:
+                future = executor.submit(func, *args)
+            except BrokenProcessPool:
+                self._restart(executor)
+                executor = self.executor
+                future = executor.submit(func, *args)
+        except BaseException:
+            # The job never reached the pool, so _on_done won't free its slot
+            self._slots.release()
+            raise
+        
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda f: self._on_done(f, executor))
+        return future
+    
+    def _on_done(self, future, executor):
+        """Release the in-flight slot and restart the pool after a crash."""
+        with self._futures_lock:
+            self._futures.discard(future)
+        self._slots.release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # Restart from a separate thread; done callbacks run on the
+            # executor's management thread, which must not wait on itself.
+            threading.Thread(target=self._restart, args=(executor,), daemon=True).start()
+    
+    def process_audio(self, audio_data, sample_rate=16000, sample_width=2):
+        """Recognize audio in a worker and wait for the result."""
+        future = self.submit(audio_data, sample_rate, sample_width)
+        try:
+            return future.result()
+        except (BrokenProcessPool, CancelledError):
+            return None
+    
+    def stop(self):
+        """
+        Stop all worker processes without waiting for them.
+        
+        Queued jobs are cancelled. Workers finish the job they are running
+        and then exit in the background, so stopping never blocks the
+        caller (the GUI thread on quit or on re-initialization).
+        """
+        with self._lock:
+            self._generation += 1
+            executor, self.executor = self.executor, None
+        with self._futures_lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -6,7 +6,7 @@ Captures system audio, recognizes Japanese speech, and displays English captions
 
 import sys
 import os
-import threading
+import argparse
 import time
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction
 from PyQt5.QtGui import QIcon
@@ -15,33 +15,48 @@ from PyQt5.QtCore import QTimer, Qt
 # Add src directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from audio.capture import AudioCapture
-from audio.processor import AudioProcessor
-from translation.translator import Translator
+from pipeline import CaptionPipeline
 from ui.caption_window import CaptionWindow
 from ui.settings_dialog import SettingsDialog
 from utils.config import Config
+from utils.diagnostics import DiagnosticsCollector, install_signal_trigger, timers
+from utils.event_log import events
 
 
-class LiveTranslationApp:
+class LiveTranslationApp(CaptionPipeline):
     """Main application class."""
     
-    def __init__(self):
-        self.config = Config("config.json")
+    def __init__(self, diagnostics_after=None, replay=None):
+        """
+        Args:
+            diagnostics_after: Write a diagnostics archive this many seconds after startup
+            replay: Optional dict (directory, start_time, end_time, speed) to
+                    caption a capture journal instead of live audio
+        """
+        super().__init__(Config("config.json"), replay=replay)
+        timers.enabled = timers.enabled or self.config.get("diagnostics_timers", False)
+        events.configure(**self.config.get_event_log_settings())
         
         # Initialize Qt Application
         self.app = QApplication(sys.argv)
         self.app.setQuitOnLastWindowClosed(False)
         
-        # Initialize components
-        self.audio_capture = None
-        self.audio_processor = None
-        self.translator = None
-        self.caption_window = None
-        
-        # Processing thread
-        self.is_running = False
-        self.processing_thread = None
+        # On-demand diagnostics (tray action, signal or --diagnostics)
+        self.diagnostics = DiagnosticsCollector(
+            output_dir=self.config.get("diagnostics_dir", "diagnostics"),
+            duration=self.config.get("diagnostics_duration", 10)
+        )
+        self.diagnostics.add_state_provider("capture", self._capture_state)
+        self.diagnostics.add_state_provider("processing", self._processing_state)
+        self.diagnostics.add_state_provider("gui", self._gui_state)
+        self.diagnostics.add_state_provider("event_log", events.state)
+        self.gui_lag = {"last_ms": 0.0, "max_ms": 0.0}
+        self._install_gui_heartbeat()
+        signal_name = install_signal_trigger(self.diagnostics)
+        if signal_name:
+            print(f"Send {signal_name} to write a diagnostics archive")
+        if diagnostics_after is not None:
+            QTimer.singleShot(int(diagnostics_after * 1000), self.dump_diagnostics)
         
         # Create system tray icon
         self._create_tray_icon()
@@ -70,6 +85,10 @@ class LiveTranslationApp:
         settings_action.triggered.connect(self.show_settings)
         menu.addAction(settings_action)
         
+        diagnostics_action = QAction("Write Diagnostics", self.app)
+        diagnostics_action.triggered.connect(self.dump_diagnostics)
+        menu.addAction(diagnostics_action)
+        
         menu.addSeparator()
         
         quit_action = QAction("Quit", self.app)
@@ -88,38 +107,14 @@ class LiveTranslationApp:
             2000
         )
     
-    def _init_components(self):
-        """Initialize all components."""
-        # Audio capture
-        sample_rate = self.config.get("sample_rate", 16000)
-        chunk_size = self.config.get("chunk_size", 1024)
-        self.audio_capture = AudioCapture(sample_rate=sample_rate, chunk_size=chunk_size)
-        
-        # Audio processor
-        language = self.config.get("language", "ja")
-        energy_threshold = self.config.get("energy_threshold", 300)
-        self.audio_processor = AudioProcessor(language=f"{language}-JP", energy_threshold=energy_threshold)
-        
-        # Translator
-        source_lang = self.config.get("language", "ja")
-        target_lang = self.config.get("translation_language", "en")
-        self.translator = Translator(source_lang=source_lang, target_lang=target_lang)
-        
-        # Caption window
-        self.caption_window = CaptionWindow()
-        duration_ms = self.config.get("caption_display_duration", 5) * 1000
-        self.caption_window.set_fade_duration(duration_ms)
+    def _create_caption_window(self):
+        """Caption overlay window."""
+        return CaptionWindow()
     
     def start_capture(self):
         """Start audio capture and processing."""
         if not self.is_running:
-            self.is_running = True
-            self.audio_capture.start()
-            
-            # Start processing thread
-            self.processing_thread = threading.Thread(target=self._process_audio_loop, daemon=True)
-            self.processing_thread.start()
-            
+            super().start_capture()
             self.tray_icon.showMessage(
                 "Live Translation Caption",
                 "Capture started",
@@ -131,12 +126,7 @@ class LiveTranslationApp:
     def stop_capture(self):
         """Stop audio capture and processing."""
         if self.is_running:
-            self.is_running = False
-            self.audio_capture.stop()
-            
-            if self.processing_thread:
-                self.processing_thread.join(timeout=2)
-            
+            super().stop_capture()
             self.tray_icon.showMessage(
                 "Live Translation Caption",
                 "Capture stopped",
@@ -145,32 +135,6 @@ class LiveTranslationApp:
             )
             print("Application stopped")
     
-    def _process_audio_loop(self):
-        """Main processing loop running in separate thread."""
-        while self.is_running:
-            try:
-                # Get 3 seconds of audio
-                audio_data = self.audio_capture.get_audio_chunk(duration_seconds=3)
-                
-                if audio_data:
-                    # Process audio to text
-                    japanese_text = self.audio_processor.process_audio(audio_data)
-                    
-                    if japanese_text:
-                        # Translate to English
-                        english_caption = self.translator.translate(japanese_text)
-                        
-                        if english_caption:
-                            # Update caption window
-                            self.caption_window.update_caption(english_caption)
-                
-                # Small delay to prevent excessive CPU usage
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"Error in processing loop: {e}")
-                time.sleep(1)
-    
     def show_settings(self):
         """Show settings dialog."""
         dialog = SettingsDialog("config.json")
@@ -189,9 +153,48 @@ class LiveTranslationApp:
             if was_running:
                 self.start_capture()
     
+    def _install_gui_heartbeat(self):
+        """
+        Measure GUI event loop lag once a second.
+        
+        The timer also hands control back to Python regularly, which is
+        what lets the diagnostics signal handler run under the Qt loop.
+        """
+        self.heartbeat_interval = 1.0
+        self.heartbeat_expected = time.monotonic() + self.heartbeat_interval
+        self.heartbeat_timer = QTimer()
+        self.heartbeat_timer.timeout.connect(self._on_heartbeat)
+        self.heartbeat_timer.start(int(self.heartbeat_interval * 1000))
+    
+    def _on_heartbeat(self):
+        """Record how late the GUI thread serviced the heartbeat timer."""
+        now = time.monotonic()
+        lag_ms = max(0.0, (now - self.heartbeat_expected) * 1000)
+        self.gui_lag["last_ms"] = lag_ms
+        self.gui_lag["max_ms"] = max(self.gui_lag["max_ms"], lag_ms)
+        self.heartbeat_expected = now + self.heartbeat_interval
+    
+    def _gui_state(self):
+        """Diagnostics state of the GUI thread."""
+        return {
+            "event_loop_lag_ms": self.gui_lag["last_ms"],
+            "max_event_loop_lag_ms": self.gui_lag["max_ms"],
+            "caption_visible": bool(self.caption_window and self.caption_window.caption_text),
+        }
+    
+    def dump_diagnostics(self):
+        """Write a diagnostics archive in the background."""
+        self.tray_icon.showMessage(
+            "Live Translation Caption",
+            f"Collecting diagnostics for {self.diagnostics.duration} seconds...",
+            QSystemTrayIcon.Information,
+            2000
+        )
+        self.diagnostics.dump_async()
+    
     def quit_app(self):
         """Quit the application."""
-        self.stop_capture()
+        self.close_components()
         if self.caption_window:
             self.caption_window.close()
         self.app.quit()
@@ -207,13 +210,51 @@ class LiveTranslationApp:
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Live Translation Caption")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the multi-session caption server without a GUI")
+    parser.add_argument("--simulate-backends", action="store_true",
+                        help="with --headless, use simulated recognition/translation (load testing)")
+    parser.add_argument("--diagnostics", type=float, metavar="SECONDS",
+                        help="write a diagnostics archive SECONDS after startup")
+    parser.add_argument("--timers", action="store_true",
+                        help="enable fine-grained timers on the processing hot paths")
+    parser.add_argument("--replay", metavar="JOURNAL_DIR",
+                        help="caption audio from a capture journal instead of live capture")
+    parser.add_argument("--replay-from", metavar="TIME",
+                        help="wall-clock start of the replay (epoch seconds or ISO 8601)")
+    parser.add_argument("--replay-to", metavar="TIME",
+                        help="wall-clock end of the replay (epoch seconds or ISO 8601)")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="real-time multiplier for the replay, 0 for maximum speed")
+    args, _ = parser.parse_known_args()
+    
     print("="*60)
     print("Live Translation Caption - Japanese to English")
     print("="*60)
+    
+    if args.timers:
+        timers.enabled = True
+    
+    if args.headless:
+        from server.session_server import run_headless
+        print("Starting headless caption server...")
+        run_headless(Config("config.json"), simulate=args.simulate_backends,
+                     diagnostics_after=args.diagnostics)
+        return
+    
     print("Starting application...")
     
     try:
-        app = LiveTranslationApp()
+        replay = None
+        if args.replay:
+            replay = {
+                "directory": args.replay,
+                "start_time": args.replay_from,
+                "end_time": args.replay_to,
+                "speed": args.replay_speed,
+            }
+        app = LiveTranslationApp(diagnostics_after=args.diagnostics, replay=replay)
         sys.exit(app.run())
     except Exception as e:
         print(f"Fatal error: {e}")
@@ -0,0 +1,454 @@
+import queue
+import threading
+import time
+
+from audio.dedup import RecognitionDeduplicator
+from audio.worker_pool import RecognitionPool
+from audio.shared_ring import SharedAudioRing
+from audio.journal import CaptureJournal, JournalReplaySource
+from audio.segmenter import SpeechSegmenter
+from server.broadcast import CaptionBroadcaster
+from translation.translator import Translator
+from translation.speculative import SpeculativeTranslator
+from translation.glossary import Glossary
+from utils.autotune import AutoTuner
+from utils.diagnostics import timers
+from utils.event_log import events
+
+
+class CaptionPipeline:
+    """
+    Capture-to-caption pipeline without the GUI.
+    
+    Builds audio capture, recognition, deduplication, translation and the
+    caption broadcast from the config, runs the processing loop, and
+    rebuilds everything when the settings change. LiveTranslationApp adds
+    the tray icon and caption window on top; soak.py runs the same code
+    with synthetic audio and fake backends by overriding the _create_*
+    methods.
+    """
+    
+    def __init__(self, config, replay=None):
+        """
+        Args:
+            config: Config with the pipeline settings
+            replay: Optional dict (directory, start_time, end_time, speed) to
+                    caption a capture journal instead of live audio
+        """
+        self.config = config
+        self.replay = replay
+        
+        # Components, created by _init_components()
+        self.audio_capture = None
+        self.audio_processor = None
+        self.recognition_pool = None
+        self.audio_ring = None
+        self.journal = None
+        self.deduplicator = None
+        self.translator = None
+        self.speculator = None
+        self.caption_window = None
+        self.broadcaster = None
+        
+        # Processing thread
+        self.is_running = False
+        self.processing_thread = None
+        # Worker pool futures in submission order, handed on by the result thread
+        self.result_thread = None
+        self.pending_recognitions = queue.Queue()
+        self.performance = None
+        self.tuner = None
+    
+    def _init_components(self):
+        """Create the components for the current config, releasing the previous ones."""
+        process_mode = self.config.get("recognition_mode", "thread") == "process"
+        
+        # Latency/throughput knobs from the selected performance profile
+        self.performance = self.config.get_performance_settings()
+        self.tuner = AutoTuner(self.performance) if self.config.get("auto_tune", False) else None
+        
+        # Shared memory handoff of audio to recognition worker processes
+        if self.recognition_pool:
+            self.recognition_pool.stop()
+            self.recognition_pool = None
+        if self.audio_ring:
+            self.audio_ring.close()
+            self.audio_ring = None
+        sample_rate = self.config.get("sample_rate", 16000)
+        if process_mode and self.config.get("shared_memory_audio", True):
+            self.audio_ring = SharedAudioRing(capacity_samples=sample_rate * 60)
+        
+        # Audio capture, or replay of a capture journal. The previous source
+        # is closed so a settings change doesn't leave a PyAudio instance behind
+        if self.audio_capture:
+            self.audio_capture.close()
+            self.audio_capture = None
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        chunk_size = self.performance["chunk_size"]
+        segmenter = None
+        if self.config.get("vad_enabled", True):
+            # Only speech reaches recognition; the pipeline idles in silence.
+            # Speculation recognizes each segment early, when speech pauses
+            speculate_early = self.config.get("speculative_translation", False) and not process_mode
+            segmenter = SpeechSegmenter(
+                sample_rate=sample_rate,
+                energy_threshold=self.config.get("energy_threshold", 300),
+                hangover_seconds=self.config.get("vad_hangover_seconds", 0.6),
+                pre_roll_seconds=self.config.get("vad_pre_roll_seconds", 0.3),
+                pause_seconds=self.config.get("speculative_pause_seconds", 0.2) if speculate_early else None
+            )
+        self.audio_capture = self._create_audio_source(sample_rate, chunk_size, segmenter)
+        
+        # Audio processor
+        language = self.config.get("language", "ja")
+        energy_threshold = self.config.get("energy_threshold", 300)
+        processor_kwargs = {
+            "language": f"{language}-JP",
+            "energy_threshold": energy_threshold,
+            "timeout": self.config.get("recognition_timeout", 5),
+            "hedge": self.config.get("hedge_requests", False),
+            "local_engine": self.config.get("local_recognition_engine") or None,
+            # Every window the segmenter passes on is speech; don't throttle it away
+            "min_process_interval": 0 if segmenter else self.performance["min_process_interval"]
+        }
+        if self.audio_processor:
+            self.audio_processor.shutdown()
+        if process_mode:
+            # Run recognition in worker processes, away from the GUI's GIL
+            self.audio_processor = None
+            self.recognition_pool = RecognitionPool(
+                num_workers=self.performance["recognition_workers"],
+                max_in_flight=self.performance["max_in_flight_recognitions"],
+                factory_kwargs=processor_kwargs,
+                ring=self.audio_ring
+            )
+        else:
+            self.audio_processor = self._create_processor(processor_kwargs)
+        
+        # Deduplication of repeated recognitions
+        if self.config.get("dedup_enabled", True):
+            self.deduplicator = RecognitionDeduplicator(
+                window_size=self.config.get("dedup_window", 8),
+                max_age_seconds=self.config.get("dedup_max_age_seconds", 5))
+        else:
+            self.deduplicator = None
+        
+        # Translator
+        if self.translator:
+            self.translator.shutdown()
+        source_lang = self.config.get("language", "ja")
+        target_lang = self.config.get("translation_language", "en")
+        self.translator = Translator(
+            source_lang=source_lang,
+            target_lang=target_lang,
+            timeout=self.config.get("translation_timeout", 3),
+            hedge=self.config.get("hedge_requests", False),
+            memory_dir=(self.config.get("translation_memory_dir", "translation_memory")
+                        if self.config.get("translation_memory_enabled", True) else None),
+            fuzzy_threshold=self.config.get("translation_memory_fuzzy_threshold", 0.9),
+            memory_max_entries=self.config.get("translation_memory_max_entries", 100000),
+            glossary=Glossary.load(self.config.get("glossary_path", "glossary.json")),
+            backends=self._translation_backends()
+        )
+        
+        # Speculative translation of partial hypotheses, recognized at speech pauses
+        if self.speculator:
+            self.speculator.shutdown()
+            self.speculator = None
+        if self.config.get("speculative_translation", False):
+            self.speculator = SpeculativeTranslator(
+                self.translator,
+                max_in_flight=self.config.get("speculative_max_in_flight", 2)
+            )
+            # Partials only reach this process in thread mode
+            if self.audio_processor:
+                self.audio_processor.on_partial = self.speculator.speculate
+                if segmenter:
+                    # Recognize the speech segment as soon as it pauses
+                    segmenter.on_pause = self._recognize_partial
+        
+        # Local caption broadcast (WebSocket/SSE) for OBS, second screens, loggers
+        if self.broadcaster:
+            self.broadcaster.stop()
+            self.broadcaster = None
+        if self.config.get("broadcast_enabled", False):
+            self.broadcaster = CaptionBroadcaster(
+                host=self.config.get("broadcast_host", "127.0.0.1"),
+                port=self.config.get("broadcast_port", 8765),
+                client_buffer=self.config.get("broadcast_client_buffer", 64)
+            )
+            try:
+                self.broadcaster.start()
+            except OSError as e:
+                print(f"Could not start caption broadcast: {e}")
+                self.broadcaster = None
+        
+        # Caption window (kept across settings changes)
+        if self.caption_window is None:
+            self.caption_window = self._create_caption_window()
+        duration_ms = self.config.get("caption_display_duration", 5) * 1000
+        self.caption_window.set_fade_duration(duration_ms)
+    
+    def _create_audio_source(self, sample_rate, chunk_size, segmenter):
+        """Live audio capture, or replay of a capture journal."""
+        if self.replay:
+            return JournalReplaySource(ring=self.audio_ring, segmenter=segmenter, **self.replay)
+        # PyAudio is only needed for live capture
+        from audio.capture import AudioCapture
+        if self.config.get("journal_enabled", False):
+            self.journal = CaptureJournal(
+                directory=self.config.get("journal_dir", "journal"),
+                sample_rate=sample_rate,
+                segment_seconds=self.config.get("journal_segment_seconds", 60),
+                max_disk_mb=self.config.get("journal_max_disk_mb", 500)
+            )
+        return AudioCapture(sample_rate=sample_rate, chunk_size=chunk_size,
+                            ring=self.audio_ring, journal=self.journal, segmenter=segmenter)
+    
+    def _create_processor(self, processor_kwargs):
+        """Speech recognizer used in thread mode."""
+        from audio.processor import AudioProcessor
+        return AudioProcessor(**processor_kwargs)
+    
+    def _translation_backends(self):
+        """Translation backends, or None for Google Translate."""
+        return None
+    
+    def _create_caption_window(self):
+        """Window captions are shown in; created once and kept across re-initialization."""
+        raise NotImplementedError
+    
+    def start_capture(self):
+        """Start audio capture and processing."""
+        if not self.is_running:
+            self.is_running = True
+            if self.recognition_pool:
+                # Warm the workers off the calling (GUI) thread; submits
+                # wait for the pool to be ready
+                self.recognition_pool.start(wait=False)
+            self.audio_capture.start()
+            
+            # Start processing thread
+            self.processing_thread = threading.Thread(target=self._process_audio_loop, daemon=True)
+            self.processing_thread.start()
+            if self.recognition_pool:
+                self.result_thread = threading.Thread(target=self._result_loop, daemon=True,
+                                                      name="recognition-results")
+                self.result_thread.start()
+    
+    def stop_capture(self):
+        """Stop audio capture and processing."""
+        if self.is_running:
+            self.is_running = False
+            self.audio_capture.stop()
+            
+            if self.processing_thread:
+                self.processing_thread.join(timeout=2)
+            if self.result_thread:
+                # Drop results still pending and wake the result thread
+                while True:
+                    try:
+                        self.pending_recognitions.get_nowait()
+                    except queue.Empty:
+                        break
+                self.pending_recognitions.put(None)
+                self.result_thread.join(timeout=2)
+                self.result_thread = None
+    
+    def _process_audio_loop(self):
+        """Main processing loop running in separate thread."""
+        while self.is_running:
+            try:
+                settings = self.tuner.update() if self.tuner else self.performance
+                if self.audio_processor and not self.audio_capture.segmenter:
+                    self.audio_processor.min_process_interval = settings["min_process_interval"]
+                
+                # Get one recognition window of audio; with the speech
+                # segmenter this waits, without waking up, until speech starts
+                window_seconds = settings["window_seconds"]
+                with timers.section("capture.get_chunk"):
+                    audio_data = self.audio_capture.get_audio_chunk(duration_seconds=window_seconds)
+                audio_end = time.time()
+                
+                if not audio_data:
+                    # Capture stopped or failed; back off before retrying
+                    time.sleep(settings["processing_interval"])
+                    continue
+                # The segmenter cuts windows short at the end of speech
+                audio_times = (audio_end - self._audio_seconds(audio_data), audio_end)
+                
+                if self.audio_ring:
+                    # Only the sample range crosses to the worker process
+                    start, end = audio_data
+                    future = self.recognition_pool.submit_range(
+                        start, end, self.audio_capture.sample_rate)
+                    self.pending_recognitions.put((future, audio_times))
+                elif self.recognition_pool:
+                    # Queue for a worker process (blocks while the pool is full)
+                    future = self.recognition_pool.submit(audio_data)
+                    self.pending_recognitions.put((future, audio_times))
+                else:
+                    # Process audio to text
+                    with timers.section("recognition"):
+                        japanese_text = self.audio_processor.process_audio(audio_data)
+                    if self.tuner:
+                        self.tuner.record_latency(time.time() - audio_end)
+                    self._handle_recognition(japanese_text, audio_times)
+                
+            except Exception as e:
+                events.error("processing.loop_error", f"Error in processing loop: {e}")
+                time.sleep(1)
+    
+    def _recognize_partial(self, blocks):
+        """Start recognizing the current window up to a speech pause."""
+        self.audio_processor.recognize_partial(b''.join(blocks), stable=True)
+    
+    def _audio_seconds(self, audio_data):
+        """Duration of a window returned by get_audio_chunk()."""
+        capture = self.audio_capture
+        samples_per_second = capture.sample_rate * capture.channels
+        if self.audio_ring:
+            start, end = audio_data
+            return (end - start) / samples_per_second
+        return len(audio_data) / 2 / samples_per_second
+    
+    def _result_loop(self):
+        """Hand on worker pool results in submission order as they finish."""
+        held = []
+        while True:
+            pending = held.pop() if held else self.pending_recognitions.get()
+            if pending is None:
+                break
+            batch = [pending]
+            # Results that are already in when this one arrives (a backlog)
+            # are translated together with it in one request
+            max_batch = 1 if self.speculator else self.config.get("translation_batch_max", 8)
+            while len(batch) < max_batch:
+                try:
+                    following = self.pending_recognitions.get_nowait()
+                except queue.Empty:
+                    break
+                if following is None or not following[0].done():
+                    held.append(following)
+                    break
+                batch.append(following)
+            
+            results = []
+            for future, times in batch:
+                try:
+                    japanese_text = future.result()
+                except Exception as e:
+                    events.error("recognition.worker_error", f"Recognition worker failed: {e}")
+                    continue
+                if self.tuner:
+                    self.tuner.record_latency(time.time() - times[1])
+                results.append((japanese_text, times))
+            try:
+                if len(results) == 1:
+                    self._handle_recognition(*results[0])
+                elif results:
+                    self._handle_recognitions(results)
+            except Exception as e:
+                events.error("processing.result_error", f"Error handling recognition result: {e}")
+    
+    def _handle_recognition(self, japanese_text, audio_times=(None, None)):
+        """Deduplicate, translate, display and broadcast one recognition result."""
+        # Drop repeats and trim overlap with the previous recognition
+        if japanese_text and self.deduplicator:
+            with timers.section("dedup"):
+                japanese_text = self.deduplicator.filter(japanese_text)
+        
+        if japanese_text:
+            # Translate to English
+            with timers.section("translation"):
+                if self.speculator:
+                    english_caption = self.speculator.finalize(japanese_text)
+                else:
+                    english_caption = self.translator.translate(japanese_text)
+            self._show_caption(japanese_text, english_caption, audio_times)
+    
+    def _handle_recognitions(self, results):
+        """Like _handle_recognition for several results, translated with one request."""
+        texts = []
+        for japanese_text, audio_times in results:
+            if japanese_text and self.deduplicator:
+                with timers.section("dedup"):
+                    japanese_text = self.deduplicator.filter(japanese_text)
+            if japanese_text:
+                texts.append((japanese_text, audio_times))
+        if not texts:
+            return
+        with timers.section("translation"):
+            captions = self.translator.translate_batch([text for text, _ in texts])
+        for (japanese_text, audio_times), english_caption in zip(texts, captions):
+            self._show_caption(japanese_text, english_caption, audio_times)
+    
+    def _show_caption(self, japanese_text, english_caption, audio_times):
+        """Display and broadcast one translated caption."""
+        if english_caption:
+            # Update caption window
+            self.caption_window.update_caption(english_caption)
+            
+            if self.broadcaster:
+                self.broadcaster.publish(japanese_text, english_caption,
+                                         start_time=audio_times[0], end_time=audio_times[1])
+    
+    def _capture_state(self):
+        """Diagnostics state of the capture thread and its queue."""
+        capture = self.audio_capture
+        if capture is None:
+            return {}
+        return {
+            "running": capture.is_running,
+            "thread_alive": bool(capture.thread and capture.thread.is_alive()),
+            "queue_size": capture.audio_queue.qsize(),
+            "dropped_blocks": getattr(capture.audio_queue, "dropped", 0),
+            "sample_rate": capture.sample_rate,
+            "chunk_size": capture.chunk_size,
+            "speech_segmenter": dict(capture.segmenter.stats) if capture.segmenter else None,
+        }
+    
+    def _processing_state(self):
+        """Diagnostics state of the processing thread and worker pool."""
+        state = {
+            "running": self.is_running,
+            "thread_alive": bool(self.processing_thread and self.processing_thread.is_alive()),
+            "pending_recognitions": self.pending_recognitions.qsize(),
+            "recognition_mode": self.config.get("recognition_mode", "thread"),
+            "performance_profile": self.config.get("performance_profile", "balanced"),
+            "performance": self.tuner.settings if self.tuner else self.performance,
+        }
+        if self.recognition_pool:
+            state["pool_restarts"] = self.recognition_pool.restart_count
+        if self.deduplicator:
+            state["dedup_suppressed"] = self.deduplicator.suppressed_count
+            state["dedup_trimmed"] = self.deduplicator.trimmed_count
+        if self.translator:
+            state["translation_cache_size"] = len(self.translator.translation_cache)
+        if self.speculator:
+            state["speculation"] = dict(self.speculator.stats)
+        if self.broadcaster:
+            state["broadcast_clients"] = len(self.broadcaster.subscribers)
+        return state
+    
+    def close_components(self):
+        """Stop capture and release every component."""
+        self.stop_capture()
+        if self.audio_capture:
+            self.audio_capture.close()
+        if self.audio_processor:
+            self.audio_processor.shutdown()
+        if self.recognition_pool:
+            self.recognition_pool.stop()
+        if self.audio_ring:
+            self.audio_ring.close()
+        if self.journal:
+            self.journal.close()
+        if self.speculator:
+            self.speculator.shutdown()
+        if self.translator:
+            self.translator.shutdown()
+        if self.broadcaster:
+            self.broadcaster.stop()
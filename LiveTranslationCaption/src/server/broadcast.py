@@ -0,0 +1,316 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+
+from utils.metrics import metrics
+
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Clients only send small control frames (ping, pong, close)
+MAX_CLIENT_FRAME = 4096
+
+# WebSocket close code for a frame too big to process
+CLOSE_MESSAGE_TOO_BIG = 1009
+
+OVERLAY_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+  body { margin: 0; background: transparent; font: bold 32px Arial, sans-serif; }
+  #caption { position: fixed; bottom: 40px; width: 100%; text-align: center;
+             color: white; text-shadow: 0 0 6px black; }
+</style>
+</head>
+<body>
+<div id="caption"></div>
+<script>
+  var caption = document.getElementById("caption");
+  var events = new EventSource("/events");
+  events.onmessage = function (e) {
+    var msg = JSON.parse(e.data);
+    caption.textContent = msg.translation;
+  };
+</script>
+</body>
+</html>
+"""
+
+
+def websocket_frame(payload, opcode=0x1):
+    """Encode an unmasked (server to client) WebSocket frame."""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < (1 << 16):
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+class _Subscriber:
+    """One connected client with its own bounded send buffer."""
+    
+    def __init__(self, kind, writer, buffer_size):
+        self.kind = kind
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.closed = False
+
+
+class CaptionBroadcaster:
+    """
+    Publishes the caption stream to local subscribers over WebSocket and SSE.
+    
+    Runs an asyncio server on a background thread. Every caption is
+    serialized once into a WebSocket frame and an SSE event, and the same
+    bytes are queued to every client. Each client has a bounded buffer; a
+    client that falls that far behind is disconnected rather than allowed
+    to slow down the pipeline or the other clients.
+    
+    Endpoints:
+        /        Minimal overlay page (e.g. for an OBS browser source)
+        /events  Server-Sent Events stream
+        /ws      WebSocket stream (any path with an Upgrade header works)
+    """
+    
+    def __init__(self, host="127.0.0.1", port=8765, client_buffer=64):
+        self.host = host
+        self.port = port
+        self.client_buffer = client_buffer
+        self.subscribers = set()
+        self.sequence = 0
+        self.dropped_clients = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._started = threading.Event()
+        self._start_error = None
+    
+    def start(self):
+        """Start the server thread and wait until it is listening."""
+        if self.thread:
+            return
+        self._started.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="caption-broadcast")
+        self.thread.start()
+        self._started.wait(timeout=5)
+        if self._start_error:
+            self.thread = None
+            raise self._start_error
+        print(f"Caption broadcast listening on http://{self.host}:{self.port}/")
+    
+    def stop(self):
+        """Disconnect all clients and stop the server thread."""
+        if not self.thread:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.thread = None
+    
+    def publish(self, source_text, translation, final=True, start_time=None, end_time=None):
+        """
+        Queue a caption for every subscriber (thread-safe, never blocks).
+        
+        Args:
+            source_text: Recognized text
+            translation: Translated caption
+            final: False for partial hypotheses that may still change
+            start_time: Wall-clock time the audio started, if known
+            end_time: Wall-clock time the audio ended, if known
+        """
+        if not self.loop or not self.thread:
+            return
+        self.sequence += 1
+        message = {
+            "seq": self.sequence,
+            "source": source_text,
+            "translation": translation,
+            "final": final,
+            "start": start_time,
+            "end": end_time,
+            "timestamp": time.time(),
+        }
+        # Serialize once; the same bytes go to every client
+        payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+        frames = {
+            "ws": websocket_frame(payload),
+            "sse": b"data: " + payload + b"\n\n",
+        }
+        self.loop.call_soon_threadsafe(self._fan_out, frames)
+    
+    def _run(self):
+        """Server thread: run the event loop."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port))
+            self.port = self.server.sockets[0].getsockname()[1]
+        except Exception as e:
+            self._start_error = e
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+    
+    async def _shutdown(self):
+        """Close the listening socket and every client connection."""
+        self.server.close()
+        for subscriber in list(self.subscribers):
+            self._drop(subscriber)
+        await self.server.wait_closed()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=1)
+    
+    def _fan_out(self, frames):
+        """Queue pre-serialized frames to all subscribers (event loop thread)."""
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(frames[subscriber.kind])
+            except asyncio.QueueFull:
+                self.dropped_clients += 1
+                metrics.increment("broadcast.dropped_clients")
+                self._drop(subscriber)
+    
+    def _drop(self, subscriber):
+        """Disconnect a subscriber."""
+        if subscriber.closed:
+            return
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+        # Wake the sender so it notices the close
+        try:
+            subscriber.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+        # Abort rather than close: a stalled client would never let the
+        # kernel send buffer drain
+        subscriber.writer.transport.abort()
+    
+    async def _handle_client(self, reader, writer):
+        """Handle one HTTP connection."""
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError):
+            writer.close()
+            return
+        
+        lines = request.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        path = parts[1] if len(parts) > 1 else "/"
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        
+        if headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers:
+            accept = base64.b64encode(hashlib.sha1(
+                (headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+            writer.write((
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            await self._serve_subscriber("ws", reader, writer)
+        elif path.startswith("/events"):
+            writer.write((
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: text/event-stream\r\n"
+                "Cache-Control: no-cache\r\n"
+                "Access-Control-Allow-Origin: *\r\n"
+                "Connection: keep-alive\r\n\r\n").encode())
+            await self._serve_subscriber("sse", reader, writer)
+        elif path == "/" or path.startswith("/?"):
+            body = OVERLAY_PAGE.encode("utf-8")
+            writer.write((
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: text/html; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n").encode() + body)
+            await self._close(writer)
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await self._close(writer)
+    
+    async def _serve_subscriber(self, kind, reader, writer):
+        """Send queued frames to a subscriber until it disconnects or is dropped."""
+        subscriber = _Subscriber(kind, writer, self.client_buffer)
+        self.subscribers.add(subscriber)
+        metrics.increment(f"broadcast.{kind}_connections")
+        watcher = asyncio.ensure_future(self._watch_disconnect(subscriber, reader))
+        try:
+            while not subscriber.closed:
+                frame = await subscriber.queue.get()
+                if frame is None:
+                    break
+                writer.write(frame)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            watcher.cancel()
+            self._drop(subscriber)
+    
+    async def _watch_disconnect(self, subscriber, reader):
+        """Read (and discard) client data so disconnects are noticed."""
+        try:
+            while True:
+                if subscriber.kind == "ws":
+                    opcode = await self._read_ws_frame(reader)
+                    if opcode is None:
+                        await self._close_ws(subscriber, CLOSE_MESSAGE_TOO_BIG)
+                        break
+                    if opcode == 0x8:
+                        break
+                elif not await reader.read(1024):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self._drop(subscriber)
+    
+    async def _read_ws_frame(self, reader):
+        """Read one (masked) client frame and return its opcode (None if too big)."""
+        head = await reader.readexactly(2)
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_CLIENT_FRAME:
+            return None
+        if head[1] & 0x80:
+            length += 4  # masking key
+        await reader.readexactly(length)
+        return head[0] & 0x0F
+    
+    async def _close_ws(self, subscriber, code):
+        """Send a WebSocket close frame with a status code, then disconnect."""
+        subscriber.writer.write(websocket_frame(struct.pack("!H", code), opcode=0x8))
+        try:
+            await asyncio.wait_for(subscriber.writer.drain(), timeout=1)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        self._drop(subscriber)
+    
+    async def _close(self, writer):
+        """Flush and close a plain HTTP response."""
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
@@ -0,0 +1,113 @@
+import threading
+from collections import deque
+
+
+class Job:
+    """A unit of work (one audio window) belonging to a session."""
+    
+    def __init__(self, session_id, cost, payload):
+        self.session_id = session_id
+        self.cost = cost
+        self.payload = payload
+        self.finish_tag = 0.0
+
+
+class _SessionQueue:
+    """Pending jobs and fair-queuing state for one session."""
+    
+    def __init__(self, weight, max_pending):
+        self.weight = weight
+        self.jobs = deque()
+        self.max_pending = max_pending
+        self.last_finish = 0.0
+        self.dropped = 0
+
+
+class WeightedFairScheduler:
+    """
+    Weighted fair queuing of jobs from many sessions onto shared workers.
+    
+    Each job is stamped with a virtual finish tag:
+    max(virtual time, session's previous finish tag) + cost / weight, and
+    workers always take the job with the smallest tag. A session that floods
+    the queue only pushes its own tags further out, so quieter sessions keep
+    getting their share. Each session's backlog is bounded; when it is full
+    the oldest pending job of that session is dropped.
+    """
+    
+    def __init__(self, max_pending_per_session=8):
+        self.max_pending_per_session = max_pending_per_session
+        self.sessions = {}
+        self.virtual_time = 0.0
+        self.closed = False
+        self._condition = threading.Condition()
+    
+    def add_session(self, session_id, weight=1.0):
+        """Register a session with a scheduling weight."""
+        with self._condition:
+            self.sessions[session_id] = _SessionQueue(max(weight, 0.01),
+                                                      self.max_pending_per_session)
+    
+    def remove_session(self, session_id):
+        """Forget a session and discard its pending jobs."""
+        with self._condition:
+            self.sessions.pop(session_id, None)
+    
+    def submit(self, job):
+        """
+        Queue a job for its session.
+        
+        Returns:
+            The job dropped to make room, or None
+        """
+        with self._condition:
+            session = self.sessions.get(job.session_id)
+            if session is None:
+                raise KeyError(f"Unknown session: {job.session_id}")
+            dropped = None
+            if len(session.jobs) >= session.max_pending:
+                dropped = session.jobs.popleft()
+                session.dropped += 1
+            start = max(self.virtual_time, session.last_finish)
+            job.finish_tag = start + job.cost / session.weight
+            session.last_finish = job.finish_tag
+            session.jobs.append(job)
+            self._condition.notify()
+            return dropped
+    
+    def get(self, timeout=None):
+        """
+        Take the next job in fair order, blocking until one is available.
+        
+        Returns:
+            A Job, or None on timeout or after close()
+        """
+        with self._condition:
+            while True:
+                if self.closed:
+                    return None
+                best = None
+                for session in self.sessions.values():
+                    if session.jobs and (best is None or
+                                         session.jobs[0].finish_tag < best.jobs[0].finish_tag):
+                        best = session
+                if best is not None:
+                    job = best.jobs.popleft()
+                    self.virtual_time = max(self.virtual_time, job.finish_tag - job.cost / best.weight)
+                    return job
+                if not self._condition.wait(timeout):
+                    return None
+    
+    def pending(self, session_id=None):
+        """Number of queued jobs, overall or for one session."""
+        with self._condition:
+            if session_id is not None:
+                session = self.sessions.get(session_id)
+                return len(session.jobs) if session else 0
+            return sum(len(s.jobs) for s in self.sessions.values())
+    
+    def close(self):
+        """Wake all waiting workers and stop handing out jobs."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
@@ -0,0 +1,382 @@
+import asyncio
+import hmac
+import json
+import struct
+import threading
+import time
+
+from server.scheduler import Job, WeightedFairScheduler
+from utils.event_log import events
+from utils.metrics import metrics
+
+
+# Sample rates a client may declare; anything else is rejected
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+
+class _Session:
+    """State of one connected audio stream."""
+    
+    def __init__(self, session_id, sample_rate, writer, loop):
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.writer = writer
+        self.loop = loop
+        self.buffer = bytearray()
+        self.samples_received = 0
+        self.sequence = 0
+        self.closed = False
+        # Windows submitted but not yet finished (queued or being processed)
+        self.outstanding = 0
+        self.lock = threading.Lock()
+    
+    def job_finished(self):
+        """Mark one submitted window as finished."""
+        with self.lock:
+            self.outstanding -= 1
+
+
+class CaptionSessionServer:
+    """
+    Headless server captioning many remote PCM streams at once.
+    
+    Protocol (TCP):
+        1. Client sends one JSON header line within header_timeout, e.g.
+           {"session": "room-1", "sample_rate": 16000}, plus "key" for a
+           configured client
+        2. Client sends frames of 16-bit mono PCM, each prefixed with a
+           4-byte big-endian length (at most max_frame_bytes). A
+           zero-length frame ends the stream.
+        3. Server answers on the same connection with one JSON line per
+           caption: session, seq, source, translation, audio_start and
+           audio_end (seconds into the stream) and latency (seconds from
+           receiving the end of the window to sending the caption).
+    
+    Audio is cut into fixed windows and all sessions share one pool of
+    recognition/translation worker threads, fed by a weighted fair queue.
+    Weights belong to configured clients, which identify themselves with
+    their key; any other session gets weight 1, whatever name it declares,
+    and can't take a configured client's name. A malformed or late header,
+    an unsupported sample rate or an oversized frame closes the connection.
+    """
+    
+    def __init__(self, recognize, translate, host="127.0.0.1", port=9750, num_workers=4,
+                 window_seconds=3, max_pending_per_session=8, clients=None,
+                 max_frame_bytes=1 << 20, header_timeout=10):
+        """
+        Args:
+            recognize: Callable (pcm_bytes, sample_rate) -> text or None
+            translate: Callable (text) -> translated text
+            host: Address to listen on
+            port: TCP port (0 picks a free port)
+            num_workers: Shared recognition/translation worker threads
+            window_seconds: Audio per recognition job
+            max_pending_per_session: Backlog bound per session
+            clients: Configured clients by name, each a dict with its "key"
+                and scheduling "weight" (other sessions get 1)
+            max_frame_bytes: Largest PCM frame a client may send
+            header_timeout: Seconds a new connection may take to send its header
+        """
+        self.recognize = recognize
+        self.translate = translate
+        self.host = host
+        self.port = port
+        self.num_workers = num_workers
+        self.window_seconds = window_seconds
+        self.scheduler = WeightedFairScheduler(max_pending_per_session)
+        self.clients = dict(clients or {})
+        self.max_frame_bytes = max_frame_bytes
+        self.header_timeout = header_timeout
+        self.sessions = {}
+        self.workers = []
+        self.server = None
+        self.loop = None
+    
+    async def start(self):
+        """Start listening and start the worker threads."""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, daemon=True,
+                                      name=f"caption-worker-{i}")
+            worker.start()
+            self.workers.append(worker)
+        print(f"Caption session server listening on {self.host}:{self.port}")
+    
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled."""
+        if self.server is None:
+            await self.start()
+        await self.server.serve_forever()
+    
+    async def stop(self):
+        """Stop accepting connections and shut down the workers."""
+        self.server.close()
+        await self.server.wait_closed()
+        self.scheduler.close()
+        for worker in self.workers:
+            worker.join(timeout=5)
+        self.workers = []
+    
+    async def _handle_connection(self, reader, writer):
+        """Read the header and PCM frames of one client stream."""
+        session = None
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.header_timeout)
+            name, sample_rate, key = self._parse_header(line)
+            client = self._authenticate(key)
+            if client is not None:
+                name = client
+            session_id = name or str(id(writer))
+            if session_id in self.sessions or (client is None and session_id in self.clients):
+                session_id = f"{session_id}-{id(writer)}"
+            weight = self.clients[client].get("weight", 1.0) if client is not None else 1.0
+            session = _Session(session_id, sample_rate, writer, self.loop)
+            self.sessions[session_id] = session
+            self.scheduler.add_session(session_id, weight)
+            metrics.increment("sessions.opened")
+            
+            window_bytes = int(session.sample_rate * self.window_seconds) * 2
+            while True:
+                length = struct.unpack("!I", await reader.readexactly(4))[0]
+                if length == 0:
+                    break
+                if length > self.max_frame_bytes or length % 2:
+                    raise ValueError(f"invalid frame length {length}")
+                session.buffer += await reader.readexactly(length)
+                while len(session.buffer) >= window_bytes:
+                    self._submit_window(session, bytes(session.buffer[:window_bytes]))
+                    del session.buffer[:window_bytes]
+            # Flush the tail of the stream
+            if len(session.buffer) >= session.sample_rate // 2 * 2:
+                self._submit_window(session, bytes(session.buffer))
+            session.buffer.clear()
+            # Wait for the remaining captions before closing the connection
+            while session.outstanding > 0:
+                await asyncio.sleep(0.05)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.TimeoutError:
+            events.warning("sessions.rejected", "Closing session connection: no header received")
+            metrics.increment("sessions.rejected")
+        except ValueError as e:
+            events.warning("sessions.rejected", f"Closing session connection: {e}",
+                           session=session.session_id if session else None)
+            metrics.increment("sessions.rejected")
+        finally:
+            if session is not None:
+                session.closed = True
+                self.scheduler.remove_session(session.session_id)
+                self.sessions.pop(session.session_id, None)
+                metrics.increment("sessions.closed")
+            writer.close()
+    
+    def _parse_header(self, line):
+        """
+        Parse and validate a client's header line.
+        
+        Returns:
+            (session name or None, sample rate, client key or None)
+        
+        Raises:
+            ValueError: If the header is malformed or the rate unsupported
+        """
+        try:
+            header = json.loads(line.decode("utf-8"))
+        except UnicodeDecodeError as e:
+            raise ValueError(f"invalid header: {e}")
+        if not isinstance(header, dict):
+            raise ValueError("header is not a JSON object")
+        sample_rate = header.get("sample_rate", 16000)
+        if (not isinstance(sample_rate, int) or isinstance(sample_rate, bool)
+                or not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE):
+            raise ValueError(f"unsupported sample rate {sample_rate!r}")
+        name = header.get("session")
+        key = header.get("key")
+        return (str(name) if name else None), sample_rate, (str(key) if key else None)
+    
+    def _authenticate(self, key):
+        """Name of the configured client with this key, or None."""
+        if key is None:
+            return None
+        for name, client in self.clients.items():
+            expected = client.get("key")
+            if expected and hmac.compare_digest(str(expected).encode("utf-8"), key.encode("utf-8")):
+                return name
+        return None
+    
+    def _submit_window(self, session, pcm):
+        """Queue one audio window of a session for recognition."""
+        start_sample = session.samples_received
+        session.samples_received += len(pcm) // 2
+        with session.lock:
+            session.outstanding += 1
+        payload = {
+            "pcm": pcm,
+            "audio_start": start_sample / session.sample_rate,
+            "audio_end": session.samples_received / session.sample_rate,
+            "received": time.monotonic(),
+        }
+        dropped = self.scheduler.submit(Job(session.session_id, len(pcm) / 2 / session.sample_rate,
+                                            payload))
+        if dropped is not None:
+            session.job_finished()
+            metrics.increment("sessions.dropped_windows")
+    
+    def _worker_loop(self):
+        """Shared worker: recognize and translate jobs in fair order."""
+        while True:
+            job = self.scheduler.get()
+            if job is None:
+                return
+            session = self.sessions.get(job.session_id)
+            if session is None or session.closed:
+                continue
+            try:
+                self._process_job(session, job)
+            except Exception as e:
+                events.error("sessions.job_error", f"Error processing session {job.session_id}: {e}",
+                             session=job.session_id)
+            finally:
+                session.job_finished()
+    
+    def _process_job(self, session, job):
+        """Recognize and translate one window and send the caption back."""
+        text = self.recognize(job.payload["pcm"], session.sample_rate)
+        if not text:
+            return
+        translation = self.translate(text)
+        
+        with session.lock:
+            session.sequence += 1
+            sequence = session.sequence
+        message = {
+            "session": session.session_id,
+            "seq": sequence,
+            "source": text,
+            "translation": translation,
+            "audio_start": job.payload["audio_start"],
+            "audio_end": job.payload["audio_end"],
+            "latency": time.monotonic() - job.payload["received"],
+        }
+        line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        session.loop.call_soon_threadsafe(self._send, session, line)
+    
+    def diagnostics_state(self):
+        """Sessions, backlog and worker threads for diagnostics dumps."""
+        return {
+            "workers": [{"name": w.name, "alive": w.is_alive()} for w in self.workers],
+            "pending_jobs": self.scheduler.pending(),
+            "sessions": {
+                session_id: {
+                    "pending": self.scheduler.pending(session_id),
+                    "outstanding": session.outstanding,
+                    "audio_seconds": session.samples_received / session.sample_rate,
+                    "captions": session.sequence,
+                }
+                for session_id, session in list(self.sessions.items())
+            },
+        }
+    
+    def _send(self, session, line):
+        """Write a caption line back to the client (event loop thread)."""
+        if not session.writer.is_closing():
+            session.writer.write(line)
+
+
+def simulated_backends(recognition_latency=0.3, translation_latency=0.1):
+    """
+    Recognize/translate callables that only sleep, for load testing the
+    server without network access.
+    """
+    def recognize(pcm, sample_rate):
+        time.sleep(recognition_latency)
+        return f"[{len(pcm) // 2 / sample_rate:.1f}s of audio]"
+    
+    def translate(text):
+        time.sleep(translation_latency)
+        return text
+    
+    return recognize, translate
+
+
+def create_backends(config):
+    """Recognize/translate callables built on AudioProcessor and Translator."""
+    from audio.processor import AudioProcessor
+    from translation.batcher import TranslationBatcher
+    from translation.glossary import Glossary
+    from translation.translator import Translator
+    
+    language = config.get("language", "ja")
+    processor = AudioProcessor(
+        language=f"{language}-JP",
+        energy_threshold=config.get("energy_threshold", 300),
+        timeout=config.get("recognition_timeout", 5),
+        hedge=config.get("hedge_requests", False),
+        local_engine=config.get("local_recognition_engine") or None
+    )
+    # Sessions share one processor; its throttle is per stream, not global
+    processor.min_process_interval = 0
+    translator = Translator(
+        source_lang=language,
+        target_lang=config.get("translation_language", "en"),
+        timeout=config.get("translation_timeout", 3),
+        hedge=config.get("hedge_requests", False),
+        memory_dir=(config.get("translation_memory_dir", "translation_memory")
+                    if config.get("translation_memory_enabled", True) else None),
+        fuzzy_threshold=config.get("translation_memory_fuzzy_threshold", 0.9),
+        memory_max_entries=config.get("translation_memory_max_entries", 100000),
+        glossary=Glossary.load(config.get("glossary_path", "glossary.json"))
+    )
+    
+    def recognize(pcm, sample_rate):
+        return processor.process_audio(pcm, sample_rate=sample_rate)
+    
+    if config.get("translation_batch_enabled", False):
+        # Workers finishing recognition at about the same time share a request
+        batcher = TranslationBatcher(
+            translator.translate_batch,
+            window_seconds=config.get("translation_batch_window_ms", 50) / 1000.0,
+            max_batch=config.get("translation_batch_max", 8)
+        )
+        return recognize, batcher.translate
+    return recognize, translator.translate
+
+
+def run_headless(config, simulate=False, diagnostics_after=None):
+    """Run the caption session server until interrupted."""
+    from utils.diagnostics import DiagnosticsCollector, install_signal_trigger
+    
+    events.configure(**config.get_event_log_settings())
+    if simulate:
+        recognize, translate = simulated_backends()
+    else:
+        recognize, translate = create_backends(config)
+    server = CaptionSessionServer(
+        recognize, translate,
+        host=config.get("server_host", "127.0.0.1"),
+        port=config.get("server_port", 9750),
+        num_workers=config.get("server_workers", 4),
+        window_seconds=config.get("server_window_seconds", 3),
+        max_pending_per_session=config.get("server_max_pending_per_session", 8),
+        clients=config.get("server_clients", {})
+    )
+    
+    diagnostics = DiagnosticsCollector(
+        output_dir=config.get("diagnostics_dir", "diagnostics"),
+        duration=config.get("diagnostics_duration", 10)
+    )
+    diagnostics.add_state_provider("sessions", server.diagnostics_state)
+    diagnostics.add_state_provider("event_log", events.state)
+    signal_name = install_signal_trigger(diagnostics)
+    if signal_name:
+        print(f"Send {signal_name} to write a diagnostics archive")
+    if diagnostics_after is not None:
+        threading.Timer(diagnostics_after, diagnostics.dump_async).start()
+    
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Caption session server stopped")
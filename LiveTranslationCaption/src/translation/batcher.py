@@ -0,0 +1,153 @@
+import re
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+from utils.metrics import metrics as default_metrics
+
+
+# Each segment of a joined request is preceded by a numbered marker on its
+# own line; translation services pass bracketed numbers through unchanged
+SEGMENT_MARKER = "[[{}]]"
+SEGMENT_MARKER_PATTERN = re.compile(r"\[\[\s*(\d+)\s*\]\]")
+
+
+def join_segments(texts):
+    """Join texts into one request, each preceded by its numbered marker."""
+    return "\n".join(f"{SEGMENT_MARKER.format(i)}\n{text}" for i, text in enumerate(texts))
+
+
+def split_segments(translated, count):
+    """
+    Split the translation of a joined request back into segments.
+    
+    Returns:
+        List of count translated segments, or None if the markers did not
+        survive translation intact (missing, repeated, out of order, or
+        with text outside of them)
+    """
+    parts = SEGMENT_MARKER_PATTERN.split(translated)
+    # parts = [before, index, text, index, text, ...]
+    if parts[0].strip() or len(parts) != 2 * count + 1:
+        return None
+    segments = []
+    for i in range(count):
+        if int(parts[2 * i + 1]) != i:
+            return None
+        segment = parts[2 * i + 2].strip()
+        if not segment:
+            return None
+        segments.append(segment)
+    return segments
+
+
+class TranslationBatcher:
+    """
+    Micro-batches translation requests from concurrent callers.
+    
+    Segments submitted within window_seconds of the first one (up to
+    max_batch segments or max_chars characters) are translated with a single
+    translate_batch call. While a batch is in flight, newly submitted
+    segments wait and form the next one, so bursts are absorbed into fewer,
+    larger requests and a lone segment waits at most window_seconds.
+    """
+    
+    def __init__(self, translate_batch, window_seconds=0.05, max_batch=8, max_chars=4000,
+                 metrics=None):
+        """
+        Args:
+            translate_batch: Callable (list of texts) -> list of translations,
+                e.g. Translator.translate_batch
+            window_seconds: How long to wait for more segments after the first
+            max_batch: Maximum segments per request
+            max_chars: Maximum characters per request
+            metrics: Metrics registry for the batch counters
+        """
+        self.translate_batch = translate_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.max_chars = max_chars
+        self.metrics = metrics or default_metrics
+        self.queue = queue.Queue()
+        self.thread = None
+        self._carry = None
+        self._start_lock = threading.Lock()
+        self.stats = {"batches": 0, "segments": 0}
+    
+    def submit(self, text):
+        """
+        Queue a segment for translation.
+        
+        Returns:
+            Future resolving to the translated text
+        """
+        if self.thread is None:
+            with self._start_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, daemon=True,
+                                                   name="translation-batcher")
+                    self.thread.start()
+        future = Future()
+        self.queue.put((text, future))
+        return future
+    
+    def translate(self, text, timeout=None):
+        """Translate one segment, batched with concurrent callers (blocks)."""
+        return self.submit(text).result(timeout)
+    
+    def _run(self):
+        """Dispatcher thread: collect a batch, translate it, resolve the futures."""
+        while True:
+            first = self._carry if self._carry is not None else self.queue.get()
+            self._carry = None
+            if first is None:
+                return
+            batch = [first]
+            chars = len(first[0])
+            deadline = time.monotonic() + self.window_seconds
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if chars + len(item[0]) > self.max_chars:
+                    self._carry = item
+                    break
+                batch.append(item)
+                chars += len(item[0])
+            self._dispatch(batch)
+            if stop:
+                return
+    
+    def _dispatch(self, batch):
+        """Translate one batch and hand each caller its segment."""
+        self.stats["batches"] += 1
+        self.stats["segments"] += len(batch)
+        self.metrics.increment("translation.batches")
+        self.metrics.increment("translation.batched_segments", len(batch))
+        try:
+            results = self.translate_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        if len(results) != len(batch):
+            error = ValueError(f"translate_batch returned {len(results)} results for {len(batch)} texts")
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+    
+    def close(self):
+        """Translate what is queued, then stop the dispatcher thread."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+            self.thread = None
@@ -0,0 +1,164 @@
+import os
+import re
+import json
+
+from translation.memory import normalize
+
+
+class Glossary:
+    """
+    User glossary pinning domain terms to fixed translations.
+    
+    Terms are matched in one pass over the text with an Aho-Corasick
+    automaton, so the cost does not grow with the number of terms. Before a
+    text is sent to a translation service, matched terms are replaced with
+    numbered placeholders that services leave alone; afterwards the
+    placeholders are replaced with the pinned translations.
+    """
+    
+    PLACEHOLDER = "<{}>"
+    PLACEHOLDER_PATTERN = re.compile(r"<\s*(\d+)\s*>")
+    
+    def __init__(self, entries=None):
+        """
+        Args:
+            entries: Optional dict of source term -> pinned translation
+        """
+        self.entries = {}
+        # Trie nodes: children dicts, failure links and the term ending at each node
+        self._children = [{}]
+        self._fail = [0]
+        self._output = [None]
+        self._built = True
+        for term, translation in (entries or {}).items():
+            self.add(term, translation)
+    
+    @classmethod
+    def load(cls, path):
+        """Load a glossary from a JSON object file (empty if it doesn't exist)."""
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error loading glossary {path}: {e}")
+            return cls()
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def add(self, term, translation):
+        """Add or replace a term."""
+        term = normalize(term)
+        if not term:
+            return
+        self.entries[term] = translation
+        node = 0
+        for char in term:
+            child = self._children[node].get(char)
+            if child is None:
+                child = len(self._children)
+                self._children.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._children[node][char] = child
+            node = child
+        self._output[node] = term
+        self._built = False
+    
+    def _build(self):
+        """Compute failure links breadth first."""
+        queue = list(self._children[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        for node in queue:
+            for char, child in self._children[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._children[fail]:
+                    fail = self._fail[fail]
+                target = self._children[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                queue.append(child)
+        self._built = True
+    
+    def find(self, text):
+        """
+        Non-overlapping glossary terms in text, leftmost-longest first.
+        
+        Returns:
+            List of (start, end, term)
+        """
+        if not self.entries:
+            return []
+        if not self._built:
+            self._build()
+        matches = []
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self._children[node]:
+                node = self._fail[node]
+            node = self._children[node].get(char, 0)
+            # Every term ending here is on the failure chain
+            match = node
+            while match:
+                term = self._output[match]
+                if term is not None:
+                    matches.append((i + 1 - len(term), i + 1, term))
+                match = self._fail[match]
+        
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        selected = []
+        end = 0
+        for match in matches:
+            if match[0] >= end:
+                selected.append(match)
+                end = match[1]
+        return selected
+    
+    def protect(self, text):
+        """
+        Replace glossary terms with placeholders.
+        
+        Returns:
+            (text with placeholders, list of pinned translations by placeholder number)
+        """
+        text = normalize(text)
+        matches = self.find(text)
+        if not matches:
+            return text, []
+        parts = []
+        pinned = []
+        position = 0
+        for start, end, term in matches:
+            parts.append(text[position:start])
+            parts.append(self.PLACEHOLDER.format(len(pinned)))
+            pinned.append(self.entries[term])
+            position = end
+        parts.append(text[position:])
+        return "".join(parts), pinned
+    
+    def restore(self, translated, pinned):
+        """
+        Replace placeholders in a translation with the pinned translations.
+        
+        Returns:
+            (restored text, True if every placeholder was found)
+        """
+        if not pinned:
+            return translated, True
+        found = set()
+        
+        def replace(match):
+            index = int(match.group(1))
+            if index >= len(pinned):
+                return match.group(0)
+            found.add(index)
+            return pinned[index]
+        
+        restored = self.PLACEHOLDER_PATTERN.sub(replace, translated)
+        return restored, len(found) == len(pinned)
+    
+    def translate_whole(self, text):
+        """Pinned translation if the whole text is a glossary term, else None."""
+        return self.entries.get(normalize(text))
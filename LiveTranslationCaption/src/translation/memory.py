@@ -0,0 +1,264 @@
+import os
+import json
+import math
+import threading
+import unicodedata
+from collections import deque
+from difflib import SequenceMatcher
+
+
+# Characters a fuzzy match may differ in besides punctuation, symbols and
+# whitespace: long vowel marks and wave dashes anywhere, and particles
+# only at the end of a sentence
+FUZZY_IGNORABLE = set("ー〜")
+SENTENCE_FINAL_PARTICLES = set("ねよ")
+
+
+def normalize(text):
+    """Normalize a segment for matching (NFKC, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def _ends_sentence(text, index):
+    """Check whether only particles, punctuation or whitespace follow text[index] up to a sentence end."""
+    for char in text[index + 1:]:
+        if char in SENTENCE_FINAL_PARTICLES or char.isspace():
+            continue
+        return unicodedata.category(char)[0] == "P"
+    return True
+
+
+def differs_only_in_form(a, b):
+    """
+    Check whether two segments differ only in characters that don't change
+    the meaning: punctuation, symbols, whitespace, FUZZY_IGNORABLE, and
+    SENTENCE_FINAL_PARTICLES at the end of a sentence.
+    
+    A similarity score alone can't tell "開催します" from "開催しません";
+    a changed digit, negation or name always counts as a real difference.
+    """
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        for text, start, end in ((a, i1, i2), (b, j1, j2)):
+            for index in range(start, end):
+                char = text[index]
+                if char in FUZZY_IGNORABLE or unicodedata.category(char)[0] in "PSZ":
+                    continue
+                if char in SENTENCE_FINAL_PARTICLES and _ends_sentence(text, index):
+                    continue
+                return False
+    return True
+
+
+def char_ngrams(text, n):
+    """Set of character n-grams of text (the whole text if shorter than n)."""
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class TranslationMemory:
+    """
+    Local store of past translations with exact and fuzzy lookup.
+    
+    Exact matches are a dict lookup on the normalized source. Fuzzy matches
+    use an inverted index from character n-grams (which works for Japanese
+    without word segmentation) to entries, scored by the Dice coefficient
+    of the n-gram sets. Only the rarest n-grams of the query are looked up
+    in the index; any entry that could reach the threshold must share at
+    least one of them, so common n-grams never have to be scanned. A fuzzy
+    match is only used when the texts differ in punctuation, symbols or
+    sentence-final particles (see differs_only_in_form), since its stored
+    translation is shown as is.
+    
+    Entries are appended to a JSON lines file so the memory survives
+    restarts. When max_entries is reached the oldest entries are evicted.
+    """
+    
+    def __init__(self, path=None, ngram_size=3, fuzzy_threshold=0.9, max_entries=100000):
+        """
+        Args:
+            path: JSON lines file to load from and append to (None keeps it in memory)
+            ngram_size: Character n-gram length of the fuzzy index
+            fuzzy_threshold: Minimum Dice similarity of a fuzzy match (0-1, >1 disables)
+            max_entries: Entries kept before the oldest are evicted
+        """
+        self.path = path
+        self.ngram_size = ngram_size
+        self.fuzzy_threshold = fuzzy_threshold
+        self.max_entries = max_entries
+        
+        self.exact = {}
+        # Parallel lists indexed by entry id; evicted entries become None
+        self.sources = []
+        self.targets = []
+        # Number of n-grams of each entry; the sets themselves are only
+        # kept in the postings, and recomputed for fuzzy candidates
+        self.sizes = []
+        self.postings = {}
+        self.order = deque()
+        self.evicted = 0
+        # Lines in the JSON lines file, including replaced and evicted entries
+        self.file_lines = 0
+        self._lock = threading.Lock()
+        
+        if path and os.path.exists(path):
+            self._load()
+    
+    def __len__(self):
+        return len(self.exact)
+    
+    def _load(self):
+        """Load entries from the JSON lines file."""
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    self._insert(entry["source"], entry["target"])
+                except (ValueError, KeyError):
+                    continue
+        self.file_lines = lines
+        self._compact_file()
+    
+    def add(self, source, target):
+        """
+        Remember a confirmed translation.
+        
+        Returns:
+            True if the entry was new or changed
+        """
+        source = normalize(source)
+        if not source or not target:
+            return False
+        with self._lock:
+            entry_id = self.exact.get(source)
+            if entry_id is not None and self.targets[entry_id] == target:
+                return False
+            self._insert(source, target)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"source": source, "target": target},
+                                       ensure_ascii=False) + "\n")
+                self.file_lines += 1
+        self._compact_file()
+        return True
+    
+    def _insert(self, source, target):
+        """Add or replace an entry in the indexes (caller holds the lock)."""
+        source = normalize(source)
+        if source in self.exact:
+            self._remove(source)
+        entry_id = len(self.sources)
+        grams = char_ngrams(source, self.ngram_size)
+        self.exact[source] = entry_id
+        self.sources.append(source)
+        self.targets.append(target)
+        self.sizes.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(entry_id)
+        self.order.append(entry_id)
+        while len(self.exact) > self.max_entries:
+            oldest = self.order.popleft()
+            if self.sources[oldest] is not None:
+                self._remove(self.sources[oldest])
+    
+    def _compact_file(self):
+        """Rewrite the file without replaced and evicted entries once it has grown stale."""
+        if self.path and self.file_lines > 2 * len(self.exact) + 1000:
+            self.save()
+    
+    def _remove(self, source):
+        """Tombstone an entry; the indexes are compacted lazily."""
+        entry_id = self.exact.pop(source)
+        self.sources[entry_id] = None
+        self.targets[entry_id] = None
+        self.sizes[entry_id] = None
+        self.evicted += 1
+        if self.evicted > 1000 and self.evicted > len(self.exact) // 4:
+            self._compact()
+    
+    def _compact(self):
+        """Renumber the live entries and rebuild the indexes without tombstones."""
+        live = [(self.sources[i], self.targets[i], self.sizes[i])
+                for i in self.order if self.sources[i] is not None]
+        self.sources = [entry[0] for entry in live]
+        self.targets = [entry[1] for entry in live]
+        self.sizes = [entry[2] for entry in live]
+        self.exact = {source: i for i, source in enumerate(self.sources)}
+        self.order = deque(range(len(live)))
+        self.postings = {}
+        for entry_id, source in enumerate(self.sources):
+            for gram in char_ngrams(source, self.ngram_size):
+                self.postings.setdefault(gram, []).append(entry_id)
+        self.evicted = 0
+    
+    def lookup(self, text):
+        """
+        Best translation of text from the memory.
+        
+        Returns:
+            (target, score) with score 1.0 for an exact match, or None
+        """
+        source = normalize(text)
+        with self._lock:
+            entry_id = self.exact.get(source)
+            if entry_id is not None:
+                return self.targets[entry_id], 1.0
+        if self.fuzzy_threshold > 1:
+            return None
+        return self.fuzzy(source)
+    
+    def fuzzy(self, source):
+        """
+        Most similar entry above the fuzzy threshold that differs from source
+        only in form, as (target, score), or None.
+        """
+        query = char_ngrams(source, self.ngram_size)
+        if not query:
+            return None
+        t = self.fuzzy_threshold
+        size = len(query)
+        # Dice >= t needs at least t*|A|/(2-t) shared n-grams and bounds |B|
+        min_shared = math.ceil(t * size / (2 - t) - 1e-9)
+        min_size = min_shared
+        max_size = (2 - t) * size / t
+        
+        with self._lock:
+            # Any qualifying entry shares one of the (size - min_shared + 1)
+            # rarest query n-grams
+            ranked = sorted(query, key=lambda g: len(self.postings.get(g, ())))
+            candidates = set()
+            for gram in ranked[:size - min_shared + 1]:
+                candidates.update(self.postings.get(gram, ()))
+            
+            matches = []
+            for entry_id in candidates:
+                count = self.sizes[entry_id]
+                if count is None or not min_size <= count <= max_size:
+                    continue
+                grams = char_ngrams(self.sources[entry_id], self.ngram_size)
+                score = 2.0 * len(query & grams) / (size + count)
+                if score >= t:
+                    matches.append((score, entry_id))
+            for score, entry_id in sorted(matches, reverse=True):
+                if differs_only_in_form(source, self.sources[entry_id]):
+                    return self.targets[entry_id], score
+            return None
+    
+    def save(self):
+        """Rewrite the JSON lines file with the current entries."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry_id in self.order:
+                    if self.sources[entry_id] is not None:
+                        f.write(json.dumps({"source": self.sources[entry_id],
+                                            "target": self.targets[entry_id]},
+                                           ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self.file_lines = len(self.exact)
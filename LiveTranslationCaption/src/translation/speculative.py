@@ -0,0 +1,208 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import metrics as default_metrics
+
+
+class _Speculation:
+    """One speculative translation of a partial hypothesis."""
+    
+    def __init__(self, text):
+        self.text = text
+        self.future = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+
+
+class SpeculativeTranslator:
+    """
+    Translates partial recognition hypotheses before the final text arrives.
+    
+    speculate() is called with each new partial hypothesis and starts a
+    translation in the background. finalize() is called with the final text:
+    if a speculation translated exactly that text its result is used (waiting
+    for it if it is still in flight), otherwise the translation cache or a
+    normal translation is used. Either way, the other speculations are stale
+    and are cancelled.
+    
+    Only stable hypotheses are translated: one reported as stable (recognized
+    after speech paused, see SpeechSegmenter), or one reported
+    min_stable_updates times in a row. A newer hypothesis supersedes older
+    ones that have not been sent yet. Speculative load is bounded by a budget
+    of max_in_flight running calls; a hypothesis arriving over budget is held
+    and started as soon as a running call finishes, rather than dropped, so
+    the latest stable hypothesis is always translated. A request that has
+    already been sent can't be recalled, so cancelling a running one only
+    discards its result.
+    """
+    
+    def __init__(self, translator, max_in_flight=2, min_length=4, min_stable_updates=2,
+                 metrics=None):
+        """
+        Args:
+            translator: Translator used for the actual calls and its cache
+            max_in_flight: Maximum concurrent speculative translations
+            min_length: Hypotheses shorter than this are not worth speculating on
+            min_stable_updates: Consecutive identical reports before speculating
+            metrics: Metrics registry for the speculation counters
+        """
+        self.translator = translator
+        self.max_in_flight = max_in_flight
+        self.min_length = min_length
+        self.min_stable_updates = min_stable_updates
+        self.last_hypothesis = None
+        self.stable_updates = 0
+        self.metrics = metrics or default_metrics
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight,
+                                           thread_name_prefix="speculative-translate")
+        self.speculations = {}
+        # Newest hypothesis waiting for the budget
+        self.pending = None
+        # Reentrant: a done callback may run in the thread that adds it
+        self._lock = threading.RLock()
+        self.stats = {
+            "speculated": 0,      # speculative calls submitted
+            "cancelled": 0,       # cancelled before they were sent
+            "wasted": 0,          # sent, but the result was never used
+            "hits": 0,            # final text reused a speculation
+            "cache_hits": 0,      # final text was already in the translation cache
+            "misses": 0,          # final text had to be translated after the fact
+            "saved_seconds": 0.0, # translation latency taken off the critical path
+        }
+    
+    def speculate(self, hypothesis, stable=False):
+        """
+        Start translating a partial hypothesis (never blocks).
+        
+        Args:
+            hypothesis: Partial hypothesis text
+            stable: The hypothesis is not expected to change; don't wait for repeats
+        
+        Returns:
+            True if a speculative translation was started or is held for the budget
+        """
+        text = hypothesis.strip() if hypothesis else ""
+        with self._lock:
+            if text == self.last_hypothesis:
+                self.stable_updates += 1
+            else:
+                self.last_hypothesis = text
+                self.stable_updates = 1
+            if (not stable and self.stable_updates < self.min_stable_updates) or len(text) < self.min_length:
+                return False
+            if self.translator.get_cached(text) is not None:
+                return False
+            if text in self.speculations or (self.pending and self.pending.text == text):
+                return False
+            # Older hypotheses that have not been sent give way to this one
+            for stale in list(self.speculations.values()):
+                if not stale.future.running() and stale.future.cancel():
+                    self._discard(stale)
+            self._drop_pending()
+            speculation = _Speculation(text)
+            if sum(1 for s in self.speculations.values() if not s.future.done()) >= self.max_in_flight:
+                self.pending = speculation
+                self.metrics.increment("speculation.over_budget")
+                return True
+            self._start(speculation)
+            return True
+    
+    def _start(self, speculation):
+        """Submit a speculation (caller holds the lock)."""
+        speculation.future = self.executor.submit(self._run, speculation)
+        self.speculations[speculation.text] = speculation
+        self.stats["speculated"] += 1
+        self.metrics.increment("speculation.started")
+        speculation.future.add_done_callback(self._start_pending)
+    
+    def _start_pending(self, future):
+        """Done callback: start the held hypothesis now that the budget allows."""
+        with self._lock:
+            if self.pending is None:
+                return
+            if sum(1 for s in self.speculations.values() if not s.future.done()) < self.max_in_flight:
+                speculation, self.pending = self.pending, None
+                try:
+                    self._start(speculation)
+                except RuntimeError:
+                    # Shut down meanwhile
+                    pass
+    
+    def _run(self, speculation):
+        """Worker: draft a translation of one hypothesis without filling the cache."""
+        speculation.started = time.monotonic()
+        try:
+            return self.translator.draft(speculation.text)
+        finally:
+            speculation.finished = time.monotonic()
+    
+    def finalize(self, text):
+        """
+        Translate final recognized text, reusing a matching speculation.
+        
+        Returns:
+            Translated text
+        """
+        text = text.strip() if text else ""
+        with self._lock:
+            self.last_hypothesis = None
+            speculation = self.speculations.pop(text, None)
+            self._cancel_all()
+        
+        if speculation is not None and not speculation.future.cancelled():
+            arrived = time.monotonic()
+            try:
+                translated, backend, remember = speculation.future.result()
+            except Exception:
+                translated, backend, remember = None, None, False
+            # A source-text fallback is not a translation; ask again below
+            if translated and backend != self.translator.SOURCE_TEXT_BACKEND:
+                # Without speculation the call would have started now
+                waited = time.monotonic() - arrived
+                duration = (speculation.finished or time.monotonic()) - (speculation.started or arrived)
+                saved = max(0.0, duration - waited)
+                self.stats["hits"] += 1
+                self.stats["saved_seconds"] += saved
+                self.metrics.increment("speculation.hits")
+                self.translator.confirm(text, translated, backend, remember)
+                return translated
+        
+        if self.translator.get_cached(text) is not None:
+            self.stats["cache_hits"] += 1
+            self.metrics.increment("speculation.cache_hits")
+        else:
+            self.stats["misses"] += 1
+            self.metrics.increment("speculation.misses")
+        return self.translator.translate(text)
+    
+    def _cancel_all(self):
+        """Cancel every outstanding speculation (caller holds the lock)."""
+        self._drop_pending()
+        for speculation in list(self.speculations.values()):
+            speculation.future.cancel()
+            self._discard(speculation)
+    
+    def _drop_pending(self):
+        """Forget the hypothesis held for the budget (caller holds the lock)."""
+        if self.pending is not None:
+            self.pending = None
+            self.stats["cancelled"] += 1
+            self.metrics.increment("speculation.cancelled")
+    
+    def _discard(self, speculation):
+        """Forget a speculation whose result will not be used (caller holds the lock)."""
+        self.speculations.pop(speculation.text, None)
+        if speculation.future.cancelled():
+            self.stats["cancelled"] += 1
+            self.metrics.increment("speculation.cancelled")
+        else:
+            self.stats["wasted"] += 1
+            self.metrics.increment("speculation.wasted")
+    
+    def shutdown(self):
+        """Cancel outstanding speculations and stop the worker threads."""
+        with self._lock:
+            self._cancel_all()
+        self.executor.shutdown(wait=False)
@@ -1,17 +1,91 @@
-from googletrans import Translator as GoogleTranslator
-import time
+import os
+import threading
+from collections import OrderedDict
+
+from translation.batcher import join_segments, split_segments
+from translation.memory import TranslationMemory
+from utils.event_log import events
+from utils.metrics import metrics
+from utils.resilience import Backend, FallbackChain, AllBackendsFailedError
 
 
 class Translator:
     """Translates text from Japanese to English."""
     
-    def __init__(self, source_lang='ja', target_lang='en'):
+    SOURCE_TEXT_BACKEND = "source_text"
+    # Reported by draft() for translations known without a request
+    CACHE_BACKEND = "cache"
+    LOCAL_BACKEND = "local"
+    
+    def __init__(self, source_lang='ja', target_lang='en', timeout=None, hedge=False,
+                 backends=None, memory_dir=None, fuzzy_threshold=0.9, glossary=None, cache_size=100,
+                 memory_max_entries=100000):
+        """
+        Args:
+            source_lang: Source language code
+            target_lang: Target language code
+            timeout: Seconds to wait for the remote service before falling back
+            hedge: Send a duplicate request when the first one is slower than p95
+            backends: Optional list of Backend objects tried in order instead of
+                Google Translate. Showing the source text is always the last resort.
+            memory_dir: Directory of the translation memory (None disables it)
+            fuzzy_threshold: Minimum similarity of fuzzy translation memory matches
+            glossary: Optional Glossary of terms with pinned translations
+            cache_size: Translations kept in the least recently used cache
+            memory_max_entries: Translation memory entries kept before the oldest are evicted
+        """
         self.source_lang = source_lang
         self.target_lang = target_lang
-        self.translator = GoogleTranslator()
+        self.translator = None
         self.last_translation = ""
-        self.translation_cache = {}
+        self.translation_cache = OrderedDict()
+        self.cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        self.memory_dir = memory_dir
+        self.fuzzy_threshold = fuzzy_threshold
+        self.memory_max_entries = memory_max_entries
+        self.memory = self._open_memory()
+        self.glossary = glossary
         
+        if backends is None:
+            from googletrans import Translator as GoogleTranslator
+            self.translator = GoogleTranslator()
+            backends = [Backend("google_translate", self._translate_remote,
+                                timeout=timeout, hedge=hedge)]
+        self.backends = FallbackChain(
+            list(backends) + [Backend(self.SOURCE_TEXT_BACKEND, lambda text: text)]
+        )
+    
+    def _open_memory(self):
+        """Translation memory of the current language pair, or None."""
+        if not self.memory_dir:
+            return None
+        os.makedirs(self.memory_dir, exist_ok=True)
+        path = os.path.join(self.memory_dir, f"{self.source_lang}-{self.target_lang}.jsonl")
+        return TranslationMemory(path, fuzzy_threshold=self.fuzzy_threshold,
+                                 max_entries=self.memory_max_entries)
+    
+    def _translate_remote(self, text):
+        """Translate text with Google Translate."""
+        result = self.translator.translate(text, src=self.source_lang, dest=self.target_lang)
+        return result.text
+    
+    def get_cached(self, text):
+        """Cached translation of text, or None."""
+        with self._cache_lock:
+            translated_text = self.translation_cache.get(text)
+            if translated_text is not None:
+                self.translation_cache.move_to_end(text)
+            return translated_text
+    
+    def cache_translation(self, text, translated_text):
+        """Add a translation to the cache, evicting the least recently used."""
+        with self._cache_lock:
+            self.translation_cache[text] = translated_text
+            self.translation_cache.move_to_end(text)
+            while len(self.translation_cache) > self.cache_size:
+                self.translation_cache.popitem(last=False)
+    
     def translate(self, text):
         """
         Translate text from source language to target language.
@@ -25,41 +99,172 @@ class Translator:
         if not text or text.strip() == "":
             return ""
         
+        translated_text, backend, remember = self.draft(text)
+        self.confirm(text, translated_text, backend, remember)
+        return translated_text
+    
+    def draft(self, text):
+        """
+        Translate text without caching the result.
+        
+        Speculative translations of partial hypotheses are drafted and only
+        confirmed once the text turns out to be final.
+        
+        Returns:
+            (translated text, backend, remember): backend is CACHE_BACKEND or
+            LOCAL_BACKEND for translations known without a request, and
+            SOURCE_TEXT_BACKEND if every service failed and the source text
+            is returned; remember is True if the translation may be added to
+            the translation memory
+        """
         # Check cache first
-        if text in self.translation_cache:
-            return self.translation_cache[text]
+        cached = self.get_cached(text)
+        if cached is not None:
+            return cached, self.CACHE_BACKEND, False
+        
+        # Known phrases and glossary terms never reach the remote service
+        local = self._translate_local(text)
+        if local is not None:
+            return local, self.LOCAL_BACKEND, False
         
         try:
-            result = self.translator.translate(text, src=self.source_lang, dest=self.target_lang)
-            translated_text = result.text
-            
-            # Cache the translation
-            self.translation_cache[text] = translated_text
-            
-            # Limit cache size
-            if len(self.translation_cache) > 100:
-                # Remove oldest entries
-                items = list(self.translation_cache.items())
-                self.translation_cache = dict(items[50:])
-            
-            self.last_translation = translated_text
-            print(f"Translated to English: {translated_text}")
-            return translated_text
-            
-        except Exception as e:
-            print(f"Translation error: {e}")
-            return text  # Return original text if translation fails
+            request_text, pinned = self._protect(text)
+            backend, translated_text = self.backends.call(request_text)
+        except AllBackendsFailedError as e:
+            events.error("translation.failed", f"Translation error: {e}")
+            return text, self.SOURCE_TEXT_BACKEND, False  # Return original text if translation fails
+        if backend == self.SOURCE_TEXT_BACKEND:
+            return text, backend, False
+        
+        translated_text, confirmed = self._restore(translated_text, pinned)
+        return translated_text, backend, confirmed
+    
+    def confirm(self, text, translated_text, backend, remember=False):
+        """
+        Accept a drafted translation of final text: cache it and, if
+        remember is set, add it to the translation memory.
+        
+        The source text shown when every backend failed is never cached, so
+        the next request retries the service.
+        """
+        if backend in (self.CACHE_BACKEND, self.SOURCE_TEXT_BACKEND):
+            return
+        self.cache_translation(text, translated_text)
+        if backend == self.LOCAL_BACKEND:
+            return
+        
+        # Remember it for next time
+        if remember and self.memory is not None:
+            self.memory.add(text, translated_text)
+        
+        self.last_translation = translated_text
+        events.info("translation.result", f"Translated to English: {translated_text}",
+                    backend=backend, text=translated_text)
+    
+    def _protect(self, text):
+        """Request text with glossary terms replaced by placeholders, and the pinned translations."""
+        if self.glossary:
+            return self.glossary.protect(text)
+        return text, []
+    
+    def _restore(self, translated_text, pinned):
+        """
+        Put pinned glossary translations back in place of their placeholders.
+        
+        Returns:
+            (translated text, whether every placeholder survived)
+        """
+        if not pinned:
+            return translated_text, True
+        translated_text, confirmed = self.glossary.restore(translated_text, pinned)
+        if not confirmed:
+            metrics.increment("glossary.lost_placeholders")
+        return translated_text, confirmed
+    
+    def _translate_local(self, text):
+        """Translation from the glossary or translation memory, or None."""
+        if self.glossary:
+            pinned = self.glossary.translate_whole(text)
+            if pinned is not None:
+                metrics.increment("glossary.whole_hits")
+                return pinned
+        if self.memory is not None:
+            match = self.memory.lookup(text)
+            if match is not None:
+                translated_text, score = match
+                metrics.increment("translation_memory.exact_hits" if score >= 1.0
+                                  else "translation_memory.fuzzy_hits")
+                return translated_text
+        return None
     
     def translate_batch(self, texts):
-        """Translate multiple texts."""
-        results = []
-        for text in texts:
-            results.append(self.translate(text))
-            time.sleep(0.1)  # Small delay to avoid rate limiting
+        """
+        Translate multiple texts with one remote request.
+        
+        Cached and locally known texts are resolved first; the rest are
+        joined with numbered segment markers and sent together. If the
+        markers don't come back intact, each text is translated on its own.
+        
+        Returns:
+            List of translated texts in the order of texts
+        """
+        results = [None] * len(texts)
+        pending = {}
+        for i, text in enumerate(texts):
+            cached = self.get_cached(text) if text else None
+            if not text or text.strip() == "":
+                results[i] = ""
+            elif cached is not None:
+                results[i] = cached
+            else:
+                local = self._translate_local(text)
+                if local is not None:
+                    self.confirm(text, local, self.LOCAL_BACKEND)
+                    results[i] = local
+                else:
+                    # Repeated texts are requested once
+                    pending.setdefault(text, []).append(i)
+        
+        if len(pending) > 1:
+            unique = list(pending)
+            protected = [self._protect(text) for text in unique]
+            try:
+                # The joined request gets the time of as many single ones
+                backend, translated = self.backends.call(join_segments([p[0] for p in protected]),
+                                                         timeout_scale=len(unique))
+                segments = split_segments(translated, len(unique))
+                if backend == self.SOURCE_TEXT_BACKEND:
+                    # Every translation backend failed; show the source texts uncached
+                    for text in unique:
+                        for i in pending.pop(text):
+                            results[i] = text
+                elif segments is None:
+                    metrics.increment("translation.batch_split_failures")
+                else:
+                    metrics.increment("translation.batch_requests")
+                    for text, (_, pinned), segment in zip(unique, protected, segments):
+                        translated_text, confirmed = self._restore(segment, pinned)
+                        self.confirm(text, translated_text, backend, confirmed)
+                        for i in pending.pop(text):
+                            results[i] = translated_text
+            except AllBackendsFailedError as e:
+                events.error("translation.failed", f"Translation error: {e}")
+        
+        # A single text, or a batch whose response could not be split
+        for text, indexes in pending.items():
+            translated_text = self.translate(text)
+            for i in indexes:
+                results[i] = translated_text
         return results
     
     def set_languages(self, source_lang, target_lang):
         """Change source and target languages."""
         self.source_lang = source_lang
         self.target_lang = target_lang
-        self.translation_cache.clear()  # Clear cache when languages change
\ No newline at end of file
+        with self._cache_lock:
+            self.translation_cache.clear()  # Clear cache when languages change
+        self.memory = self._open_memory()
+    
+    def shutdown(self):
+        """Stop the backend worker threads."""
+        self.backends.shutdown()
\ No newline at end of file
@@ -4,10 +4,19 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt
 import json
 
+from utils.config import Config
+
 
 class SettingsDialog(QDialog):
     """Settings dialog for configuring the application."""
     
+    PROFILE_LABELS = [
+        ("low-latency", "Low latency"),
+        ("balanced", "Balanced"),
+        ("throughput", "Battery / Throughput"),
+        ("custom", "Custom (config.json)"),
+    ]
+    
     def __init__(self, config_path, parent=None):
         super().__init__(parent)
         self.config_path = config_path
@@ -91,6 +100,26 @@ class SettingsDialog(QDialog):
         display_group.setLayout(display_layout)
         layout.addWidget(display_group)
         
+        # Performance settings group
+        performance_group = QGroupBox("Performance")
+        performance_layout = QFormLayout()
+        
+        self.profile_combo = QComboBox()
+        for name, label in self.PROFILE_LABELS:
+            self.profile_combo.addItem(label, name)
+        # Config migrates legacy latency keys to "custom"; don't save them away
+        profile = Config(self.config_path).get("performance_profile", "balanced")
+        profile_index = self.profile_combo.findData(profile)
+        self.profile_combo.setCurrentIndex(max(profile_index, 0))
+        performance_layout.addRow("Profile:", self.profile_combo)
+        
+        self.autotune_check = QCheckBox("Adjust automatically within the profile")
+        self.autotune_check.setChecked(self.config.get("auto_tune", False))
+        performance_layout.addRow("", self.autotune_check)
+        
+        performance_group.setLayout(performance_layout)
+        layout.addWidget(performance_group)
+        
         # Buttons
         button_layout = QHBoxLayout()
         
@@ -112,6 +141,8 @@ class SettingsDialog(QDialog):
         """Save settings and close dialog."""
         self.config["caption_display_duration"] = self.duration_spin.value()
         self.config["enable_auto_start"] = self.autostart_check.isChecked()
+        self.config["performance_profile"] = self.profile_combo.currentData()
+        self.config["auto_tune"] = self.autotune_check.isChecked()
         
         if self._save_config():
             self.accept()
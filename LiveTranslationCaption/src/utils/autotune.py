@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import deque
+
+from utils.event_log import events
+
+
+class AutoTuner:
+    """
+    Adjusts the recognition window within a performance profile.
+    
+    Fed with measured recognition latencies, it samples the process CPU load
+    and periodically moves window_seconds inside the profile's window_range:
+    longer windows (fewer, larger requests) when recognition can't keep up
+    or the CPU is busy, shorter windows (lower caption latency) when there
+    is headroom. min_process_interval and processing_interval are scaled
+    along with the window so the profile stays consistent.
+    """
+    
+    def __init__(self, settings, adjust_interval=10.0, step=0.25, high_load=0.8, low_load=0.5,
+                 clock=time.monotonic, cpu_clock=time.process_time):
+        """
+        Args:
+            settings: Performance settings from Config.get_performance_settings()
+            adjust_interval: Seconds between adjustments
+            step: Fraction of the window added or removed per adjustment
+            high_load: Latency/window ratio or CPU load above which the window grows
+            low_load: Latency/window ratio and CPU load below which it shrinks
+            clock: Wall clock (for tests)
+            cpu_clock: Process CPU time clock (for tests)
+        """
+        self.base = dict(settings)
+        self.settings = dict(settings)
+        self.min_window, self.max_window = settings["window_range"]
+        self.adjust_interval = adjust_interval
+        self.step = step
+        self.high_load = high_load
+        self.low_load = low_load
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.latencies = deque(maxlen=50)
+        self.adjustments = 0
+        self._lock = threading.Lock()
+        self._last_adjust = clock()
+        self._last_cpu = cpu_clock()
+    
+    def record_latency(self, seconds):
+        """Record how long one recognition took."""
+        with self._lock:
+            self.latencies.append(seconds)
+    
+    def cpu_load(self):
+        """Process CPU time per wall-clock second since the last adjustment."""
+        elapsed = self.clock() - self._last_adjust
+        if elapsed <= 0:
+            return 0.0
+        return (self.cpu_clock() - self._last_cpu) / elapsed
+    
+    def update(self):
+        """
+        Adjust the settings if adjust_interval has passed.
+        
+        Returns:
+            The current settings dict
+        """
+        now = self.clock()
+        if now - self._last_adjust < self.adjust_interval:
+            return self.settings
+        with self._lock:
+            latencies = sorted(self.latencies)
+            self.latencies.clear()
+        cpu = self.cpu_load()
+        self._last_adjust = now
+        self._last_cpu = self.cpu_clock()
+        if not latencies:
+            return self.settings
+        
+        window = self.settings["window_seconds"]
+        latency = latencies[len(latencies) // 2]
+        pressure = latency / window
+        if pressure > self.high_load or cpu > self.high_load:
+            new_window = min(self.max_window, window * (1 + self.step))
+        elif pressure < self.low_load and cpu < self.low_load:
+            new_window = max(self.min_window, window * (1 - self.step))
+        else:
+            return self.settings
+        
+        if abs(new_window - window) > 1e-6:
+            scale = new_window / self.base["window_seconds"]
+            self.settings["window_seconds"] = round(new_window, 2)
+            self.settings["min_process_interval"] = round(self.base["min_process_interval"] * scale, 2)
+            self.settings["processing_interval"] = round(self.base["processing_interval"] * scale, 2)
+            self.adjustments += 1
+            events.info("autotune.adjust",
+                        f"Auto-tune: window {window:.2f} s -> {new_window:.2f} s "
+                        f"(recognition p50 {latency:.2f} s, CPU {cpu * 100:.0f}%)",
+                        window=new_window, latency=latency, cpu=cpu)
+        return self.settings
@@ -5,6 +5,39 @@ import os
 class Config:
     """Configuration manager for the application."""
     
+    # Named performance profiles. Each one sets every latency/throughput knob
+    # consistently; "custom" takes them from the individual config keys.
+    # window_range bounds the auto-tuner within the profile.
+    PERFORMANCE_PROFILES = {
+        "low-latency": {
+            "chunk_size": 512,
+            "window_seconds": 1.5,
+            "processing_interval": 0.1,
+            "min_process_interval": 0.25,
+            "recognition_workers": 3,
+            "max_in_flight_recognitions": 6,
+            "window_range": [1.0, 2.5],
+        },
+        "balanced": {
+            "chunk_size": 1024,
+            "window_seconds": 3,
+            "processing_interval": 0.5,
+            "min_process_interval": 1.0,
+            "recognition_workers": 2,
+            "max_in_flight_recognitions": 4,
+            "window_range": [2.0, 4.0],
+        },
+        "throughput": {
+            "chunk_size": 4096,
+            "window_seconds": 6,
+            "processing_interval": 1.0,
+            "min_process_interval": 3.0,
+            "recognition_workers": 1,
+            "max_in_flight_recognitions": 2,
+            "window_range": [4.0, 10.0],
+        },
+    }
+    
     DEFAULT_CONFIG = {
         "audio_input_device": "default",
         "language": "ja",
@@ -13,7 +46,58 @@ class Config:
         "enable_auto_start": True,
         "sample_rate": 16000,
         "chunk_size": 1024,
+        "performance_profile": "balanced",
+        "auto_tune": False,
+        "window_seconds": 3,
+        "processing_interval": 0.5,
+        "min_process_interval": 1.0,
         "energy_threshold": 300,
+        "vad_enabled": True,
+        "vad_hangover_seconds": 0.6,
+        "vad_pre_roll_seconds": 0.3,
+        "dedup_enabled": True,
+        "dedup_window": 8,
+        "dedup_max_age_seconds": 5,
+        "recognition_timeout": 5,
+        "translation_timeout": 3,
+        "hedge_requests": False,
+        "local_recognition_engine": "",
+        "recognition_mode": "thread",
+        "recognition_workers": 2,
+        "max_in_flight_recognitions": 4,
+        "shared_memory_audio": True,
+        "broadcast_enabled": False,
+        "broadcast_host": "127.0.0.1",
+        "broadcast_port": 8765,
+        "broadcast_client_buffer": 64,
+        "server_host": "127.0.0.1",
+        "server_port": 9750,
+        "server_workers": 4,
+        "server_window_seconds": 3,
+        "server_max_pending_per_session": 8,
+        "server_clients": {},
+        "diagnostics_dir": "diagnostics",
+        "diagnostics_duration": 10,
+        "diagnostics_timers": False,
+        "journal_enabled": False,
+        "journal_dir": "journal",
+        "journal_segment_seconds": 60,
+        "journal_max_disk_mb": 500,
+        "speculative_translation": False,
+        "speculative_max_in_flight": 2,
+        "speculative_pause_seconds": 0.2,
+        "translation_memory_enabled": True,
+        "translation_memory_dir": "translation_memory",
+        "translation_memory_fuzzy_threshold": 0.9,
+        "translation_memory_max_entries": 100000,
+        "glossary_path": "glossary.json",
+        "translation_batch_enabled": False,
+        "translation_batch_window_ms": 50,
+        "translation_batch_max": 8,
+        "event_log_path": "logs/events.jsonl",
+        "event_log_max_mb": 5,
+        "event_log_backups": 3,
+        "event_log_console": True,
         "api_keys": {
             "translation_service": ""
         }
@@ -32,6 +116,7 @@ class Config:
                     # Merge with defaults to ensure all keys exist
                     config = self.DEFAULT_CONFIG.copy()
                     config.update(loaded_config)
+                    self._migrate_performance_keys(loaded_config, config)
                     return config
             except Exception as e:
                 print(f"Error loading config: {e}")
@@ -41,6 +126,27 @@ class Config:
             self.save_config(self.DEFAULT_CONFIG)
             return self.DEFAULT_CONFIG.copy()
     
+    def _migrate_performance_keys(self, loaded_config, config):
+        """
+        Keep hand-tuned latency settings from before performance profiles.
+        
+        A config file without performance_profile that changes chunk_size,
+        window_seconds etc. is switched to the "custom" profile, which reads
+        them. With a named profile those keys are ignored, so say so.
+        """
+        defaults = self.PERFORMANCE_PROFILES["balanced"]
+        changed = [key for key in defaults if key != "window_range" and key in loaded_config
+                   and loaded_config[key] != self.DEFAULT_CONFIG.get(key, defaults[key])]
+        if not changed:
+            return
+        profile = loaded_config.get("performance_profile")
+        if profile is None:
+            config["performance_profile"] = "custom"
+            print(f"Using performance profile 'custom' for {', '.join(changed)} from {self.config_path}")
+        elif profile != "custom":
+            print(f"Ignoring {', '.join(changed)} from {self.config_path}: "
+                  f"performance profile '{profile}' sets them (use 'custom' to keep them)")
+    
     def save_config(self, config=None):
         """Save configuration to file."""
         if config is None:
@@ -62,6 +168,38 @@ class Config:
         """Set a configuration value."""
         self.config[key] = value
     
+    def get_performance_settings(self):
+        """
+        Latency/throughput settings of the selected performance profile.
+        
+        Returns:
+            Dict with chunk_size, window_seconds, processing_interval,
+            min_process_interval, recognition_workers,
+            max_in_flight_recognitions and window_range
+        """
+        name = self.config.get("performance_profile", "balanced")
+        profile = self.PERFORMANCE_PROFILES.get(name)
+        if profile is not None:
+            return dict(profile)
+        if name != "custom":
+            print(f"Unknown performance profile '{name}', using balanced")
+            return dict(self.PERFORMANCE_PROFILES["balanced"])
+        defaults = self.PERFORMANCE_PROFILES["balanced"]
+        settings = {key: self.config.get(key, value) for key, value in defaults.items()
+                    if key != "window_range"}
+        window = settings["window_seconds"]
+        settings["window_range"] = self.config.get("window_range", [window, window])
+        return settings
+    
+    def get_event_log_settings(self):
+        """Keyword arguments for EventLogger.configure() from the config."""
+        return {
+            "path": self.config.get("event_log_path") or None,
+            "max_bytes": int(self.config.get("event_log_max_mb", 5) * 1024 * 1024),
+            "backup_count": self.config.get("event_log_backups", 3),
+            "console": self.config.get("event_log_console", True),
+        }
+    
     def reload(self):
         """Reload configuration from file."""
         self.config = self._load_config()
@@ -0,0 +1,262 @@
+import io
+import os
+import sys
+import json
+import time
+import signal
+import zipfile
+import threading
+import traceback
+import tracemalloc
+from collections import Counter
+
+from utils.metrics import metrics
+
+
+class _NullSection:
+    """Shared no-op context manager returned while timers are disabled."""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _TimedSection:
+    """Context manager that adds its duration to a SectionTimers entry."""
+    
+    __slots__ = ("timers", "name", "start")
+    
+    def __init__(self, timers, name):
+        self.timers = timers
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.timers.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class SectionTimers:
+    """
+    Opt-in fine-grained timers for hot paths.
+    
+    Usage:
+        with timers.section("recognition"):
+            ...
+    
+    While disabled, section() returns a shared no-op object, so an
+    instrumented block costs one attribute check and an empty with.
+    """
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = {}
+        self._lock = threading.Lock()
+    
+    def section(self, name):
+        """Context manager timing the enclosed block."""
+        if not self.enabled:
+            return _NULL_SECTION
+        return _TimedSection(self, name)
+    
+    def record(self, name, seconds):
+        """Add one measurement."""
+        with self._lock:
+            entry = self.stats.get(name)
+            if entry is None:
+                entry = self.stats[name] = {"count": 0, "total": 0.0, "max": 0.0}
+            entry["count"] += 1
+            entry["total"] += seconds
+            if seconds > entry["max"]:
+                entry["max"] = seconds
+    
+    def snapshot(self):
+        """Copy of the statistics with mean durations added."""
+        with self._lock:
+            result = {}
+            for name, entry in self.stats.items():
+                result[name] = dict(entry, mean=entry["total"] / entry["count"])
+            return result
+    
+    def reset(self):
+        """Clear all statistics."""
+        with self._lock:
+            self.stats.clear()
+
+
+# Shared instance used by the pipeline hot paths
+timers = SectionTimers()
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads at a fixed interval."""
+    
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+    
+    def run(self, duration):
+        """Sample for duration seconds (blocks the calling thread)."""
+        me = threading.get_ident()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+            time.sleep(self.interval)
+    
+    def collapsed_stacks(self):
+        """Samples in collapsed-stack format (for flame graph tools)."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+    
+    def top_functions(self, limit=40):
+        """Functions by the share of samples in which they were executing."""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        lines = [f"{count:8d} {100.0 * count / total:6.2f}%  {name}"
+                 for name, count in leaves.most_common(limit)]
+        return f"{self.sample_count} samples every {self.interval * 1000:.1f} ms\n" + "\n".join(lines)
+
+
+def thread_dump():
+    """Current stack of every thread."""
+    names = {t.ident: t for t in threading.enumerate()}
+    out = io.StringIO()
+    for ident, frame in sys._current_frames().items():
+        thread = names.get(ident)
+        name = thread.name if thread else str(ident)
+        daemon = " daemon" if thread is not None and thread.daemon else ""
+        out.write(f"Thread {name} (id {ident}{daemon}):\n")
+        out.write("".join(traceback.format_stack(frame)))
+        out.write("\n")
+    return out.getvalue()
+
+
+class DiagnosticsCollector:
+    """
+    Writes an on-demand diagnostics archive.
+    
+    The archive contains a time-boxed sampling profile of all threads, a
+    tracemalloc snapshot diff over the same window, a dump of every thread's
+    stack, the state reported by registered providers (threads, queues),
+    metrics and hot-path timer statistics.
+    """
+    
+    def __init__(self, output_dir="diagnostics", duration=10, interval=0.005):
+        self.output_dir = output_dir
+        self.duration = duration
+        self.interval = interval
+        self.state_providers = {}
+        self._running = threading.Lock()
+    
+    def add_state_provider(self, name, provider):
+        """Register a callable returning a JSON-serializable state dict."""
+        self.state_providers[name] = provider
+    
+    def collect_state(self):
+        """Query all state providers."""
+        state = {}
+        for name, provider in self.state_providers.items():
+            try:
+                state[name] = provider()
+            except Exception as e:
+                state[name] = {"error": str(e)}
+        return state
+    
+    def dump_async(self, callback=None):
+        """Write an archive on a background thread; callback receives the path."""
+        def run():
+            path = self.dump()
+            if callback and path:
+                callback(path)
+        threading.Thread(target=run, daemon=True, name="diagnostics").start()
+    
+    def dump(self):
+        """
+        Collect diagnostics for self.duration seconds and write the archive.
+        
+        Returns:
+            Path of the archive, or None if a dump is already running
+        """
+        if not self._running.acquire(blocking=False):
+            print("Diagnostics dump already in progress")
+            return None
+        try:
+            print(f"Collecting diagnostics for {self.duration} s...")
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(10)
+            before = tracemalloc.take_snapshot()
+            state_before = self.collect_state()
+            
+            profiler = SamplingProfiler(self.interval)
+            profiler.run(self.duration)
+            
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            
+            memory = [f"traced current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB", ""]
+            memory += [str(stat) for stat in after.compare_to(before, "lineno")[:50]]
+            
+            state = {
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "duration": self.duration,
+                "pid": os.getpid(),
+                "python": sys.version,
+                "state_before": state_before,
+                "state_after": self.collect_state(),
+                "metrics": metrics.snapshot(),
+                "timers": timers.snapshot(),
+            }
+            
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir,
+                                time.strftime("diagnostics-%Y%m%d-%H%M%S.zip"))
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("profile_collapsed.txt", profiler.collapsed_stacks())
+                archive.writestr("profile_top.txt", profiler.top_functions())
+                archive.writestr("tracemalloc_diff.txt", "\n".join(memory))
+                archive.writestr("threads.txt", thread_dump())
+                archive.writestr("state.json", json.dumps(state, indent=2, default=str,
+                                                          ensure_ascii=False))
+            print(f"Diagnostics written to {path}")
+            return path
+        finally:
+            self._running.release()
+
+
+def install_signal_trigger(collector):
+    """
+    Write a diagnostics archive when the process receives SIGUSR1
+    (SIGBREAK / Ctrl+Break on Windows).
+    
+    Returns:
+        Name of the signal used, or None if none is available
+    """
+    signum = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+    if signum is None:
+        return None
+    signal.signal(signum, lambda *_: collector.dump_async())
+    return signal.Signals(signum).name
@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+
+
+class EventLogger:
+    """
+    Structured event log written by a background thread.
+    
+    log() builds a small dict and hands it to a bounded queue without ever
+    blocking; when the queue is full the event is counted as dropped. The
+    writer thread appends events to a JSON lines file, rotating it when it
+    grows past max_bytes, and echoes them to the console. A slow or blocked
+    console or disk therefore stalls only the writer, never the capture or
+    processing threads.
+    
+    Repeated warnings and errors with the same event name and message are
+    rate limited: after the first one, repeats within rate_limit_seconds are
+    only counted, and the next one logged carries the number suppressed.
+    """
+    
+    LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+    
+    def __init__(self, path=None, max_bytes=5 * 1024 * 1024, backup_count=3, queue_size=10000,
+                 console=True, level="info", rate_limit_seconds=5.0):
+        """
+        Args:
+            path: JSON lines file (None logs to the console only)
+            max_bytes: Size at which the file is rotated
+            backup_count: Rotated files kept (events.jsonl.1 ... .N)
+            queue_size: Events buffered for the writer before new ones are dropped
+            console: Echo events to stdout
+            level: Minimum level logged
+            rate_limit_seconds: Window for suppressing repeated warnings and errors
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.console = console
+        self.min_level = self.LEVELS[level]
+        self.rate_limit_seconds = rate_limit_seconds
+        self.dropped = 0
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._repeats = {}
+        self._file = None
+        self._reopen = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+    
+    def configure(self, path=None, max_bytes=None, backup_count=None, console=None, level=None,
+                  rate_limit_seconds=None):
+        """Change settings; takes effect for events written from now on."""
+        self.flush()
+        # The writer thread owns the file; it reopens on the next batch
+        self._reopen = True
+        self.path = path
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if backup_count is not None:
+            self.backup_count = backup_count
+        if console is not None:
+            self.console = console
+        if level is not None:
+            self.min_level = self.LEVELS[level]
+        if rate_limit_seconds is not None:
+            self.rate_limit_seconds = rate_limit_seconds
+    
+    def log(self, event, message=None, level="info", **fields):
+        """
+        Record an event (never blocks).
+        
+        Args:
+            event: Dotted event name, e.g. "capture.read_error"
+            message: Human-readable text
+            level: "debug", "info", "warning" or "error"
+            **fields: Extra JSON-serializable fields
+        """
+        if self.LEVELS[level] < self.min_level:
+            return
+        now = time.time()
+        if self.LEVELS[level] >= self.LEVELS["warning"]:
+            key = (event, message)
+            repeat = self._repeats.get(key)
+            if repeat is not None and now - repeat[0] < self.rate_limit_seconds:
+                repeat[1] += 1
+                return
+            if repeat is not None and repeat[1]:
+                fields["suppressed"] = repeat[1]
+            self._repeats[key] = [now, 0]
+            if len(self._repeats) > 1000:
+                self._repeats.clear()
+        
+        record = {"ts": now, "level": level, "event": event,
+                  "thread": threading.current_thread().name}
+        if message is not None:
+            record["message"] = message
+        record.update(fields)
+        
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+    
+    def info(self, event, message=None, **fields):
+        """Record an info event."""
+        self.log(event, message, "info", **fields)
+    
+    def warning(self, event, message=None, **fields):
+        """Record a warning event."""
+        self.log(event, message, "warning", **fields)
+    
+    def error(self, event, message=None, **fields):
+        """Record an error event."""
+        self.log(event, message, "error", **fields)
+    
+    def _start(self):
+        """Start the writer thread on first use."""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, daemon=True,
+                                                name="event-log")
+                self._thread.start()
+                atexit.register(self.flush)
+    
+    def _write_loop(self):
+        """Writer thread: drain the queue in batches."""
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                sys.stderr.write(f"Event log write failed: {e}\n")
+            for _ in batch:
+                self.queue.task_done()
+    
+    def _write(self, batch):
+        """Write a batch of events to the file and console."""
+        if self._reopen:
+            self._reopen = False
+            if self._file:
+                self._file.close()
+                self._file = None
+        if self.path:
+            for record in batch:
+                if self._file is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            if self._file:
+                self._file.flush()
+        if self.console:
+            for record in batch:
+                if record["level"] == "debug":
+                    continue
+                text = record.get("message") or record["event"]
+                if record.get("suppressed"):
+                    text += f" ({record['suppressed']} similar suppressed)"
+                print(text)
+    
+    def _rotate(self):
+        """Shift events.jsonl -> events.jsonl.1 -> ... and start a new file."""
+        self._file.close()
+        self._file = None
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+    
+    def state(self):
+        """Queue depth and dropped events (for diagnostics)."""
+        return {"path": self.path, "queued": self.queue.qsize(), "dropped": self.dropped}
+    
+    def flush(self, timeout=2.0):
+        """Wait (up to timeout seconds) until queued events are written."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+# Shared instance used throughout the application
+events = EventLogger()
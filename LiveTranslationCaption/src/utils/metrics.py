@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import deque
+
+
+class Metrics:
+    """Thread-safe counters and a bounded log of recent events."""
+    
+    def __init__(self, max_events=1000):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.events = deque(maxlen=max_events)
+    
+    def increment(self, name, amount=1):
+        """Increment a named counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def get_counter(self, name):
+        """Get the current value of a counter."""
+        with self._lock:
+            return self.counters.get(name, 0)
+    
+    def record_event(self, name, **fields):
+        """Record a named event with arbitrary fields."""
+        event = {"time": time.time(), "name": name}
+        event.update(fields)
+        with self._lock:
+            self.events.append(event)
+    
+    def get_events(self, name=None):
+        """Get recorded events, optionally filtered by name."""
+        with self._lock:
+            return [e for e in self.events if name is None or e["name"] == name]
+    
+    def snapshot(self):
+        """Get a copy of all counters and events."""
+        with self._lock:
+            return {"counters": dict(self.counters), "events": list(self.events)}
+    
+    def reset(self):
+        """Clear all counters and events."""
+        with self._lock:
+            self.counters.clear()
+            self.events.clear()
+
+
+# Shared instance used by the pipeline components
+metrics = Metrics()
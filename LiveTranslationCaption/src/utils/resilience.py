@@ -0,0 +1,283 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.metrics import metrics as default_metrics
+from utils.event_log import events
+
+
+class CircuitOpenError(Exception):
+    """Raised when a backend is skipped because its circuit breaker is open."""
+
+
+class BackendTimeoutError(Exception):
+    """Raised when a backend call does not finish within its timeout."""
+
+
+class AllBackendsFailedError(Exception):
+    """Raised when every backend in a fallback chain failed."""
+
+
+class HealthTracker:
+    """Sliding-window tracker of call latencies and errors for one backend."""
+    
+    def __init__(self, window_seconds=60, max_samples=200, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self.samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+    
+    def record(self, latency, success):
+        """Record the outcome of one call."""
+        with self._lock:
+            self.samples.append((self.clock(), latency, success))
+    
+    def _recent(self):
+        """Samples inside the window (caller holds the lock)."""
+        cutoff = self.clock() - self.window_seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return list(self.samples)
+    
+    def call_count(self):
+        """Number of calls inside the window."""
+        with self._lock:
+            return len(self._recent())
+    
+    def error_rate(self):
+        """Fraction of failed calls inside the window."""
+        with self._lock:
+            recent = self._recent()
+        if not recent:
+            return 0.0
+        failures = sum(1 for _, _, success in recent if not success)
+        return failures / len(recent)
+    
+    def percentile(self, pct):
+        """Latency percentile of calls inside the window, or None if empty."""
+        with self._lock:
+            latencies = sorted(latency for _, latency, _ in self._recent())
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))
+        return latencies[index]
+    
+    def reset(self):
+        """Forget all samples."""
+        with self._lock:
+            self.samples.clear()
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker driven by a HealthTracker.
+    
+    The breaker opens when the error rate over the window reaches
+    failure_threshold, rejects calls for open_duration seconds, then lets a
+    single trial call through (half-open) to decide whether to close again.
+    Calls slower than slow_call_threshold count as failures.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name, failure_threshold=0.5, min_calls=5, open_duration=30,
+                 slow_call_threshold=None, window_seconds=60, clock=time.monotonic,
+                 metrics=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.slow_call_threshold = slow_call_threshold
+        self.clock = clock
+        self.metrics = metrics or default_metrics
+        self.tracker = HealthTracker(window_seconds=window_seconds, clock=clock)
+        self.state = self.CLOSED
+        self.opened_at = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow_request(self):
+        """Check whether a call may be sent to the backend now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.open_duration:
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+    
+    def record_success(self, latency):
+        """Record a successful call."""
+        if self.slow_call_threshold is not None and latency > self.slow_call_threshold:
+            self.record_failure(latency)
+            return
+        self.tracker.record(latency, True)
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                self.tracker.reset()
+                self._transition(self.CLOSED)
+    
+    def record_failure(self, latency):
+        """Record a failed or too slow call."""
+        self.tracker.record(latency, False)
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                self._open()
+            elif self.state == self.CLOSED:
+                if (self.tracker.call_count() >= self.min_calls and
+                        self.tracker.error_rate() >= self.failure_threshold):
+                    self._open()
+    
+    def _open(self):
+        """Open the breaker (caller holds the lock)."""
+        self.opened_at = self.clock()
+        self._transition(self.OPEN)
+    
+    def _transition(self, new_state):
+        """Change state and record it in metrics (caller holds the lock)."""
+        if new_state == self.state:
+            return
+        old_state = self.state
+        self.state = new_state
+        self.metrics.increment(f"breaker.{self.name}.{new_state}")
+        self.metrics.record_event("breaker_state", backend=self.name,
+                                  old=old_state, new=new_state)
+        events.warning("breaker.state", f"Circuit breaker '{self.name}': {old_state} -> {new_state}",
+                       breaker=self.name, old_state=old_state, new_state=new_state)
+
+
+class Backend:
+    """A named backend callable guarded by its own circuit breaker."""
+    
+    def __init__(self, name, func, timeout=None, hedge=False, breaker=None,
+                 passthrough_exceptions=()):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker(name)
+        # Exceptions that mean "the backend answered" (e.g. no speech found)
+        self.passthrough_exceptions = tuple(passthrough_exceptions)
+
+
+class FallbackChain:
+    """
+    Calls an ordered list of backends, falling through to the next one when a
+    backend fails, times out or has an open circuit breaker.
+    
+    Remote calls run on a small thread pool so that a hanging request costs
+    the caller at most its timeout. When hedging is enabled for a backend, a
+    duplicate request is sent once the first has been outstanding for longer
+    than the backend's recent p95 latency, and whichever answers first wins.
+    """
+    
+    def __init__(self, backends, max_workers=4, metrics=None, hedge_min_samples=10):
+        self.backends = list(backends)
+        self.metrics = metrics or default_metrics
+        self.hedge_min_samples = hedge_min_samples
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="backend")
+    
+    def call(self, *args, timeout_scale=1, **kwargs):
+        """
+        Call the first healthy backend.
+        
+        Args:
+            timeout_scale: Multiplies backend timeouts and hedge delays for a
+                request worth that many ordinary ones (e.g. a batch); its
+                latency is recorded divided by it
+        
+        Returns:
+            Tuple of (backend name, result)
+        """
+        last_error = None
+        for backend in self.backends:
+            if not backend.breaker.allow_request():
+                self.metrics.increment(f"backend.{backend.name}.skipped")
+                last_error = CircuitOpenError(backend.name)
+                continue
+            
+            start = time.monotonic()
+            try:
+                result = self._invoke(backend, args, kwargs, timeout_scale)
+            except backend.passthrough_exceptions:
+                backend.breaker.record_success((time.monotonic() - start) / timeout_scale)
+                raise
+            except Exception as e:
+                backend.breaker.record_failure((time.monotonic() - start) / timeout_scale)
+                self.metrics.increment(f"backend.{backend.name}.failure")
+                last_error = e
+                continue
+            
+            backend.breaker.record_success((time.monotonic() - start) / timeout_scale)
+            self.metrics.increment(f"backend.{backend.name}.success")
+            return backend.name, result
+        
+        raise AllBackendsFailedError(last_error)
+    
+    def _invoke(self, backend, args, kwargs, timeout_scale=1):
+        """Run one backend call, applying its timeout and hedging policy."""
+        if backend.timeout is None and not backend.hedge:
+            return backend.func(*args, **kwargs)
+        
+        futures = [self.executor.submit(backend.func, *args, **kwargs)]
+        timeout = None if backend.timeout is None else backend.timeout * timeout_scale
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        hedge_delay = self._hedge_delay(backend)
+        if hedge_delay is not None:
+            hedge_delay *= timeout_scale
+            done, _ = wait(futures, timeout=self._remaining(deadline, hedge_delay))
+            if not done and (deadline is None or time.monotonic() < deadline):
+                self.metrics.increment(f"backend.{backend.name}.hedged")
+                futures.append(self.executor.submit(backend.func, *args, **kwargs))
+        
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=self._remaining(deadline),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    return future.result()
+                except backend.passthrough_exceptions:
+                    raise
+                except Exception as e:
+                    error = e
+        
+        for future in pending:
+            future.cancel()
+        if error is not None and not pending:
+            raise error
+        raise BackendTimeoutError(f"{backend.name} did not answer within {timeout}s")
+    
+    def _hedge_delay(self, backend):
+        """Delay before sending a hedged request, or None to not hedge."""
+        if not backend.hedge:
+            return None
+        tracker = backend.breaker.tracker
+        if tracker.call_count() < self.hedge_min_samples:
+            return None
+        return tracker.percentile(95)
+    
+    def _remaining(self, deadline, cap=None):
+        """Seconds until the deadline, optionally capped."""
+        if deadline is None:
+            return cap
+        remaining = max(0.0, deadline - time.monotonic())
+        return remaining if cap is None else min(remaining, cap)
+    
+    def shutdown(self):
+        """Stop the worker threads without waiting for hung calls."""
+        self.executor.shutdown(wait=False)
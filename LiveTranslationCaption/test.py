@@ -5,6 +5,8 @@ Quick test script to verify all components work correctly.
 
 import sys
 import os
+import time
+import threading
 
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -125,6 +127,1356 @@ def test_translation():
         return False
 
 
+def test_deduplication():
+    """Test suppression and trimming of overlapping recognitions."""
+    print("\nTesting recognition deduplication...")
+    
+    try:
+        from audio.dedup import RecognitionDeduplicator
+        dedup = RecognitionDeduplicator()
+        
+        # Recognitions of overlapping 3 second windows
+        recognitions = [
+            "今日はとても良い天気ですね",
+            "今日はとても良い天気ですね",            # exact repeat
+            "今日はとても良い天気ですね。",          # near repeat
+            "良い天気ですねそれでは始めましょう",    # partial overlap
+            "それでは始めましょう",                  # covered by previous
+            "Hello everyone, welcome to the stream",
+            "welcome to the stream and thanks for coming",
+        ]
+        translated = []
+        for text in recognitions:
+            result = dedup.filter(text)
+            if result:
+                translated.append(result)
+        
+        expected = [
+            "今日はとても良い天気ですね",
+            "それでは始めましょう",
+            "Hello everyone, welcome to the stream",
+            "and thanks for coming",
+        ]
+        if translated != expected:
+            print(f"✗ Unexpected dedup output: {translated}")
+            return False
+        
+        saved_calls = len(recognitions) - len(translated)
+        if saved_calls != 3 or dedup.suppressed_count != 3 or dedup.trimmed_count != 2:
+            print(f"✗ Unexpected counts: saved={saved_calls}, "
+                  f"suppressed={dedup.suppressed_count}, trimmed={dedup.trimmed_count}")
+            return False
+        
+        # Short utterances inside an earlier sentence are not repeats, and a
+        # phrase said again after the window has expired is kept
+        now = [0.0]
+        dedup = RecognitionDeduplicator(max_age_seconds=5, clock=lambda: now[0])
+        kept = [dedup.filter("はい、そうです。来週の会議は三時からです")]
+        for text, at in [("はい", 1), ("そうです", 2), ("ありがとう", 3), ("ありがとう", 4),
+                         ("ありがとう", 20)]:
+            now[0] = at
+            kept.append(dedup.filter(text))
+        if kept != ["はい、そうです。来週の会議は三時からです", "はい", "そうです",
+                    "ありがとう", None, "ありがとう"]:
+            print(f"✗ Unexpected short or expired phrase handling: {kept}")
+            return False
+        
+        print(f"  Saved {saved_calls} of {len(recognitions)} translation calls")
+        print("✓ Deduplication working")
+        return True
+    except Exception as e:
+        print(f"✗ Deduplication test failed: {e}")
+        return False
+
+
+def test_backend_resilience():
+    """Test circuit breakers, hedging and fallback with fake backends."""
+    print("\nTesting backend resilience...")
+    
+    try:
+        from utils.metrics import Metrics
+        from utils.resilience import Backend, CircuitBreaker, FallbackChain
+        
+        class FakeBackend:
+            """Backend that injects latency and errors."""
+            def __init__(self, latency=0.0, fail=False):
+                self.latency = latency
+                self.fail = fail
+                self.calls = 0
+            
+            def __call__(self, text):
+                self.calls += 1
+                time.sleep(self.latency)
+                if self.fail:
+                    raise ConnectionError("backend unavailable")
+                return f"remote:{text}"
+        
+        metrics = Metrics()
+        remote = FakeBackend(fail=True)
+        local = FakeBackend()
+        breaker = CircuitBreaker("remote", min_calls=3, open_duration=0.2, metrics=metrics)
+        chain = FallbackChain([
+            Backend("remote", remote, timeout=0.5, breaker=breaker),
+            Backend("local", local),
+            Backend("source", lambda text: text),
+        ], metrics=metrics)
+        
+        # Failing remote falls back to local and trips the breaker
+        for _ in range(5):
+            name, result = chain.call("hello")
+            if name != "local":
+                print(f"✗ Expected local fallback, got {name}")
+                return False
+        if breaker.state != CircuitBreaker.OPEN or remote.calls != 3:
+            print(f"✗ Breaker did not open (state={breaker.state}, calls={remote.calls})")
+            return False
+        
+        # After the open period a trial call closes the breaker again
+        remote.fail = False
+        time.sleep(0.25)
+        name, _ = chain.call("hello")
+        if name != "remote" or breaker.state != CircuitBreaker.CLOSED:
+            print(f"✗ Breaker did not recover (backend={name}, state={breaker.state})")
+            return False
+        states = [e["new"] for e in metrics.get_events("breaker_state")]
+        if states != ["open", "half_open", "closed"]:
+            print(f"✗ Unexpected breaker transitions: {states}")
+            return False
+        
+        # A hanging remote costs at most its timeout
+        remote.latency = 1.0
+        start = time.monotonic()
+        name, _ = chain.call("hello")
+        elapsed = time.monotonic() - start
+        if name != "local" or elapsed > 0.8:
+            print(f"✗ Timeout fallback failed (backend={name}, elapsed={elapsed:.2f}s)")
+            return False
+        
+        # Hedged request answers within the p95 delay plus one fast call
+        class SlowOnce(FakeBackend):
+            def __call__(self, text):
+                self.calls += 1
+                time.sleep(0.6 if self.calls == 11 else 0.01)
+                return text
+        
+        slow_once = SlowOnce()
+        hedged = FallbackChain([Backend("hedged", slow_once, timeout=2, hedge=True)],
+                               metrics=metrics)
+        for _ in range(10):
+            hedged.call("warmup")
+        start = time.monotonic()
+        hedged.call("hello")
+        elapsed = time.monotonic() - start
+        if elapsed > 0.3 or metrics.get_counter("backend.hedged.hedged") != 1:
+            print(f"✗ Hedged request not used (elapsed={elapsed:.2f}s)")
+            return False
+        
+        chain.shutdown()
+        hedged.shutdown()
+        print("✓ Circuit breaker, hedging and fallback working")
+        return True
+    except Exception as e:
+        print(f"✗ Backend resilience test failed: {e}")
+        return False
+
+
+class _CrashingRecognizer:
+    """Fake recognizer for worker pool tests; exits the process on b"crash"."""
+    
+    def __init__(self):
+        self.pid = os.getpid()
+    
+    def process_audio(self, audio_data, sample_rate=16000, sample_width=2):
+        if audio_data == b"crash":
+            os._exit(1)
+        if audio_data == b"slow":
+            time.sleep(2)
+        return f"{self.pid}:{len(audio_data)}"
+
+
+def test_recognition_pool():
+    """Test worker process recognition, crash recovery and in-flight bound."""
+    print("\nTesting recognition worker pool...")
+    
+    try:
+        from audio.worker_pool import RecognitionPool
+        pool = RecognitionPool(num_workers=2, max_in_flight=3, factory=_CrashingRecognizer)
+        pool.start()
+        
+        result = pool.process_audio(b"\x00" * 100)
+        if not result or not result.endswith(":100"):
+            print(f"✗ Unexpected worker result: {result}")
+            return False
+        
+        # A crashing worker restarts the pool and later jobs still succeed
+        if pool.process_audio(b"crash") is not None:
+            print("✗ Crashed job should return None")
+            return False
+        for _ in range(50):
+            if pool.restart_count == 1 and pool.executor is not None:
+                break
+            time.sleep(0.1)
+        result = pool.process_audio(b"\x00" * 10)
+        if pool.restart_count != 1 or not result or not result.endswith(":10"):
+            print(f"✗ Pool did not recover (restarts={pool.restart_count}, result={result})")
+            return False
+        
+        # No more than max_in_flight jobs may be outstanding
+        futures = [pool.submit(b"\x00", timeout=0) for _ in range(5)]
+        accepted = [f for f in futures if f is not None]
+        if len(accepted) != 3:
+            print(f"✗ Expected 3 accepted jobs, got {len(accepted)}")
+            return False
+        for future in accepted:
+            future.result()
+        
+        # A submit that fails before reaching the pool gives its slot back
+        pool.stop()
+        
+        def failing_start():
+            raise RuntimeError("cannot start workers")
+        
+        pool.start = failing_start
+        for _ in range(5):
+            try:
+                pool.submit(b"\x00", timeout=1)
+            except RuntimeError:
+                pass
+        del pool.start
+        future = pool.submit(b"\x00" * 10, timeout=1)
+        if future is None or not future.result().endswith(":10"):
+            print("✗ In-flight slots leaked by failed submits")
+            return False
+        pool.stop()
+        
+        # Starting and stopping never wait for the workers; queued jobs are cancelled
+        pool = RecognitionPool(num_workers=1, max_in_flight=4, factory=_CrashingRecognizer)
+        started = time.perf_counter()
+        pool.start(wait=False)
+        start_elapsed = time.perf_counter() - started
+        futures = [pool.submit(b"slow", timeout=1) for _ in range(4)]
+        time.sleep(0.5)
+        started = time.perf_counter()
+        pool.stop()
+        stop_elapsed = time.perf_counter() - started
+        if start_elapsed > 0.2 or stop_elapsed > 0.2 or not futures[-1].cancelled():
+            print(f"✗ Pool start/stop blocked (start {start_elapsed:.2f}s, stop {stop_elapsed:.2f}s, "
+                  f"last job cancelled: {futures[-1].cancelled()})")
+            return False
+        print("✓ Recognition worker pool working")
+        return True
+    except Exception as e:
+        print(f"✗ Recognition pool test failed: {e}")
+        return False
+
+
+class _SummingRecognizer:
+    """Fake recognizer that reports the length and sum of its samples."""
+    
+    def process_audio(self, audio_data, sample_rate=16000, sample_width=2):
+        import numpy as np
+        samples = np.frombuffer(audio_data, dtype=np.int16)
+        return f"{len(samples)}:{int(samples.sum())}"
+
+
+def test_shared_audio_ring():
+    """Test the shared memory audio ring and zero-copy handoff to workers."""
+    print("\nTesting shared audio ring...")
+    
+    try:
+        import numpy as np
+        from audio.shared_ring import SharedAudioRing, RingOverrunError
+        from audio.worker_pool import RecognitionPool
+        
+        ring = SharedAudioRing(capacity_samples=1000)
+        start, end = ring.write(np.arange(600, dtype=np.int16).tobytes())
+        view = ring.read(start, end)
+        if (start, end) != (0, 600) or not np.shares_memory(view, ring._samples):
+            print("✗ Contiguous read should be a view of the ring")
+            return False
+        
+        # Wrap around the end of the ring
+        start, end = ring.write(np.arange(600, dtype=np.int16).tobytes())
+        if len(ring.views(start, end)) != 2 or ring.read(start, end).tolist() != list(range(600)):
+            print("✗ Wrapped read returned wrong samples")
+            return False
+        try:
+            ring.read(0, 600)
+            print("✗ Overwritten samples should raise RingOverrunError")
+            return False
+        except RingOverrunError:
+            pass
+        
+        # Workers attach by name and read only the offsets they are sent
+        pool = RecognitionPool(num_workers=1, factory=_SummingRecognizer, ring=ring)
+        result = pool.submit_range(start, end).result()
+        pool.stop()
+        expected = f"600:{sum(range(600))}"
+        if result != expected:
+            print(f"✗ Worker read {result}, expected {expected}")
+            return False
+        
+        name = ring.name
+        ring.close()
+        try:
+            SharedAudioRing.attach(name)
+            print("✗ Ring was not unlinked on close")
+            return False
+        except FileNotFoundError:
+            pass
+        
+        print("✓ Shared audio ring working")
+        return True
+    except Exception as e:
+        print(f"✗ Shared audio ring test failed: {e}")
+        return False
+
+
+def _open_caption_stream(port, kind):
+    """Connect a blocking SSE or WebSocket client to the caption broadcast."""
+    import socket
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    if kind == "ws":
+        sock.sendall(b"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                     b"Sec-WebSocket-Version: 13\r\n\r\n")
+    else:
+        sock.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    stream = sock.makefile("rb")
+    status = stream.readline()
+    while stream.readline() not in (b"\r\n", b""):
+        pass
+    return sock, stream, status
+
+
+def _read_caption(stream, kind):
+    """Read one caption message from an SSE or WebSocket stream."""
+    import json
+    import struct
+    if kind == "ws":
+        head = stream.read(2)
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", stream.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", stream.read(8))[0]
+        return json.loads(stream.read(length).decode("utf-8"))
+    line = stream.readline()
+    stream.readline()
+    return json.loads(line[len(b"data: "):].decode("utf-8"))
+
+
+def test_caption_broadcast():
+    """Test WebSocket/SSE caption broadcast and dropping of slow clients."""
+    print("\nTesting caption broadcast...")
+    
+    try:
+        import threading
+        from server.broadcast import CaptionBroadcaster
+        broadcaster = CaptionBroadcaster(port=0, client_buffer=8)
+        broadcaster.start()
+        
+        ws_sock, ws_stream, ws_status = _open_caption_stream(broadcaster.port, "ws")
+        sse_sock, sse_stream, sse_status = _open_caption_stream(broadcaster.port, "sse")
+        if b"101" not in ws_status or b"200" not in sse_status:
+            print(f"✗ Unexpected handshake: {ws_status!r} / {sse_status!r}")
+            return False
+        for _ in range(50):
+            if len(broadcaster.subscribers) == 2:
+                break
+            time.sleep(0.02)
+        
+        broadcaster.publish("こんにちは", "Hello", start_time=1.0, end_time=4.0)
+        ws_msg = _read_caption(ws_stream, "ws")
+        sse_msg = _read_caption(sse_stream, "sse")
+        if ws_msg != sse_msg or ws_msg["translation"] != "Hello" or not ws_msg["final"]:
+            print(f"✗ Clients received different captions: {ws_msg} / {sse_msg}")
+            return False
+        
+        # A client that never reads is dropped; an active one keeps up
+        stalled_sock, _, _ = _open_caption_stream(broadcaster.port, "sse")
+        received = []
+        
+        def reader():
+            try:
+                while True:
+                    received.append(_read_caption(ws_stream, "ws")["seq"])
+                    if received[-1] == 2001:
+                        break
+            except Exception:
+                pass
+        
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+        for _ in range(2000):
+            broadcaster.publish("x" * 2000, "y" * 2000)
+            time.sleep(0.0005)
+        reader_thread.join(timeout=10)
+        
+        ok = broadcaster.dropped_clients >= 1 and received and received[-1] == 2001
+        
+        # A client frame over the size limit is refused with close code 1009
+        import struct
+        big_sock, big_stream, _ = _open_caption_stream(broadcaster.port, "ws")
+        big_sock.sendall(bytes([0x81, 0x80 | 127]) + struct.pack("!Q", 1 << 40))
+        head = big_stream.read(2)
+        close_code = big_stream.read(head[1] & 0x7F)[:2] if len(head) == 2 else b""
+        big_sock.close()
+        if head[:1] != b"\x88" or close_code != struct.pack("!H", 1009):
+            print(f"✗ Oversized client frame not refused: {head!r} {close_code!r}")
+            return False
+        
+        broadcaster.stop()
+        for sock in (ws_sock, sse_sock, stalled_sock):
+            sock.close()
+        if not ok:
+            print(f"✗ Slow client handling failed (dropped={broadcaster.dropped_clients}, "
+                  f"received={len(received)})")
+            return False
+        
+        print("✓ Caption broadcast working")
+        return True
+    except Exception as e:
+        print(f"✗ Caption broadcast test failed: {e}")
+        return False
+
+
+def test_session_server():
+    """Test weighted fair scheduling and the headless multi-session server."""
+    print("\nTesting headless session server...")
+    
+    try:
+        import json
+        import struct
+        import asyncio
+        from server.scheduler import Job, WeightedFairScheduler
+        from server.session_server import CaptionSessionServer, simulated_backends
+        
+        # A noisy session must not starve a quiet one
+        scheduler = WeightedFairScheduler(max_pending_per_session=20)
+        scheduler.add_session("noisy")
+        scheduler.add_session("quiet")
+        scheduler.add_session("heavy", weight=2)
+        for i in range(10):
+            scheduler.submit(Job("noisy", 3.0, i))
+        scheduler.submit(Job("quiet", 3.0, "q"))
+        for i in range(4):
+            scheduler.submit(Job("heavy", 3.0, i))
+        order = [scheduler.get(timeout=0).session_id for _ in range(6)]
+        if order.index("quiet") > 2 or order.count("heavy") < 3:
+            print(f"✗ Unfair scheduling order: {order}")
+            return False
+        
+        async def run_clients():
+            recognize, translate = simulated_backends(0.05, 0.01)
+            server = CaptionSessionServer(recognize, translate, host="127.0.0.1", port=0,
+                                          num_workers=2, window_seconds=1)
+            await server.start()
+            
+            async def client(name, seconds):
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                writer.write((json.dumps({"session": name, "sample_rate": 16000}) + "\n").encode())
+                pcm = b"\x00\x00" * 16000 * seconds
+                writer.write(struct.pack("!I", len(pcm)) + pcm + struct.pack("!I", 0))
+                await writer.drain()
+                captions = []
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    captions.append(json.loads(line))
+                writer.close()
+                return captions
+            
+            results = await asyncio.gather(client("room-a", 3), client("room-b", 2))
+            await server.stop()
+            return results
+        
+        async def run_bad_clients():
+            recognize, translate = simulated_backends(0.05, 0.01)
+            server = CaptionSessionServer(recognize, translate, host="127.0.0.1", port=0,
+                                          num_workers=1, window_seconds=1,
+                                          clients={"vip": {"key": "secret", "weight": 3}},
+                                          max_frame_bytes=64000, header_timeout=0.3)
+            await server.start()
+            
+            async def rejected(header, frame):
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                writer.write(header + b"\n" + frame)
+                await writer.drain()
+                # The server must close the connection rather than hang
+                closed = await asyncio.wait_for(reader.read(), timeout=5) == b""
+                writer.close()
+                return closed
+            
+            frame = struct.pack("!I", 4) + b"\x00" * 4
+            closed = [
+                await rejected(b'{"sample_rate": -1}', frame),
+                await rejected(b'{"sample_rate": 0}', frame),
+                await rejected(b'{"sample_rate": "fast"}', frame),
+                await rejected(b'[1, 2]', frame),
+                await rejected(b'{"sample_rate": 16000}', struct.pack("!I", 1 << 31)),
+            ]
+            # A connection that never sends its header doesn't hold a slot
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            closed.append(await asyncio.wait_for(reader.read(), timeout=5) == b"")
+            writer.close()
+            
+            # Weights belong to configured clients proving their key, not to
+            # the declared name or a weight in the header
+            weights = []
+            for header in [{"session": "vip"}, {"session": "noisy", "key": "wrong"},
+                           {"session": "guest", "key": "secret"}]:
+                header.update(sample_rate=16000, weight=1e9)
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                writer.write((json.dumps(header) + "\n").encode())
+                await writer.drain()
+                for _ in range(100):
+                    if server.sessions:
+                        break
+                    await asyncio.sleep(0.01)
+                session_id = next(iter(server.sessions))
+                weights.append((session_id, server.scheduler.sessions[session_id].weight))
+                writer.write(struct.pack("!I", 0))
+                await writer.drain()
+                await reader.read()
+                writer.close()
+            await server.stop()
+            return closed, weights
+        
+        closed, weights = asyncio.run(run_bad_clients())
+        if not all(closed):
+            print(f"✗ Bad headers, frames or idle connections not rejected: {closed}")
+            return False
+        if (not weights[0][0].startswith("vip-") or weights[0][1] != 1.0
+                or weights[1:] != [("noisy", 1.0), ("vip", 3)]):
+            print(f"✗ Weights not tied to configured clients: {weights}")
+            return False
+        
+        room_a, room_b = asyncio.run(run_clients())
+        if len(room_a) != 3 or len(room_b) != 2:
+            print(f"✗ Expected 3 and 2 captions, got {len(room_a)} and {len(room_b)}")
+            return False
+        if {c["session"] for c in room_a} != {"room-a"} or max(c["audio_end"] for c in room_a) != 3.0:
+            print(f"✗ Captions routed to the wrong session: {room_a}")
+            return False
+        
+        print("✓ Headless session server working")
+        return True
+    except Exception as e:
+        print(f"✗ Session server test failed: {e}")
+        return False
+
+
+def test_diagnostics():
+    """Test hot-path timers and the diagnostics archive."""
+    print("\nTesting diagnostics...")
+    
+    try:
+        import json
+        import shutil
+        import tempfile
+        import zipfile
+        from utils.diagnostics import SectionTimers, DiagnosticsCollector, _NULL_SECTION
+        
+        # Disabled timers hand out the shared no-op section and record nothing
+        section_timers = SectionTimers()
+        if section_timers.section("recognition") is not _NULL_SECTION:
+            print("✗ Disabled timers should not allocate sections")
+            return False
+        section_timers.enabled = True
+        for _ in range(3):
+            with section_timers.section("recognition"):
+                time.sleep(0.01)
+        stats = section_timers.snapshot()["recognition"]
+        if stats["count"] != 3 or stats["mean"] < 0.005:
+            print(f"✗ Unexpected timer statistics: {stats}")
+            return False
+        
+        # Busy thread that should show up in the profile
+        stop = threading.Event()
+        def busy():
+            while not stop.is_set():
+                sum(range(1000))
+        worker = threading.Thread(target=busy, name="busy-worker", daemon=True)
+        worker.start()
+        
+        output_dir = tempfile.mkdtemp()
+        try:
+            collector = DiagnosticsCollector(output_dir=output_dir, duration=0.3)
+            collector.add_state_provider("queue", lambda: {"size": 3})
+            collector.add_state_provider("broken", lambda: 1 / 0)
+            path = collector.dump()
+            stop.set()
+            with zipfile.ZipFile(path) as archive:
+                names = set(archive.namelist())
+                expected = {"profile_collapsed.txt", "profile_top.txt", "tracemalloc_diff.txt",
+                            "threads.txt", "state.json"}
+                if names != expected:
+                    print(f"✗ Unexpected archive contents: {sorted(names)}")
+                    return False
+                state = json.loads(archive.read("state.json"))
+                profile = archive.read("profile_collapsed.txt").decode("utf-8")
+                threads = archive.read("threads.txt").decode("utf-8")
+        finally:
+            stop.set()
+            shutil.rmtree(output_dir, ignore_errors=True)
+        
+        if state["state_after"]["queue"] != {"size": 3} or "error" not in state["state_after"]["broken"]:
+            print(f"✗ State providers not collected: {state['state_after']}")
+            return False
+        if "busy-worker" not in profile or "busy-worker" not in threads:
+            print("✗ Busy thread missing from profile or thread dump")
+            return False
+        
+        print("✓ Diagnostics working")
+        return True
+    except Exception as e:
+        print(f"✗ Diagnostics test failed: {e}")
+        return False
+
+
+def test_capture_journal():
+    """Test the capture journal: rotation, disk budget, index and replay."""
+    print("\nTesting capture journal...")
+    
+    try:
+        import shutil
+        import tempfile
+        import numpy as np
+        from audio.journal import (CaptureJournal, JournalReader, JournalReplaySource,
+                                   FLAG_OVERFLOW)
+        
+        directory = tempfile.mkdtemp()
+        try:
+            # 1 s segments of 1000 Hz audio; budget for about 3 segments
+            journal = CaptureJournal(directory, sample_rate=1000, segment_seconds=1,
+                                     max_disk_mb=6500 / (1024 * 1024))
+            samples = np.arange(10000, dtype=np.int16)
+            for i in range(0, 10000, 300):
+                chunk = samples[i:i + 300].tobytes()
+                journal.write(chunk, FLAG_OVERFLOW if i == 3000 else 0, wall_time=1000.0 + i / 1000)
+            journal.close()
+            
+            reader = JournalReader(directory)
+            if reader.end_sample != 10000 or reader.start_sample < 6000:
+                print(f"✗ Disk budget not enforced: samples {reader.start_sample}-{reader.end_sample}")
+                return False
+            data = np.frombuffer(reader.read(7900, 8100), dtype=np.int16)
+            if not np.array_equal(data, samples[7900:8100]):
+                print("✗ Journaled audio does not match across a segment boundary")
+                return False
+            if reader.sample_at(1008.5) != 8500:
+                print(f"✗ Wall-clock lookup wrong: {reader.sample_at(1008.5)}")
+                return False
+            
+            # A reopened journal continues the sample positions
+            journal = CaptureJournal(directory, sample_rate=1000, segment_seconds=1)
+            if journal.write(b"\x00\x00" * 10, wall_time=2000.0) != 10000:
+                print("✗ Reopened journal did not continue after the old audio")
+                return False
+            # Buffered index records reach the disk without a further write
+            time.sleep(journal.flush_interval * 3)
+            if JournalReader(directory).end_sample != 10010:
+                print("✗ Writer thread did not flush the buffered index records")
+                return False
+            journal.close()
+            
+            # Replay a time range at maximum speed
+            replay = JournalReplaySource(directory, start_time=1007.0, end_time=1009.0, speed=0)
+            replay.start()
+            audio = replay.get_audio_chunk(duration_seconds=10)
+            replay.stop()
+            if not np.array_equal(np.frombuffer(audio, dtype=np.int16), samples[7000:9000]):
+                print("✗ Replayed audio does not match the journaled range")
+                return False
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        
+        print("✓ Capture journal working")
+        return True
+    except Exception as e:
+        print(f"✗ Capture journal test failed: {e}")
+        return False
+
+
+class _SlowTranslator:
+    """Fake Translator with a fixed latency and the real cache interface."""
+    
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = []
+        self.translation_cache = {}
+    
+    SOURCE_TEXT_BACKEND = "source_text"
+    
+    def get_cached(self, text):
+        return self.translation_cache.get(text)
+    
+    def cache_translation(self, text, translated_text):
+        self.translation_cache[text] = translated_text
+    
+    def draft(self, text):
+        if text in self.translation_cache:
+            return self.translation_cache[text], "cache", False
+        self.calls.append(text)
+        time.sleep(self.latency)
+        return text.upper(), "fake", True
+    
+    def confirm(self, text, translated_text, backend, remember=False):
+        if backend != "cache":
+            self.cache_translation(text, translated_text)
+    
+    def translate(self, text):
+        translated_text, backend, _ = self.draft(text)
+        self.confirm(text, translated_text, backend)
+        return translated_text
+
+
+def test_speculative_translation():
+    """Test speculative translation of partial hypotheses."""
+    print("\nTesting speculative translation...")
+    
+    try:
+        from translation.speculative import SpeculativeTranslator
+        from utils.metrics import Metrics
+        
+        translator = _SlowTranslator(0.2)
+        speculator = SpeculativeTranslator(translator, max_in_flight=1, min_stable_updates=1,
+                                           metrics=Metrics())
+        
+        # The final text matches the last hypothesis: its translation is reused.
+        # Over budget the newest hypothesis is held, replacing an older held one,
+        # and started as soon as the running call finishes
+        speculator.speculate("hello")
+        time.sleep(0.05)
+        speculator.speculate("hello wor")
+        time.sleep(0.05)
+        speculator.speculate("hello world")
+        time.sleep(0.25)
+        start = time.perf_counter()
+        result = speculator.finalize("hello world")
+        waited = time.perf_counter() - start
+        if result != "HELLO WORLD" or waited > 0.15:
+            print(f"✗ Speculation not reused: {result!r} after {waited:.2f} s")
+            return False
+        stats = speculator.stats
+        if (stats["hits"] != 1 or stats["wasted"] != 1 or stats["cancelled"] != 1
+                or stats["speculated"] != 2 or "hello wor" in translator.calls):
+            print(f"✗ Unexpected speculation stats: {stats}")
+            return False
+        if stats["saved_seconds"] < 0.1:
+            print(f"✗ Saved latency not accounted: {stats['saved_seconds']:.3f} s")
+            return False
+        
+        # Hypotheses are only speculated on once they are stable: repeated,
+        # or reported as stable (recognized at a speech pause)
+        speculator.min_stable_updates = 2
+        if speculator.speculate("good morning") or not speculator.speculate("good morning"):
+            print("✗ Unstable hypothesis speculated on")
+            return False
+        if not speculator.speculate("good afternoon", stable=True):
+            print("✗ Stable hypothesis not speculated on")
+            return False
+        
+        # A revised final text is translated normally; the cache covers repeats
+        if speculator.finalize("good evening") != "GOOD EVENING" or stats["misses"] != 1:
+            print("✗ Mismatching final text not translated")
+            return False
+        if speculator.finalize("good evening") != "GOOD EVENING" or stats["cache_hits"] != 1:
+            print("✗ Cached final text not used")
+            return False
+        if "hello" in translator.translation_cache or "good morning" in translator.translation_cache:
+            print("✗ Partial hypotheses leaked into the translation cache")
+            return False
+        speculator.shutdown()
+        
+        # A speculation answered with the source text while the service was
+        # down is not cached, so the next request reaches the service again
+        from translation.translator import Translator
+        from utils.resilience import Backend
+        service_up = [False]
+        
+        def service(text):
+            if not service_up[0]:
+                raise ConnectionError("service down")
+            return f"EN:{text}"
+        
+        translator = Translator(backends=[Backend("fake", service)])
+        speculator = SpeculativeTranslator(translator, min_stable_updates=1, metrics=Metrics())
+        speculator.speculate("こんにちは世界")
+        time.sleep(0.1)
+        if speculator.finalize("こんにちは世界") != "こんにちは世界":
+            print("✗ Source text not shown while the service is down")
+            return False
+        service_up[0] = True
+        if translator.translate("こんにちは世界") != "EN:こんにちは世界":
+            print("✗ Source-text fallback was cached")
+            return False
+        speculator.shutdown()
+        translator.shutdown()
+        
+        print("✓ Speculative translation working")
+        return True
+    except Exception as e:
+        print(f"✗ Speculative translation test failed: {e}")
+        return False
+
+
+def test_translation_memory():
+    """Test the translation memory and glossary."""
+    print("\nTesting translation memory and glossary...")
+    
+    try:
+        import shutil
+        import tempfile
+        from translation.memory import TranslationMemory, differs_only_in_form
+        from translation.glossary import Glossary
+        
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "ja-en.jsonl")
+            memory = TranslationMemory(path, fuzzy_threshold=0.8)
+            memory.add("今日はとても良い天気ですね", "The weather is very nice today")
+            memory.add("チャンネル登録よろしくお願いします", "Please subscribe to the channel")
+            
+            if memory.lookup("今日はとても良い天気ですね") != ("The weather is very nice today", 1.0):
+                print("✗ Exact match not found")
+                return False
+            match = memory.lookup("チャンネル登録よろしくお願いします！")
+            if not match or match[0] != "Please subscribe to the channel" or match[1] >= 1.0:
+                print(f"✗ Fuzzy match not found: {match}")
+                return False
+            if memory.lookup("明日は雨が降るでしょう") is not None:
+                print("✗ Unrelated text matched")
+                return False
+            
+            # Persisted and reloaded; replacing an entry keeps one copy
+            memory.add("今日はとても良い天気ですね", "It's lovely weather today")
+            reloaded = TranslationMemory(path, fuzzy_threshold=0.8)
+            if len(reloaded) != 2 or reloaded.lookup("今日はとても良い天気ですね")[0] != "It's lovely weather today":
+                print("✗ Translation memory not persisted")
+                return False
+            
+            # Similar texts with a different meaning are not fuzzy matches
+            memory.add("来週の月曜日に定例会議を開催します", "The regular meeting will be held next Monday")
+            memory.add("会議は3時から始まります", "The meeting starts at 3")
+            for text in ["来週の月曜日に定例会議を開催しません", "会議は4時から始まります"]:
+                if memory.lookup(text) is not None:
+                    print(f"✗ Fuzzy match changed the meaning of {text}")
+                    return False
+            if memory.lookup("来週の月曜日に定例会議を開催しますよ。") is None:
+                print("✗ Match differing only in punctuation and particles rejected")
+                return False
+            # Particles are only ignored at the end of a sentence
+            if not differs_only_in_form("会議を開催します。明日も", "会議を開催しますね。明日も"):
+                print("✗ Sentence-final particle before more text not ignored")
+                return False
+            if differs_only_in_form("会議を開催します", "会議をよ開催します"):
+                print("✗ Particle inside a sentence ignored")
+                return False
+            
+            # Oldest entries are evicted beyond max_entries
+            small = TranslationMemory(max_entries=1500)
+            for i in range(3000):
+                small.add(f"フレーズ番号{i}です", f"Phrase number {i}")
+            if len(small) != 1500 or "フレーズ番号10です" in small.exact:
+                print("✗ Oldest entries not evicted")
+                return False
+            if small.lookup("フレーズ番号2999です") != ("Phrase number 2999", 1.0):
+                print("✗ Entry lost after compaction")
+                return False
+            
+            # Speculative hits are remembered like normal translations
+            from translation.speculative import SpeculativeTranslator
+            from translation.translator import Translator
+            from utils.metrics import Metrics
+            from utils.resilience import Backend
+            translator = Translator(backends=[Backend("fake", lambda text: f"EN:{text}")],
+                                    memory_dir=os.path.join(directory, "speculative"))
+            speculator = SpeculativeTranslator(translator, min_stable_updates=1, metrics=Metrics())
+            speculator.speculate("明日の予定を確認します")
+            time.sleep(0.1)
+            if (speculator.finalize("明日の予定を確認します") != "EN:明日の予定を確認します"
+                    or speculator.stats["hits"] != 1 or len(translator.memory) != 1):
+                print("✗ Speculative hit not added to the translation memory")
+                return False
+            speculator.shutdown()
+            translator.shutdown()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        
+        glossary = Glossary({"山田": "Yamada", "山田太郎": "Taro Yamada", "東京": "Tokyo"})
+        found = [term for _, _, term in glossary.find("山田太郎さんは東京と山田に住んでいる")]
+        if found != ["山田太郎", "東京", "山田"]:
+            print(f"✗ Glossary matches wrong: {found}")
+            return False
+        protected, pinned = glossary.protect("山田太郎さんは東京に住んでいる")
+        if protected != "<0>さんは<1>に住んでいる":
+            print(f"✗ Glossary terms not protected: {protected}")
+            return False
+        restored, complete = glossary.restore("< 0 > lives in <1>", pinned)
+        if restored != "Taro Yamada lives in Tokyo" or not complete:
+            print(f"✗ Glossary terms not restored: {restored}")
+            return False
+        
+        print("✓ Translation memory and glossary working")
+        return True
+    except Exception as e:
+        print(f"✗ Translation memory test failed: {e}")
+        return False
+
+
+def test_performance_profiles():
+    """Test performance profiles and the auto-tuner."""
+    print("\nTesting performance profiles...")
+    
+    try:
+        import json
+        import shutil
+        import tempfile
+        from utils.config import Config
+        from utils.autotune import AutoTuner
+        
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "config.json")
+            config = Config(path)
+            # The default profile keeps the previous hard-coded behaviour
+            balanced = config.get_performance_settings()
+            if (balanced["chunk_size"], balanced["window_seconds"], balanced["processing_interval"],
+                    balanced["min_process_interval"]) != (1024, 3, 0.5, 1.0):
+                print(f"✗ Balanced profile changed: {balanced}")
+                return False
+            config.set("performance_profile", "low-latency")
+            fast = config.get_performance_settings()
+            config.set("performance_profile", "throughput")
+            slow = config.get_performance_settings()
+            if not fast["window_seconds"] < balanced["window_seconds"] < slow["window_seconds"] or \
+                    not fast["chunk_size"] < balanced["chunk_size"] < slow["chunk_size"]:
+                print("✗ Profiles are not ordered from latency to throughput")
+                return False
+            with open(path, "w") as f:
+                json.dump({"performance_profile": "custom", "window_seconds": 2,
+                           "chunk_size": 2048}, f)
+            config.reload()
+            custom = config.get_performance_settings()
+            if custom["window_seconds"] != 2 or custom["chunk_size"] != 2048:
+                print(f"✗ Custom profile ignores config keys: {custom}")
+                return False
+            # A config from before profiles keeps its hand-tuned chunk_size
+            with open(path, "w") as f:
+                json.dump({"chunk_size": 4096}, f)
+            config.reload()
+            if config.get("performance_profile") != "custom" or \
+                    config.get_performance_settings()["chunk_size"] != 4096:
+                print("✗ Legacy chunk_size ignored without a performance profile")
+                return False
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        
+        # Slow recognition grows the window up to the profile's limit
+        now = [0.0]
+        tuner = AutoTuner(balanced, adjust_interval=10, clock=lambda: now[0], cpu_clock=lambda: 0.0)
+        for _ in range(10):
+            tuner.record_latency(3.5)
+            now[0] += 10
+            tuner.update()
+        if tuner.settings["window_seconds"] != balanced["window_range"][1]:
+            print(f"✗ Window did not grow to the limit: {tuner.settings}")
+            return False
+        # Fast recognition with idle CPU shrinks it back down
+        for _ in range(10):
+            tuner.record_latency(0.2)
+            now[0] += 10
+            tuner.update()
+        settings = tuner.settings
+        if settings["window_seconds"] != balanced["window_range"][0] or \
+                settings["min_process_interval"] >= balanced["min_process_interval"]:
+            print(f"✗ Window did not shrink to the limit: {settings}")
+            return False
+        
+        print("✓ Performance profiles working")
+        return True
+    except Exception as e:
+        print(f"✗ Performance profile test failed: {e}")
+        return False
+
+
+def test_event_log():
+    """Test the structured event log."""
+    print("\nTesting event log...")
+    
+    try:
+        import json
+        import shutil
+        import tempfile
+        from utils.event_log import EventLogger
+        
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "events.jsonl")
+            log = EventLogger(path, console=False, rate_limit_seconds=0.2)
+            log.info("recognition.result", "Recognized: こんにちは", text="こんにちは")
+            for _ in range(50):
+                log.error("capture.read_error", "Error reading audio")
+            time.sleep(0.25)
+            log.error("capture.read_error", "Error reading audio")
+            log.flush()
+            
+            with open(path, "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+            if records[0]["event"] != "recognition.result" or records[0]["text"] != "こんにちは":
+                print(f"✗ Unexpected first record: {records[0]}")
+                return False
+            errors = [r for r in records if r["event"] == "capture.read_error"]
+            if len(errors) != 2 or errors[1].get("suppressed") != 49:
+                print(f"✗ Repeated errors not rate limited: {errors}")
+                return False
+            
+            # Rotation keeps backup_count old files
+            log.configure(path, max_bytes=2000, backup_count=2)
+            for i in range(200):
+                log.info("translation.result", f"Translated {i}")
+            log.flush()
+            if not os.path.exists(path + ".2") or os.path.exists(path + ".3"):
+                print(f"✗ Log not rotated: {sorted(os.listdir(directory))}")
+                return False
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        
+        # A full queue drops events instead of blocking the caller
+        blocked = threading.Event()
+        log = EventLogger(queue_size=10, console=False)
+        log._write = lambda batch: blocked.wait(5)
+        start = time.perf_counter()
+        for i in range(1000):
+            log.info("test.event", f"event {i}")
+        elapsed = time.perf_counter() - start
+        blocked.set()
+        if log.dropped < 900 or elapsed > 0.5:
+            print(f"✗ Logging blocked or did not drop: dropped={log.dropped}, {elapsed:.2f} s")
+            return False
+        
+        print("✓ Event log working")
+        return True
+    except Exception as e:
+        print(f"✗ Event log test failed: {e}")
+        return False
+
+
+def test_speech_segmenter():
+    """Test the speech segmenter and event-driven idle mode."""
+    print("\nTesting speech segmenter...")
+    
+    try:
+        import queue
+        import numpy as np
+        from audio.segmenter import SpeechSegmenter, END_OF_SPEECH
+        
+        chunk_size = 1024
+        silence = np.zeros(chunk_size, dtype=np.int16).tobytes()
+        speech = (3000 * np.sin(np.arange(chunk_size) * 0.1)).astype(np.int16).tobytes()
+        segmenter = SpeechSegmenter(16000, energy_threshold=300, hangover_seconds=0.2,
+                                    pre_roll_seconds=0.1)
+        
+        class CountingQueue(queue.Queue):
+            def __init__(self):
+                super().__init__()
+                self.wakeups = 0
+            
+            def get(self, block=True, timeout=None):
+                item = super().get(block, timeout)
+                self.wakeups += 1
+                return item
+        
+        # The consumer waits for speech; silence never wakes it up
+        audio_queue = CountingQueue()
+        windows = []
+        consumer = threading.Thread(target=lambda: windows.append(segmenter.next_window(audio_queue, 100)))
+        consumer.start()
+        for _ in range(50):
+            for item in segmenter.process(silence):
+                audio_queue.put(item)
+        time.sleep(0.2)
+        if audio_queue.wakeups or not consumer.is_alive() or windows:
+            print(f"✗ Consumer woke up in silence: {audio_queue.wakeups} wakeups")
+            return False
+        
+        # Speech is queued with the pre-roll block and ends after the hangover
+        queued = []
+        for block in [speech] * 10 + [silence] * 5:
+            queued.extend(segmenter.process(block))
+        if queued[-1] is not END_OF_SPEECH or len(queued) != 1 + 10 + 4 + 1:
+            print(f"✗ Unexpected segment: {len(queued)} items")
+            return False
+        for item in queued:
+            audio_queue.put(item)
+        consumer.join(timeout=2)
+        if not windows or len(windows[0]) != 15:
+            print(f"✗ Unexpected window: {[len(w) for w in windows]}")
+            return False
+        
+        # Long speech (after one pre-roll block) is split into windows;
+        # a None item ends the wait
+        for _ in range(12):
+            for item in segmenter.process(speech):
+                audio_queue.put(item)
+        if len(segmenter.next_window(audio_queue, 8)) != 8:
+            print("✗ Window not limited to max_blocks")
+            return False
+        audio_queue.put(None)
+        audio_queue.put(None)
+        if len(segmenter.next_window(audio_queue, 8)) != 5 or segmenter.next_window(audio_queue, 8):
+            print("✗ Stop sentinel not handled")
+            return False
+        if segmenter.stats["segments"] != 2 or segmenter.stats["silent_blocks"] != 51:
+            print(f"✗ Unexpected stats: {segmenter.stats}")
+            return False
+        
+        # With pause_seconds, the window so far is handed on when speech pauses
+        from audio.segmenter import SPEECH_PAUSE
+        segmenter = SpeechSegmenter(16000, energy_threshold=300, hangover_seconds=0.3,
+                                    pre_roll_seconds=0, pause_seconds=0.1)
+        paused = []
+        segmenter.on_pause = lambda blocks: paused.append(len(blocks))
+        queued = []
+        for block in [speech] * 4 + [silence] * 5:
+            queued.extend(segmenter.process(block))
+        if queued.count(SPEECH_PAUSE) != 1 or queued[-1] is not END_OF_SPEECH:
+            print("✗ Speech pause not marked")
+            return False
+        audio_queue = queue.Queue()
+        for item in queued:
+            audio_queue.put(item)
+        window = segmenter.next_window(audio_queue, 100)
+        if paused != [6] or len(window) != 9:
+            print(f"✗ Pause not handed on: {paused}, window of {len(window)}")
+            return False
+        
+        print("✓ Speech segmenter working")
+        return True
+    except Exception as e:
+        print(f"✗ Speech segmenter test failed: {e}")
+        return False
+
+
+def test_translation_batcher():
+    """Test micro-batched translation."""
+    print("\nTesting translation batcher...")
+    
+    try:
+        from translation.batcher import TranslationBatcher, join_segments, split_segments
+        
+        texts = ["こんにちは", "今日は [晴れ] です", "ありがとう"]
+        joined = join_segments(texts)
+        if split_segments(joined, 3) != texts:
+            print(f"✗ Joined segments not split back: {joined!r}")
+            return False
+        translated = joined.replace("[[1]]", "[[ 1 ]]").upper()
+        if split_segments(translated, 3) is None:
+            print("✗ Marker with spaces not accepted")
+            return False
+        for broken in [joined.replace("[[1]]\n", ""), joined.replace("[[2]]", "[[1]]"),
+                       "Note:\n" + joined, joined.replace("ありがとう", "")]:
+            if split_segments(broken, 3) is not None:
+                print(f"✗ Damaged response accepted: {broken!r}")
+                return False
+        
+        calls = []
+        
+        def translate_batch(batch):
+            calls.append(list(batch))
+            time.sleep(0.05)
+            return [text.upper() for text in batch]
+        
+        batcher = TranslationBatcher(translate_batch, window_seconds=0.1, max_batch=4)
+        results = {}
+        
+        def caller(i):
+            results[i] = batcher.translate(f"segment {i}", timeout=5)
+        
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if results != {i: f"SEGMENT {i}" for i in range(6)}:
+            print(f"✗ Wrong results: {results}")
+            return False
+        if len(calls) != 2 or max(len(call) for call in calls) > 4:
+            print(f"✗ Segments not batched: {calls}")
+            return False
+        
+        # Errors reach every caller of the batch
+        def failing(batch):
+            raise RuntimeError("service down")
+        
+        failing_batcher = TranslationBatcher(failing, window_seconds=0.01)
+        try:
+            failing_batcher.translate("test", timeout=5)
+            print("✗ Error not propagated")
+            return False
+        except RuntimeError:
+            pass
+        batcher.close()
+        failing_batcher.close()
+        
+        # Translator.translate_batch: one joined request through the fallback chain
+        import shutil
+        import tempfile
+        from translation.batcher import SEGMENT_MARKER_PATTERN
+        from translation.glossary import Glossary
+        from translation.translator import Translator
+        from utils.resilience import Backend
+        requests = []
+        mode = ["ok"]
+        
+        def service(text):
+            requests.append(text)
+            if mode[0] == "down":
+                raise ConnectionError("service down")
+            translated = "\n".join(line if SEGMENT_MARKER_PATTERN.fullmatch(line) else f"EN:{line}"
+                                   for line in text.split("\n"))
+            if mode[0] == "mangle":
+                # Services occasionally merge lines of a joined request
+                translated = translated.replace("[[1]]\n", "")
+            return translated
+        
+        directory = tempfile.mkdtemp()
+        try:
+            translator = Translator(backends=[Backend("fake", service)], memory_dir=directory,
+                                    glossary=Glossary({"山田": "Yamada"}))
+            translator.cache_translation("ありがとう", "Thank you")
+            batch = ["こんにちは", "山田です", "", "こんにちは", "ありがとう"]
+            results = translator.translate_batch(batch)
+            if results != ["EN:こんにちは", "EN:Yamadaです", "", "EN:こんにちは", "Thank you"]:
+                print(f"✗ Wrong batch translation: {results}")
+                return False
+            if len(requests) != 1 or "[[1]]" not in requests[0]:
+                print(f"✗ Batch not sent as one joined request: {requests}")
+                return False
+            if translator.get_cached("山田です") != "EN:Yamadaです" or len(translator.memory) != 2:
+                print("✗ Batched segments not cached and remembered")
+                return False
+            
+            # Mangled markers fall back to one request per segment
+            mode[0] = "mangle"
+            del requests[:]
+            results = translator.translate_batch(["おはよう", "さようなら"])
+            if results != ["EN:おはよう", "EN:さようなら"] or len(requests) != 3:
+                print(f"✗ No fallback after a failed split: {results}, {len(requests)} requests")
+                return False
+            
+            # With the service down the source texts are shown and not cached
+            mode[0] = "down"
+            results = translator.translate_batch(["おやすみ", "またね"])
+            if results != ["おやすみ", "またね"] or translator.get_cached("おやすみ") is not None:
+                print(f"✗ Source-text fallback wrong or cached: {results}")
+                return False
+            mode[0] = "ok"
+            if translator.translate_batch(["おやすみ", "またね"]) != ["EN:おやすみ", "EN:またね"]:
+                print("✗ Batch not retried after the service recovered")
+                return False
+            
+            # A joined request gets the timeout of as many single requests
+            def slow_service(text):
+                time.sleep(0.15)
+                return service(text)
+            
+            slow_translator = Translator(backends=[Backend("slow", slow_service, timeout=0.1)])
+            if slow_translator.translate_batch(["一つ", "二つ", "三つ"]) != ["EN:一つ", "EN:二つ", "EN:三つ"]:
+                print("✗ Batch held to the single-request timeout")
+                return False
+            slow_translator.shutdown()
+            
+            # The pipeline translates recognitions that finished together with one request
+            from concurrent.futures import Future
+            from pipeline import CaptionPipeline
+            from utils.config import Config
+            
+            class CaptionList:
+                def __init__(self):
+                    self.captions = []
+                
+                def update_caption(self, text):
+                    self.captions.append(text)
+            
+            pipeline = CaptionPipeline(Config(os.path.join(directory, "config.json")))
+            pipeline.translator = translator
+            pipeline.caption_window = CaptionList()
+            for text in ["一番目です", "二番目です", "三番目です"]:
+                future = Future()
+                future.set_result(text)
+                pipeline.pending_recognitions.put((future, (0.0, 1.0)))
+            pipeline.pending_recognitions.put(None)
+            del requests[:]
+            pipeline._result_loop()
+            if (pipeline.caption_window.captions != ["EN:一番目です", "EN:二番目です", "EN:三番目です"]
+                    or len(requests) != 1):
+                print(f"✗ Finished recognitions not batched: {pipeline.caption_window.captions}, "
+                      f"{len(requests)} requests")
+                return False
+            translator.shutdown()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        
+        print("✓ Translation batcher working")
+        return True
+    except Exception as e:
+        print(f"✗ Translation batcher test failed: {e}")
+        return False
+
+
+def test_block_queue():
+    """Test the bounded, drop-oldest capture queue."""
+    print("\nTesting bounded capture queue...")
+    
+    try:
+        from audio.block_queue import BlockQueue
+        from audio.segmenter import SpeechSegmenter, END_OF_SPEECH, SPEECH_PAUSE
+        
+        # A full queue drops its oldest block instead of blocking capture
+        audio_queue = BlockQueue(3)
+        start = time.perf_counter()
+        for i in range(10):
+            audio_queue.put(i)
+        if time.perf_counter() - start > 0.5:
+            print("✗ put() blocked on a full queue")
+            return False
+        if audio_queue.qsize() != 3 or audio_queue.dropped != 7:
+            print(f"✗ Wrong size or drop count: {audio_queue.qsize()}, {audio_queue.dropped}")
+            return False
+        if [audio_queue.get() for _ in range(3)] != [7, 8, 9]:
+            print("✗ Newest blocks not kept")
+            return False
+        
+        # Control markers are never discarded; the oldest audio block is
+        audio_queue = BlockQueue(3)
+        for item in ["a", END_OF_SPEECH, "b", SPEECH_PAUSE, "c", None, "d"]:
+            audio_queue.put(item)
+        kept = [audio_queue.get() for _ in range(audio_queue.qsize())]
+        if kept != [END_OF_SPEECH, SPEECH_PAUSE, None, "d"]:
+            print(f"✗ Control markers dropped: {kept}")
+            return False
+        
+        # The segmenter still reads windows from it
+        audio_queue = BlockQueue(100)
+        for item in ["a", "b", END_OF_SPEECH, "c", None, None]:
+            audio_queue.put_nowait(item)
+        segmenter = SpeechSegmenter()
+        windows = [segmenter.next_window(audio_queue, 10) for _ in range(3)]
+        if windows != [["a", "b"], ["c"], []]:
+            print(f"✗ Wrong windows: {windows}")
+            return False
+        
+        print("✓ Bounded capture queue working")
+        return True
+    except Exception as e:
+        print(f"✗ Bounded capture queue test failed: {e}")
+        return False
+
+
 def main():
     """Run all tests."""
     print("="*60)
@@ -137,6 +1489,21 @@ def main():
     results.append(("Dependencies", test_dependencies()))
     results.append(("Audio Devices", test_audio_devices()))
     results.append(("Translation", test_translation()))
+    results.append(("Deduplication", test_deduplication()))
+    results.append(("Backend Resilience", test_backend_resilience()))
+    results.append(("Recognition Pool", test_recognition_pool()))
+    results.append(("Shared Audio Ring", test_shared_audio_ring()))
+    results.append(("Caption Broadcast", test_caption_broadcast()))
+    results.append(("Session Server", test_session_server()))
+    results.append(("Diagnostics", test_diagnostics()))
+    results.append(("Capture Journal", test_capture_journal()))
+    results.append(("Speculative Translation", test_speculative_translation()))
+    results.append(("Translation Memory", test_translation_memory()))
+    results.append(("Performance Profiles", test_performance_profiles()))
+    results.append(("Event Log", test_event_log()))
+    results.append(("Speech Segmenter", test_speech_segmenter()))
+    results.append(("Translation Batcher", test_translation_batcher()))
+    results.append(("Block Queue", test_block_queue()))
     
     print("\n" + "="*60)
     print("Test Results:")